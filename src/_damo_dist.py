@@ -1,5 +1,6 @@
 # SPDX-License-Identifier: GPL-2.0
 
+import math
 import os
 import subprocess
 
@@ -22,7 +23,151 @@ def plot_dist(data_file, output_file, xlabel, ylabel):
     os.remove(data_file)
     return None
 
+class QuantileSketch:
+    '''
+    KLL-like mergeable quantile sketch.  Values are added one by one, and
+    only about 3 * k of them are kept, regardless of the number of added
+    values.  Percentiles are exact until about k values are added, and have
+    rank error of about 1 percent with the default k after that.  Minimum,
+    maximum and average are always exact.
+    '''
+    k = None
+    compactors = None
+    offsets = None
+    nr_kept = None
+    max_nr_kept = None
+    nr_values = None
+    total = None
+    min_val = None
+    max_val = None
+
+    def __init__(self, k=200):
+        self.k = k
+        self.compactors = []
+        self.offsets = []
+        self.nr_kept = 0
+        self.nr_values = 0
+        self.total = 0
+        self.add_level()
+
+    def capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2.0 / 3) ** depth)) + 1
+
+    def add_level(self):
+        self.compactors.append([])
+        # alternate kept half of each compaction, for deterministic outputs
+        self.offsets.append(0)
+        self.max_nr_kept = sum([self.capacity(level)
+                                for level in range(len(self.compactors))])
+
+    def compress(self):
+        for level, values in enumerate(self.compactors):
+            if len(values) < self.capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self.add_level()
+            values.sort()
+            left = [values.pop()] if len(values) % 2 else []
+            self.compactors[level + 1] += values[self.offsets[level]::2]
+            self.offsets[level] ^= 1
+            self.compactors[level] = left
+            self.nr_kept = sum([len(v) for v in self.compactors])
+            if self.nr_kept < self.max_nr_kept:
+                break
+
+    def add(self, value):
+        self.compactors[0].append(value)
+        self.nr_kept += 1
+        self.nr_values += 1
+        self.total += value
+        if self.min_val is None or value < self.min_val:
+            self.min_val = value
+        if self.max_val is None or value > self.max_val:
+            self.max_val = value
+        if self.nr_kept >= self.max_nr_kept:
+            self.compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.add_level()
+        for level, values in enumerate(other.compactors):
+            self.compactors[level] += values
+        self.nr_kept = sum([len(v) for v in self.compactors])
+        self.nr_values += other.nr_values
+        self.total += other.total
+        for val in [other.min_val, other.max_val]:
+            if val is None:
+                continue
+            if self.min_val is None or val < self.min_val:
+                self.min_val = val
+            if self.max_val is None or val > self.max_val:
+                self.max_val = val
+        while self.nr_kept >= self.max_nr_kept:
+            self.compress()
+
+    def __len__(self):
+        return self.nr_values
+
+    def percentile(self, percentile):
+        '''Same to get_percentile() of sorted list of the added values'''
+        if self.nr_values == 0:
+            return '-1'
+        if percentile >= 100:
+            return self.max_val
+        if percentile <= 0:
+            return self.min_val
+        weighted = sorted([(val, 1 << level)
+                           for level, values in enumerate(self.compactors)
+                           for val in values])
+        # the weighted number of kept values equals self.nr_values
+        rank = int(percentile / 100.0 * self.nr_values)
+        accumulated = 0
+        for val, weight in weighted:
+            accumulated += weight
+            if accumulated > rank:
+                return val
+        return self.max_val
+
+class SketchesSum:
+    '''
+    Sums of the values of same ranks in the QuantileSketch objects, like the
+    sorted lists of same length that summed up by the index.  The sketches
+    should have same number of values.
+    '''
+    sketches = None
+    nr_values = None
+    total = None
+
+    def __init__(self, sketches):
+        self.sketches = sketches
+        self.nr_values = len(sketches[0]) if len(sketches) > 0 else 0
+        self.total = sum([s.total for s in sketches])
+
+    def __len__(self):
+        return self.nr_values
+
+    def percentile(self, percentile):
+        if self.nr_values == 0:
+            return '-1'
+        return sum([s.percentile(percentile) for s in self.sketches])
+
+def add_approx_percentiles_argument(parser):
+    parser.add_argument('--approx_percentiles', action='store_true',
+                        help=' '.join([
+                            'calculate approximated percentiles using a',
+                            'fixed-size sketch instead of sorting all values',
+                            'of the records']))
+
+def approx_percentiles_err(sort_by_size, pr_all):
+    '''Returns an error if approx percentiles cannot be made, or None'''
+    if not sort_by_size or pr_all:
+        return '--approx_percentiles supports only size-sorted percentiles'
+    return None
+
 def get_percentile(dists, percentile):
+    if isinstance(dists, (QuantileSketch, SketchesSum)):
+        return dists.percentile(percentile)
     idx = int(percentile / 100.0 * len(dists))
     if idx == len(dists):
         idx -= 1
@@ -30,16 +175,23 @@ def get_percentile(dists, percentile):
         return '-1'
     return dists[idx]
 
+def get_average(dists):
+    if isinstance(dists, (QuantileSketch, SketchesSum)):
+        return dists.total / dists.nr_values
+    return sum(dists) / len(dists)
+
 def fmt_dists(metric_name, dists, percentiles, pr_all, format_fn, raw_number,
              nr_cols_bar):
     '''
-    Format a string for distributed metric values for given percentiles or all
+    Format a string for distributed metric values for given percentiles or all.
+    'dists' is a sorted list of the values, or a QuantileSketch or SketchesSum
+    of those.
     '''
     lines = ['# <percentile> <%s>' % metric_name]
     if len(dists) == 0:
         lines.append('# no snapshot')
         return '\n'.join(lines)
-    lines.append('# avr:\t%s' % format_fn(sum(dists) / len(dists), raw_number))
+    lines.append('# avr:\t%s' % format_fn(get_average(dists), raw_number))
 
     if pr_all:
         for idx, val in enumerate(dists):
@@ -49,10 +201,7 @@ def fmt_dists(metric_name, dists, percentiles, pr_all, format_fn, raw_number,
     if nr_cols_bar > 0:
         max_val = 0
         for percentile in percentiles:
-            val_idx = int(percentile / 100.0 * len(dists))
-            if val_idx == len(dists):
-                val_idx -= 1
-            val = dists[val_idx]
+            val = get_percentile(dists, percentile)
             if max_val <= val:
                 max_val = val
         if max_val > 0:
@@ -6,6 +6,8 @@ def format_nr(nr, machine_friendly):
     raw_string = '%d' % nr
     if machine_friendly:
         return raw_string
+    if nr >= 0:
+        return '{:,}'.format(int(nr))
     fields = []
     for i in range(0, len(raw_string), 3):
         start_idx = max(0, len(raw_string) - i - 3)
@@ -228,6 +230,8 @@ def try_common_input(txt, min_val=0, max_val=ulong_max):
     return False, None
 
 def text_to_bytes(txt):
+    if type(txt) in number_types:
+        return txt
     success, number = try_common_input(txt)
     if success:
         return number
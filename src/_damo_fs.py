@@ -36,12 +36,73 @@ def read_file(filepath):
         print('read \'%s\': \'%s\'' % (filepath, content.strip()))
     return content, None
 
-def read_files(root):
+def read_file_at(dir_fd, filename, dir_path):
+    '''Returns content and error of a file under a directory fd'''
+    try:
+        fd = os.open(filename, os.O_RDONLY, dir_fd=dir_fd)
+        try:
+            bufs = []
+            offset = 0
+            while True:
+                buf = os.pread(fd, 4096, offset)
+                bufs.append(buf)
+                offset += len(buf)
+                # sysfs files provide whole content in one read
+                if len(buf) < 4096:
+                    break
+        finally:
+            os.close(fd)
+    except Exception as e:
+        return None, 'reading %s failed (%s)' % (
+                os.path.join(dir_path, filename), e)
+    return b''.join(bufs).decode(), None
+
+def read_files_at(dir_fd, dir_path, skip_dirs):
+    contents = {}
+    with os.scandir(dir_fd) as entries:
+        entries = [[e.name, e.is_dir(follow_symlinks=False)] for e in entries]
+    for filename, is_dir in entries:
+        if is_dir:
+            if filename in skip_dirs:
+                continue
+            fd = os.open(filename, os.O_RDONLY | os.O_DIRECTORY,
+                         dir_fd=dir_fd)
+            try:
+                contents[filename] = read_files_at(
+                        fd, os.path.join(dir_path, filename), skip_dirs)
+            finally:
+                os.close(fd)
+        else:
+            contents[filename], err = read_file_at(dir_fd, filename, dir_path)
+            if err != None:
+                contents[filename] = 'read failed (%s)' % err
+    return contents
+
+def read_files(root, skip_dirs=None):
+    '''
+    Returns contents of files under the root directory in a dict that keyed by
+    the names of the files and directories.  Directories of names in
+    'skip_dirs' are not read.
+    '''
+    if skip_dirs is None:
+        skip_dirs = []
+    if (debug_dryrun_logs is None and not debug_do_print and
+            os.scandir in os.supports_fd):
+        # open and read the files relative to the directory fds, to avoid
+        # the path lookup of every file
+        fd = os.open(root, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            return read_files_at(fd, root, skip_dirs)
+        finally:
+            os.close(fd)
+
     contents = {}
     for filename in os.listdir(root):
         filepath = os.path.join(root, filename)
         if os.path.isdir(filepath):
-            contents[filename] = read_files(filepath)
+            if filename in skip_dirs:
+                continue
+            contents[filename] = read_files(filepath, skip_dirs)
         else:
             contents[filename], err = read_file(filepath)
             if err != None:
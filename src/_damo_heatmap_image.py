@@ -0,0 +1,335 @@
+# SPDX-License-Identifier: GPL-2.0
+
+"""
+Write heatmap images in png or svg without external programs.
+
+The heats are colored using gnuplot's default palette, and the image has the
+axes, tick labels, and a colorbar, similar to the image gnuplot generates.
+Texts of png images are drawn using a small built-in font, which supports only
+digits, some symbols, and the upper case letters that the labels need.
+"""
+
+import base64
+import math
+import struct
+import zlib
+
+# 3x5 glyphs of the built-in font
+glyphs = {
+        '0': ['111', '101', '101', '101', '111'],
+        '1': ['010', '110', '010', '010', '111'],
+        '2': ['111', '001', '111', '100', '111'],
+        '3': ['111', '001', '111', '001', '111'],
+        '4': ['101', '101', '111', '001', '001'],
+        '5': ['111', '100', '111', '001', '111'],
+        '6': ['111', '100', '111', '101', '111'],
+        '7': ['111', '001', '001', '001', '001'],
+        '8': ['111', '101', '111', '101', '111'],
+        '9': ['111', '101', '111', '001', '111'],
+        '.': ['000', '000', '000', '000', '010'],
+        '-': ['000', '000', '111', '000', '000'],
+        '+': ['000', '010', '111', '010', '000'],
+        '(': ['001', '010', '010', '010', '001'],
+        ')': ['100', '010', '010', '010', '100'],
+        'A': ['010', '101', '111', '101', '101'],
+        'B': ['110', '101', '110', '101', '110'],
+        'D': ['110', '101', '101', '101', '110'],
+        'E': ['111', '100', '110', '100', '111'],
+        'I': ['111', '010', '010', '010', '111'],
+        'M': ['101', '111', '111', '101', '101'],
+        'N': ['110', '101', '101', '101', '101'],
+        'R': ['110', '101', '110', '101', '101'],
+        'S': ['011', '100', '010', '001', '110'],
+        'T': ['111', '010', '010', '010', '010'],
+        'Y': ['101', '101', '010', '010', '010'],
+        }
+font_scale = 2
+char_width = 4 * font_scale
+char_height = 5 * font_scale
+
+min_plot_sz = 400
+margin = 12
+tick_len = 6
+nr_ticks = 5
+colorbar_width = 16
+
+white = (255, 255, 255)
+black = (0, 0, 0)
+
+def palette_color(level):
+    '''
+    Returns rgb of the level (0.0-1.0) in gnuplot's default palette, namely
+    'rgbformulae 7,5,15'
+    '''
+    red = math.sqrt(level)
+    green = level ** 3
+    blue = max(math.sin(2 * math.pi * level), 0.0)
+    return tuple([int(round(x * 255)) for x in [red, green, blue]])
+
+palette = [palette_color(i / 255.0) for i in range(256)]
+
+class Canvas:
+    width = None
+    height = None
+    rows = None
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.rows = [bytearray(white * width) for i in range(height)]
+
+    def fill(self, x, y, width, height, color):
+        x_start = max(x, 0)
+        x_end = min(x + width, self.width)
+        if x_start >= x_end:
+            return
+        pixels = bytes(color * (x_end - x_start))
+        for row in self.rows[max(y, 0):max(y + height, 0)]:
+            row[x_start * 3:x_end * 3] = pixels
+
+    def text(self, x, y, text, vertical=False):
+        '''
+        Draw the text of which left top is (x, y).  If vertical is True,
+        draw the text rotated counterclockwise, of which left bottom is
+        (x, y).
+        '''
+        for idx, char in enumerate(text.upper()):
+            if not char in glyphs:
+                continue
+            for gy, line in enumerate(glyphs[char]):
+                for gx, bit in enumerate(line):
+                    if bit != '1':
+                        continue
+                    if vertical:
+                        px = x + gy * font_scale
+                        py = y - idx * char_width - (gx + 1) * font_scale
+                    else:
+                        px = x + idx * char_width + gx * font_scale
+                        py = y + gy * font_scale
+                    self.fill(px, py, font_scale, font_scale, black)
+
+def png_bytes(width, height, rows):
+    '''Returns png image of the rgb rows'''
+    def chunk(chunk_type, data):
+        return b''.join([struct.pack('>I', len(data)), chunk_type, data,
+            struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)])
+
+    raw = b''.join([b'\x00' + bytes(row) for row in rows])
+    return b''.join([b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(raw)),
+        chunk(b'IEND', b'')])
+
+def heat_rows(heats, x_scale, y_scale):
+    '''
+    Returns rgb rows of the heats, which are indexed by x and then y.  The
+    first row is for the highest y.
+    '''
+    values = [heat for column in heats for heat in column]
+    lowest = min(values)
+    highest = max(values)
+    heat_unit = (highest - lowest) / 255.0
+    rows = []
+    for y in reversed(range(len(heats[0]))):
+        row = bytearray()
+        for column in heats:
+            if heat_unit == 0:
+                level = 0
+            else:
+                level = min(int((column[y] - lowest) / heat_unit), 255)
+            row += bytes(palette[level] * x_scale)
+        rows += [row] * y_scale
+    return rows
+
+def tick_labels(value_range, nr_ticks):
+    return [(float(i) / (nr_ticks - 1),
+        '%d' % (value_range[0] + (value_range[1] - value_range[0]) * i /
+            (nr_ticks - 1))) for i in range(nr_ticks)]
+
+def x_tick_labels(value_range, plot_width):
+    '''Returns tick labels for x axis, which don't overlap each other'''
+    for nr in [nr_ticks, 3]:
+        ticks = tick_labels(value_range, nr)
+        label_width = max([len(label) for fraction, label in ticks])
+        if plot_width / (nr - 1) > (label_width + 1) * char_width:
+            return ticks
+    return tick_labels(value_range, 2)
+
+class Layout:
+    '''Positions of the heatmap image components'''
+    x_ticks = None
+    y_ticks = None
+    colorbar_ticks = None
+    plot_x = None
+    plot_y = None
+    plot_width = None
+    plot_height = None
+    x_scale = None
+    y_scale = None
+    colorbar_x = None
+    width = None
+    height = None
+
+    def __init__(self, heats, x_range, y_range):
+        self.y_ticks = tick_labels(y_range, nr_ticks)
+        values = [heat for column in heats for heat in column]
+        self.colorbar_ticks = [(fraction, '%.3g' % (
+            min(values) + (max(values) - min(values)) * fraction))
+            for fraction in [0.0, 0.5, 1.0]]
+
+        self.x_scale = max(int(math.ceil(float(min_plot_sz) / len(heats))),
+                           1)
+        self.y_scale = max(int(math.ceil(float(min_plot_sz) / len(heats[0]))),
+                           1)
+        self.plot_width = len(heats) * self.x_scale
+        self.plot_height = len(heats[0]) * self.y_scale
+        self.x_ticks = x_tick_labels(x_range, self.plot_width)
+
+        y_label_width = max([len(label) for fraction, label in self.y_ticks])
+        self.plot_x = (margin + char_height + margin +
+                y_label_width * char_width + tick_len)
+        self.plot_y = margin + char_height
+        self.colorbar_x = self.plot_x + self.plot_width + margin * 2
+        cb_label_width = max([len(label)
+            for fraction, label in self.colorbar_ticks])
+        self.width = (self.colorbar_x + colorbar_width + tick_len +
+                cb_label_width * char_width + margin)
+        self.height = (self.plot_y + self.plot_height + tick_len + margin +
+                char_height + margin + char_height + margin)
+
+    def x_tick_pos(self, fraction):
+        return self.plot_x + min(int(round(fraction * self.plot_width)),
+                                 self.plot_width - 1)
+
+    def y_tick_pos(self, fraction):
+        return self.plot_y + self.plot_height - 1 - min(
+                int(round(fraction * self.plot_height)), self.plot_height - 1)
+
+def png_heatmap(heats, x_range, y_range, x_label, y_label):
+    layout = Layout(heats, x_range, y_range)
+    canvas = Canvas(layout.width, layout.height)
+
+    for idx, row in enumerate(heat_rows(heats, layout.x_scale,
+                                        layout.y_scale)):
+        canvas.rows[layout.plot_y + idx][layout.plot_x * 3:
+                (layout.plot_x + layout.plot_width) * 3] = row
+    # frame
+    for x, y, width, height in [
+            [layout.plot_x - 1, layout.plot_y - 1, layout.plot_width + 2, 1],
+            [layout.plot_x - 1, layout.plot_y + layout.plot_height,
+                layout.plot_width + 2, 1],
+            [layout.plot_x - 1, layout.plot_y, 1, layout.plot_height],
+            [layout.plot_x + layout.plot_width, layout.plot_y, 1,
+                layout.plot_height]]:
+        canvas.fill(x, y, width, height, black)
+
+    bottom = layout.plot_y + layout.plot_height + 1
+    for fraction, label in layout.x_ticks:
+        x = layout.x_tick_pos(fraction)
+        canvas.fill(x, bottom, 1, tick_len, black)
+        canvas.text(min(max(x - len(label) * char_width // 2, 0),
+                        layout.width - len(label) * char_width),
+                    bottom + tick_len + margin // 2, label)
+    canvas.text(layout.plot_x + (layout.plot_width -
+                                 len(x_label) * char_width) // 2,
+                layout.height - margin - char_height, x_label)
+
+    for fraction, label in layout.y_ticks:
+        y = layout.y_tick_pos(fraction)
+        canvas.fill(layout.plot_x - 1 - tick_len, y, tick_len, 1, black)
+        canvas.text(layout.plot_x - 1 - tick_len - 2 -
+                    len(label) * char_width, y - char_height // 2, label)
+    canvas.text(margin, layout.plot_y + (layout.plot_height +
+                                         len(y_label) * char_width) // 2,
+                y_label, vertical=True)
+
+    for idx in range(layout.plot_height):
+        level = 255 - idx * 256 // layout.plot_height
+        canvas.fill(layout.colorbar_x, layout.plot_y + idx, colorbar_width, 1,
+                    palette[level])
+    for fraction, label in layout.colorbar_ticks:
+        y = layout.y_tick_pos(fraction)
+        x = layout.colorbar_x + colorbar_width
+        canvas.fill(x, y, tick_len, 1, black)
+        canvas.text(x + tick_len + 2, y - char_height // 2, label)
+    return png_bytes(canvas.width, canvas.height, canvas.rows)
+
+def svg_heatmap(heats, x_range, y_range, x_label, y_label):
+    layout = Layout(heats, x_range, y_range)
+    plot_png = base64.b64encode(png_bytes(len(heats), len(heats[0]),
+        heat_rows(heats, 1, 1))).decode()
+    colorbar_png = base64.b64encode(png_bytes(1, 256,
+        [bytes(palette[level]) for level in reversed(range(256))])).decode()
+
+    lines = ['<?xml version="1.0" encoding="utf-8"?>',
+            '<svg xmlns="http://www.w3.org/2000/svg" '
+            'xmlns:xlink="http://www.w3.org/1999/xlink" '
+            'width="%d" height="%d" font-family="sans-serif" '
+            'font-size="%d">' % (layout.width, layout.height, char_height + 2),
+            '<rect width="100%" height="100%" fill="white"/>']
+    for x, width, data in [
+            [layout.plot_x, layout.plot_width, plot_png],
+            [layout.colorbar_x, colorbar_width, colorbar_png]]:
+        lines.append('<image x="%d" y="%d" width="%d" height="%d" '
+                'preserveAspectRatio="none" '
+                'style="image-rendering:pixelated" '
+                'xlink:href="data:image/png;base64,%s"/>' % (x, layout.plot_y,
+                    width, layout.plot_height, data))
+    lines.append('<rect x="%d" y="%d" width="%d" height="%d" fill="none" '
+            'stroke="black"/>' % (layout.plot_x, layout.plot_y,
+                layout.plot_width, layout.plot_height))
+
+    bottom = layout.plot_y + layout.plot_height
+    for fraction, label in layout.x_ticks:
+        x = layout.x_tick_pos(fraction)
+        lines.append('<line x1="%d" y1="%d" x2="%d" y2="%d" stroke="black"/>'
+                % (x, bottom, x, bottom + tick_len))
+        lines.append('<text x="%d" y="%d" text-anchor="middle">%s</text>' %
+                (x, bottom + tick_len + margin // 2 + char_height, label))
+    lines.append('<text x="%d" y="%d" text-anchor="middle">%s</text>' % (
+        layout.plot_x + layout.plot_width // 2, layout.height - margin,
+        x_label))
+
+    for fraction, label in layout.y_ticks:
+        y = layout.y_tick_pos(fraction)
+        lines.append('<line x1="%d" y1="%d" x2="%d" y2="%d" stroke="black"/>'
+                % (layout.plot_x - tick_len, y, layout.plot_x, y))
+        lines.append('<text x="%d" y="%d" text-anchor="end" '
+                'dominant-baseline="middle">%s</text>' %
+                (layout.plot_x - tick_len - 2, y, label))
+    y = layout.plot_y + layout.plot_height // 2
+    lines.append('<text x="%d" y="%d" text-anchor="middle" '
+            'transform="rotate(-90 %d %d)">%s</text>' % (
+                margin + char_height, y, margin + char_height, y, y_label))
+
+    x = layout.colorbar_x + colorbar_width
+    for fraction, label in layout.colorbar_ticks:
+        y = layout.y_tick_pos(fraction)
+        lines.append('<line x1="%d" y1="%d" x2="%d" y2="%d" stroke="black"/>'
+                % (x, y, x + tick_len, y))
+        lines.append('<text x="%d" y="%d" dominant-baseline="middle">%s'
+                '</text>' % (x + tick_len + 2, y, label))
+    lines.append('</svg>')
+    return ('\n'.join(lines) + '\n').encode()
+
+image_formats = {'png': png_heatmap, 'svg': svg_heatmap}
+
+def write_heatmap(output_file, heats, x_range, y_range, x_label, y_label):
+    '''
+    Write the heatmap image of the heats, which are indexed by x and then y,
+    to output_file.  The format is decided by the extension of the file.
+    Returns an error or None.
+    '''
+    image_format = output_file.split('.')[-1]
+    if not image_format in image_formats:
+        return 'unsupported image format (%s)' % image_format
+    if len(heats) == 0 or len(heats[0]) == 0:
+        return 'no heat to plot'
+    image = image_formats[image_format](heats, x_range, y_range, x_label,
+                                        y_label)
+    try:
+        with open(output_file, 'wb') as f:
+            f.write(image)
+    except Exception as e:
+        return 'writing %s failed (%s)' % (output_file, e)
+    return None
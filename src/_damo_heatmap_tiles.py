@@ -0,0 +1,423 @@
+# SPDX-License-Identifier: GPL-2.0
+
+"""
+Multi-resolution pyramid of heatmap tiles.
+
+The address space of a record can be sparse, e.g., that of a virtual address
+space has huge gaps between the heap and the stack.  Hence the tiles are made
+for each of the contiguous address ranges of each record.  The ranges are the
+address ranges that any snapshot has regions in, split by up to
+'max_nr_addr_ranges - 1' biggest gaps.
+
+For each address range of each record, the whole recorded time and the address
+range are split into 2^level x 2^level cells for each level from zero to
+'nr_levels - 1'.  Each cell has the heat (nr_accesses * time * bytes) of the
+time and address range, and four cells of a level sum up to one cell of the
+upper level.  Cells of each level are stored in tiles of up to
+'tile_nr_cells' x 'tile_nr_cells' cells.
+
+A heatmap of any time and address ranges and resolution is assembled from the
+level having the biggest cells that are not bigger than the heatmap pixels,
+for each address range that the heatmap overlaps, assuming the heat is evenly
+distributed within each cell.  Hence only a constant number of cells and
+tiles are read for any zoom level.
+
+tiles file format
+
+header:         magic, version (u32), metadata length (u32)
+metadata:       json having the record file size, the number of levels and
+                cells of each tile, and target id, time range, and the address
+                ranges and the offsets of their tile tables of each record
+tile table:     offset (i64) and length (i64) of each tile of the address
+                range, from level zero, in row-major order in each level
+tile:           zlib-compressed heats (f64) of the cells in row-major order
+
+The offsets are from the end of the metadata.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import struct
+import zlib
+
+import damo_record_info
+
+tiles_magic = b'DAMOTILE'
+tiles_version = 2
+tiles_header = struct.Struct('<8sII')
+tiles_table_entry = struct.Struct('<qq')
+nr_levels = 11
+tile_nr_cells = 64
+max_nr_addr_ranges = 8
+
+def tiles_path(record_file):
+    return '%s.heatmap_tiles' % record_file
+
+def boundaries(value_range, nr_cells):
+    bounds = [value_range[0] + float(value_range[1] - value_range[0]) * i /
+              nr_cells for i in range(nr_cells + 1)]
+    bounds[-1] = value_range[1]
+    return bounds
+
+def heats_of_cells(slope_changes, bounds):
+    '''
+    Returns heats of the cells between the boundaries, for heat per byte that
+    changes by slope_changes ({address: change}) at each address.
+    '''
+    nr_cells = len(bounds) - 1
+    heats = [0.0] * nr_cells
+    cell = 0
+    slope = 0.0
+    last_addr = bounds[0]
+    for addr, change in sorted(slope_changes.items()):
+        addr = min(max(addr, bounds[0]), bounds[-1])
+        while cell < nr_cells and bounds[cell + 1] <= addr:
+            heats[cell] += slope * (bounds[cell + 1] - last_addr)
+            last_addr = bounds[cell + 1]
+            cell += 1
+        if cell < nr_cells:
+            heats[cell] += slope * (addr - last_addr)
+        last_addr = addr
+        slope += change
+    return heats
+
+def finest_cells(snapshots, time_range, addr_range, nr_cells):
+    '''Returns heats of nr_cells x nr_cells cells of the snapshots'''
+    time_bounds = boundaries(time_range, nr_cells)
+    addr_bounds = boundaries(addr_range, nr_cells)
+    cells = [[0.0] * nr_cells for i in range(nr_cells)]
+    # slope changes of time cells that more snapshots could be added to
+    pending = {}
+    for snapshot in snapshots:
+        if snapshot.start_time is None:
+            continue
+        start = max(snapshot.start_time, time_range[0])
+        end = min(snapshot.end_time, time_range[1])
+        tidx = min(max(bisect.bisect_right(time_bounds, start) - 1, 0),
+                   nr_cells - 1)
+        for idx in [i for i in pending if i < tidx]:
+            cells[idx] = heats_of_cells(pending.pop(idx), addr_bounds)
+        if start >= end:
+            continue
+        fields = damo_record_info.region_fields_of(snapshot)
+        while tidx < nr_cells and time_bounds[tidx] < end:
+            duration = (min(end, time_bounds[tidx + 1]) -
+                        max(start, time_bounds[tidx]))
+            if duration > 0:
+                changes = pending.setdefault(tidx, {})
+                for rstart, rend, nr_accesses in fields:
+                    if not nr_accesses:
+                        continue
+                    weight = nr_accesses * duration
+                    changes[rstart] = changes.get(rstart, 0) + weight
+                    changes[rend] = changes.get(rend, 0) - weight
+            tidx += 1
+    for idx, changes in pending.items():
+        cells[idx] = heats_of_cells(changes, addr_bounds)
+    return cells
+
+def upper_level_cells(cells):
+    nr_cells = len(cells) // 2
+    return [[cells[i * 2][j * 2] + cells[i * 2][j * 2 + 1] +
+             cells[i * 2 + 1][j * 2] + cells[i * 2 + 1][j * 2 + 1]
+             for j in range(nr_cells)] for i in range(nr_cells)]
+
+def level_tiles(cells):
+    '''Returns compressed tiles of the cells of a level'''
+    tile_cells = min(tile_nr_cells, len(cells))
+    nr_tiles = len(cells) // tile_cells
+    tile_fmt = '<%dd' % (tile_cells * tile_cells)
+    tiles = []
+    for ti in range(nr_tiles):
+        rows = cells[ti * tile_cells:(ti + 1) * tile_cells]
+        for ta in range(nr_tiles):
+            heats = []
+            for row in rows:
+                heats += row[ta * tile_cells:(ta + 1) * tile_cells]
+            tiles.append(zlib.compress(struct.pack(tile_fmt, *heats)))
+    return tiles
+
+def merged_ranges(ranges):
+    '''Returns sorted list of ranges that overlapping ones are merged'''
+    merged = []
+    for start, end in sorted(ranges):
+        if len(merged) > 0 and merged[-1][1] >= start:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def record_ranges(record):
+    '''Returns time range and address ranges of the record, or None, None'''
+    time_range = None
+    spans = []
+    for snapshot in record.snapshots:
+        if snapshot.start_time is None:
+            continue
+        if time_range is None:
+            time_range = [snapshot.start_time, snapshot.end_time]
+        time_range = [min(time_range[0], snapshot.start_time),
+                      max(time_range[1], snapshot.end_time)]
+        fields = damo_record_info.region_fields_of(snapshot)
+        spans = merged_ranges(spans + merged_ranges(
+            [[start, end] for start, end, nr_accesses in fields]))
+    if (time_range is None or len(spans) == 0 or
+            time_range[0] >= time_range[1]):
+        return None, None
+
+    gaps = sorted([[spans[i][1], spans[i + 1][0]]
+                   for i in range(len(spans) - 1)],
+                  key=lambda gap: gap[1] - gap[0], reverse=True)
+    addr_ranges = [[spans[0][0]]]
+    for gap in sorted(gaps[:max_nr_addr_ranges - 1]):
+        addr_ranges[-1].append(gap[0])
+        addr_ranges.append([gap[1]])
+    addr_ranges[-1].append(spans[-1][1])
+    return time_range, addr_ranges
+
+def pyramid_tiles(snapshots, time_range, addr_range):
+    '''Returns compressed tiles of all levels for the ranges'''
+    cells = finest_cells(snapshots, time_range, addr_range,
+                         2 ** (nr_levels - 1))
+    levels = [cells]
+    while len(levels[0]) > 1:
+        levels.insert(0, upper_level_cells(levels[0]))
+    tiles = []
+    for cells in levels:
+        tiles += level_tiles(cells)
+    return tiles
+
+def write_tiles(records, record_file, file_permission):
+    '''Build tiles of the records of record_file.  Returns an error or None'''
+    targets = []
+    tables = []
+    tiles = []
+    offset = 0
+    for record in records:
+        time_range, addr_ranges = record_ranges(record)
+        if time_range is None:
+            continue
+        pyramids = []
+        for addr_range in addr_ranges:
+            range_tiles = pyramid_tiles(record.snapshots, time_range,
+                                        addr_range)
+            pyramids.append({'addr_range': addr_range,
+                             'table_offset': offset})
+            offset += tiles_table_entry.size * len(range_tiles)
+            tables.append(range_tiles)
+        targets.append({'target_id': record.target_id,
+                        'time_range': time_range, 'pyramids': pyramids})
+
+    for range_tiles in tables:
+        table = []
+        for tile in range_tiles:
+            table.append(tiles_table_entry.pack(offset, len(tile)))
+            offset += len(tile)
+        tiles.append(b''.join(table))
+    for range_tiles in tables:
+        tiles += range_tiles
+
+    metadata = json.dumps({
+        'record_file_size': os.path.getsize(record_file),
+        'record_file_mtime': os.path.getmtime(record_file),
+        'nr_levels': nr_levels, 'tile_nr_cells': tile_nr_cells,
+        'targets': targets}).encode()
+    path = tiles_path(record_file)
+    try:
+        with open(path, 'wb') as f:
+            f.write(tiles_header.pack(tiles_magic, tiles_version,
+                                      len(metadata)))
+            f.write(metadata)
+            for data in tiles:
+                f.write(data)
+    except Exception as e:
+        return 'writing %s failed (%s)' % (path, e)
+    if file_permission is not None:
+        os.chmod(path, file_permission)
+    return None
+
+class HeatmapTiles:
+    '''Tiles file of a record file, read only the used tiles'''
+    buf = None
+    base_offset = None
+    nr_levels = None
+    tile_nr_cells = None
+    targets = None
+    cached_tiles = None
+
+    def __init__(self, buf, metadata, base_offset):
+        self.buf = buf
+        self.base_offset = base_offset
+        self.nr_levels = metadata['nr_levels']
+        self.tile_nr_cells = metadata['tile_nr_cells']
+        self.targets = metadata['targets']
+        self.cached_tiles = {}
+
+    def first_tile_idx(self, level):
+        idx = 0
+        for l in range(level):
+            nr_tiles = 2 ** l // min(self.tile_nr_cells, 2 ** l)
+            idx += nr_tiles * nr_tiles
+        return idx
+
+    def tile(self, pyramid, level, ti, ta):
+        key = (pyramid['table_offset'], level, ti, ta)
+        if key in self.cached_tiles:
+            return self.cached_tiles[key]
+        tile_cells = min(self.tile_nr_cells, 2 ** level)
+        nr_tiles = 2 ** level // tile_cells
+        table_offset = (self.base_offset + pyramid['table_offset'] +
+                        tiles_table_entry.size * (
+                            self.first_tile_idx(level) + ti * nr_tiles + ta))
+        offset, length = tiles_table_entry.unpack_from(self.buf, table_offset)
+        offset += self.base_offset
+        heats = struct.unpack('<%dd' % (tile_cells * tile_cells),
+                              zlib.decompress(self.buf[offset:offset + length]))
+        self.cached_tiles[key] = heats
+        return heats
+
+    def cell(self, pyramid, level, tidx, aidx):
+        tile_cells = min(self.tile_nr_cells, 2 ** level)
+        heats = self.tile(pyramid, level, tidx // tile_cells,
+                          aidx // tile_cells)
+        return heats[(tidx % tile_cells) * tile_cells + aidx % tile_cells]
+
+    def view_level(self, full_time_range, pyramid, time_range, addr_range,
+                   resols):
+        '''
+        Returns the level of the pyramid having the biggest cells that are not
+        bigger than pixels of the view, or None if even the last level is too
+        coarse
+        '''
+        level = 0
+        for view_range, resol, full_range in [
+                [time_range, resols[0], full_time_range],
+                [addr_range, resols[1], pyramid['addr_range']]]:
+            pixel_sz = float(view_range[1] - view_range[0]) / resol
+            full_sz = full_range[1] - full_range[0]
+            while full_sz / 2 ** level > pixel_sz:
+                level += 1
+        if level >= self.nr_levels:
+            return None
+        return level
+
+    def add_pyramid_heats(self, heats, full_time_range, pyramid, time_range,
+                          addr_range, resols):
+        '''
+        Add heats of the view from the pyramid to heats.  Returns False if the
+        tiles are too coarse for the view, True otherwise.
+        '''
+        level = self.view_level(full_time_range, pyramid, time_range,
+                                addr_range, resols)
+        if level is None:
+            return False
+        time_weights = axis_weights(time_range, resols[0], full_time_range,
+                                    2 ** level)
+        addr_weights = axis_weights(addr_range, resols[1],
+                                    pyramid['addr_range'], 2 ** level)
+        pixel_sz = (float(time_range[1] - time_range[0]) / resols[0] *
+                    float(addr_range[1] - addr_range[0]) / resols[1])
+        aidxs = sorted(set([aidx for weights in addr_weights
+                            for aidx, fraction in weights]))
+        positions = {aidx: pos for pos, aidx in enumerate(aidxs)}
+        addr_weights = [[(positions[aidx], fraction)
+                         for aidx, fraction in weights]
+                        for weights in addr_weights]
+        cell_rows = {}
+        for heats_row, weights in zip(heats, time_weights):
+            # heats of the cells in the pixels row, for each address cell
+            row = [0.0] * len(aidxs)
+            for tidx, time_fraction in weights:
+                if not tidx in cell_rows:
+                    cell_rows[tidx] = [self.cell(pyramid, level, tidx, aidx)
+                                       for aidx in aidxs]
+                for pos, heat in enumerate(cell_rows[tidx]):
+                    row[pos] += time_fraction * heat
+            for idx, pixel_weights in enumerate(addr_weights):
+                heats_row[idx] += sum([row[pos] * fraction
+                                       for pos, fraction in pixel_weights]
+                                      ) / pixel_sz
+        return True
+
+    def heats(self, target_idx, time_range, addr_range, resols):
+        '''
+        Returns resols[0] x resols[1] heats of the view, or None if the tiles
+        are too coarse for the view
+        '''
+        target = self.targets[target_idx]
+        heats = [[0.0] * resols[1] for i in range(resols[0])]
+        for pyramid in target['pyramids']:
+            start, end = pyramid['addr_range']
+            # the pyramid is out of the view
+            if end <= addr_range[0] or addr_range[1] <= start:
+                continue
+            if not self.add_pyramid_heats(heats, target['time_range'],
+                                          pyramid, time_range, addr_range,
+                                          resols):
+                return None
+        return heats
+
+    def target_heats(self, target_id, time_range, addr_range, resols):
+        '''
+        Returns list of heats of the view for each record of the target, or
+        None if the tiles cannot make it
+        '''
+        heats_list = []
+        for idx, target in enumerate(self.targets):
+            if target['target_id'] != target_id:
+                continue
+            heats = self.heats(idx, time_range, addr_range, resols)
+            if heats is None:
+                return None
+            heats_list.append(heats)
+        if len(heats_list) == 0:
+            return None
+        return heats_list
+
+def axis_weights(view_range, resol, full_range, nr_cells):
+    '''
+    Returns list of (cell index, fraction of the cell in the pixel) of each
+    pixel of an axis
+    '''
+    pixel_sz = float(view_range[1] - view_range[0]) / resol
+    cell_sz = float(full_range[1] - full_range[0]) / nr_cells
+    weights = []
+    for i in range(resol):
+        pixel_start = view_range[0] + i * pixel_sz
+        pixel_end = pixel_start + pixel_sz
+        first = max(int((pixel_start - full_range[0]) // cell_sz), 0)
+        last = min(int((pixel_end - full_range[0]) // cell_sz), nr_cells - 1)
+        pixel_weights = []
+        for idx in range(first, last + 1):
+            cell_start = full_range[0] + idx * cell_sz
+            overlap = (min(pixel_end, cell_start + cell_sz) -
+                       max(pixel_start, cell_start))
+            if overlap > 0:
+                pixel_weights.append((idx, overlap / cell_sz))
+        weights.append(pixel_weights)
+    return weights
+
+def read_tiles(record_file):
+    '''
+    Returns HeatmapTiles of the record file, or None if the tiles file doesn't
+    exist or is not for the current record file
+    '''
+    path = tiles_path(record_file)
+    if not os.path.isfile(path) or not os.path.isfile(record_file):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, metadata_len = tiles_header.unpack_from(buf, 0)
+        if magic != tiles_magic or version != tiles_version:
+            return None
+        metadata = json.loads(
+                buf[tiles_header.size:tiles_header.size + metadata_len])
+    except:
+        return None
+    if (metadata['record_file_size'] != os.path.getsize(record_file) or
+            metadata['record_file_mtime'] != os.path.getmtime(record_file)):
+        return None
+    return HeatmapTiles(buf, metadata, tiles_header.size + metadata_len)
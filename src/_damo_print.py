@@ -2,6 +2,7 @@
 
 import os
 import subprocess
+import sys
 import tempfile
 
 def pr_with_pager_if_needed(text):
@@ -18,3 +19,46 @@ def pr_with_pager_if_needed(text):
         f.write(text)
     subprocess.call(['less', '--RAW-CONTROL-CHARS', '--no-init', tmp_path])
     os.remove(tmp_path)
+
+def write_texts(f, buffered, texts):
+    f.write('\n'.join(buffered))
+    for text in texts:
+        f.write('\n%s' % text)
+
+def pr_texts_with_pager_if_needed(texts):
+    '''
+    Print the texts joined by newlines, each as soon as it is given.  Once
+    the output exceeds the terminal, the texts are piped to a pager.
+    '''
+    try:
+        nr_terminal_lines = os.get_terminal_size().lines
+    except:
+        nr_terminal_lines = 50
+    buffered = []
+    nr_lines = 0
+    texts = iter(texts)
+    for text in texts:
+        buffered.append(text)
+        nr_lines += text.count('\n') + 1
+        # same to pr_with_pager_if_needed('\n'.join(texts))
+        if nr_lines - 1 > nr_terminal_lines:
+            break
+    else:
+        if len(buffered) > 0:
+            print('\n'.join(buffered))
+        return
+
+    # like 'less' of pr_with_pager_if_needed(), add no trailing newline
+    if not sys.stdout.isatty():
+        write_texts(sys.stdout, buffered, texts)
+        return
+
+    pager = subprocess.Popen(['less', '--RAW-CONTROL-CHARS', '--no-init'],
+                             stdin=subprocess.PIPE, universal_newlines=True)
+    try:
+        write_texts(pager.stdin, buffered, texts)
+        pager.stdin.close()
+    except BrokenPipeError:
+        # user quit from the pager
+        pass
+    pager.wait()
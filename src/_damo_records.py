@@ -1,11 +1,17 @@
 # SPDX-License-Identifier: GPL-2.0
 
+import bisect
 import collections
+import concurrent.futures
 import copy
+import hashlib
 import json
+import mmap
 import os
 import random
+import select
 import signal
+import struct
 import subprocess
 import time
 import zlib
@@ -93,7 +99,7 @@ class DamonRecord:
 
         return record
 
-    def to_kvpairs(self, raw=False):
+    def to_kvpairs(self, raw=False, include_snapshots=True):
         ordered_dict = collections.OrderedDict()
         ordered_dict['kdamond_idx'] = self.kdamond_idx
         ordered_dict['context_idx'] = self.context_idx
@@ -101,7 +107,9 @@ class DamonRecord:
                 if self.intervals is not None else None)
         ordered_dict['scheme_idx'] = self.scheme_idx
         ordered_dict['target_id'] = self.target_id
-        ordered_dict['snapshots'] = [s.to_kvpairs(raw) for s in self.snapshots]
+        if include_snapshots:
+            ordered_dict['snapshots'] = [s.to_kvpairs(raw)
+                                         for s in self.snapshots]
         return ordered_dict
 
     def can_merge(self, other):
@@ -116,6 +124,33 @@ class DamonRecord:
         self.snapshots += other.snapshots
         self.snapshots.sort(key=lambda s: s.start_time)
 
+def records_json_texts(records, raw):
+    '''
+    Yield texts that make json.dumps() of the records' kvpairs list with
+    indent=4 when joined by newlines, one snapshot at a time.
+    '''
+    if len(records) == 0:
+        yield '[]'
+        return
+    yield '['
+    for ridx, record in enumerate(records):
+        # json.dumps() escapes newlines in strings, so indenting is safe
+        head = json.dumps(record.to_kvpairs(raw, include_snapshots=False),
+                          indent=4)
+        head = '    ' + head[:-len('\n}')].replace('\n', '\n    ')
+        if len(record.snapshots) == 0:
+            yield '%s,\n        "snapshots": []\n    }%s' % (
+                    head, ',' if ridx < len(records) - 1 else '')
+            continue
+        yield '%s,\n        "snapshots": [' % head
+        for sidx, snapshot in enumerate(record.snapshots):
+            text = json.dumps(snapshot.to_kvpairs(raw), indent=4)
+            yield '            %s%s' % (text.replace('\n', '\n            '),
+                                      ',' if sidx < len(record.snapshots) - 1
+                                      else '')
+        yield '        ]\n    }%s' % (',' if ridx < len(records) - 1 else '')
+    yield ']'
+
 # for monitoring results manipulation
 
 def merge_records(records):
@@ -134,34 +169,51 @@ def merge_records(records):
 def regions_intersect(r1, r2):
     return not (r1.end <= r2.start or r2.end <= r1.start)
 
-def add_region(regions, region, nr_acc_to_add):
-    for r in regions:
-        if regions_intersect(r, region):
-            if not r in nr_acc_to_add:
-                nr_acc_to_add[r] = 0
-            nr_acc_to_add[r] = max(nr_acc_to_add[r],
-                    region.nr_accesses.samples)
-
-            new_regions = []
-            if region.start < r.start:
-                new_regions.append(_damon.DamonRegion(
-                    region.start, r.start,
-                    region.nr_accesses.samples, _damon.unit_samples,
-                    region.age.aggr_intervals, _damon.unit_aggr_intervals))
-            if r.end < region.end:
-                new_regions.append(_damon.DamonRegion(
-                        r.end, region.end,
-                        region.nr_accesses.samples, _damon.unit_samples,
-                        region.age.aggr_intervals,
-                        _damon.unit_aggr_intervals))
-
-            for new_r in new_regions:
-                add_region(regions, new_r, nr_acc_to_add)
-            return
-    regions.append(region)
+def add_region(regions, sorted_regions, sorted_ends, region, nr_acc_to_add):
+    '''
+    Add parts of 'region' that are not intersecting with existing regions to
+    'regions', and update 'nr_acc_to_add' for the intersecting existing
+    regions.  'sorted_regions' is the existing regions sorted by address, and
+    'sorted_ends' is the end addresses of those.
+    '''
+    idx = bisect.bisect_right(sorted_ends, region.start)
+    if (idx == len(sorted_regions) or
+            not regions_intersect(sorted_regions[idx], region)):
+        regions.append(region)
+        sorted_regions.insert(idx, region)
+        sorted_ends.insert(idx, region.end)
+        return
+
+    new_regions = []
+    start = region.start
+    while (idx < len(sorted_regions) and
+           sorted_regions[idx].start < region.end):
+        r = sorted_regions[idx]
+        if not r in nr_acc_to_add:
+            nr_acc_to_add[r] = 0
+        nr_acc_to_add[r] = max(nr_acc_to_add[r], region.nr_accesses.samples)
+        if start < r.start:
+            new_regions.append([start, r.start])
+        start = max(start, r.end)
+        idx += 1
+    if start < region.end:
+        new_regions.append([start, region.end])
+
+    for start, end in new_regions:
+        new_r = _damon.DamonRegion(start, end,
+                region.nr_accesses.samples, _damon.unit_samples,
+                region.age.aggr_intervals, _damon.unit_aggr_intervals)
+        regions.append(new_r)
+        idx = bisect.bisect_right(sorted_ends, start)
+        sorted_regions.insert(idx, new_r)
+        sorted_ends.insert(idx, end)
 
 def aggregate_snapshots(snapshots):
     new_regions = []
+    # new_regions sorted by address, and their end addresses, for fast lookup
+    # of intersecting regions.
+    sorted_regions = []
+    sorted_ends = []
     for snapshot in snapshots:
         # Suppose the first snapshot has a region 1-10:5, and the second
         # snapshot has two regions, 1-5:2, 5-10: 4.  Aggregated snapshot should
@@ -169,11 +221,10 @@ def aggregate_snapshots(snapshots):
         # intersecting regions.  nr_acc_to_add contains the information.
         nr_acc_to_add = {}
         for region in snapshot.regions:
-            add_region(new_regions, region, nr_acc_to_add)
+            add_region(new_regions, sorted_regions, sorted_ends, region,
+                       nr_acc_to_add)
         for region in nr_acc_to_add:
             region.nr_accesses.samples += nr_acc_to_add[region]
-            region.nr_accesses.val = region.nr_accesses.samples
-            region.nr_accesses.unit = _damon.unit_samples
 
     new_snapshot = DamonSnapshot(snapshots[0].start_time,
             snapshots[-1].end_time, new_regions, None)
@@ -197,11 +248,76 @@ def adjust_records(records, aggregate_interval, nr_snapshots_to_skip):
         record.snapshots = adjusted_snapshots(
                 record.snapshots[nr_snapshots_to_skip:], aggregate_interval)
 
+# For analyzing records in a single pass
+
+class SnapshotsConsumer:
+    '''
+    An analysis of records that consumes each snapshot of the records once.
+    Multiple consumers can share one pass via analyze_records().
+    '''
+    def add_snapshot(self, record, snapshot):
+        pass
+
+    def finish(self):
+        pass
+
+class AdjustedSnapshotsConsumer(SnapshotsConsumer):
+    '''
+    Feeds snapshots that adjust_records() would make to the consumers,
+    without changing the records.
+    '''
+    consumers = None
+    aggregate_interval = None
+    nr_snapshots_to_skip = None
+    nr_skipped = None   # {record: number of skipped snapshots}
+    to_aggregate = None # {record: snapshots to aggregate}
+
+    def __init__(self, consumers, aggregate_interval, nr_snapshots_to_skip):
+        self.consumers = consumers
+        self.aggregate_interval = aggregate_interval
+        self.nr_snapshots_to_skip = nr_snapshots_to_skip
+        self.nr_skipped = {}
+        self.to_aggregate = {}
+
+    def add_snapshot(self, record, snapshot):
+        nr_skipped = self.nr_skipped.get(record, 0)
+        if nr_skipped < self.nr_snapshots_to_skip:
+            self.nr_skipped[record] = nr_skipped + 1
+            return
+        to_aggregate = self.to_aggregate.setdefault(record, [])
+        to_aggregate.append(snapshot)
+        interval_ns = to_aggregate[-1].end_time - to_aggregate[0].start_time
+        if interval_ns < self.aggregate_interval * 1000:
+            return
+        self.to_aggregate[record] = []
+        # aggregation of a single snapshot makes the same regions
+        if len(to_aggregate) > 1:
+            snapshot = aggregate_snapshots(to_aggregate)
+        for consumer in self.consumers:
+            consumer.add_snapshot(record, snapshot)
+
+    def finish(self):
+        for consumer in self.consumers:
+            consumer.finish()
+
+def analyze_records(records, consumers):
+    '''Feed each snapshot of the records to all the consumers in one pass'''
+    for record in records:
+        for snapshot in record.snapshots:
+            for consumer in consumers:
+                consumer.add_snapshot(record, snapshot)
+    for consumer in consumers:
+        consumer.finish()
+
 # For reading monitoring results from a file
 
 # if number of snapshots is one and the file type is record or perf script,
 # write_damon_records() adds a fake snapshot for snapshot start time deduction.
 def is_fake_snapshot(snapshot):
+    if isinstance(snapshot, ColumnarSnapshot) and \
+            not snapshot.regions_loaded():
+        return (snapshot.nr_regions == 1 and
+                list(snapshot.region_fields()) == [(0, 0, -1, -1)])
     if len(snapshot.regions) != 1:
         return False
     r = snapshot.regions[0]
@@ -310,39 +426,465 @@ def parse_perf_script_line(line):
     else:
         return None, None, None, None
 
-def parse_perf_script(script_output, monitoring_intervals):
-    records = []
-    snapshot = None
+def perf_script_raw_snapshots(lines):
+    '''
+    Parse given perf script output lines and yield (target_id, DamonSnapshot,
+    completed) tuples as soon as each snapshot is completely read, in the
+    order.  The start time of the snapshots are not set.  The snapshots that
+    are cut at the end of the lines are yielded at the end with 'completed'
+    False.
+    '''
+    return trace_events_raw_snapshots(
+            (parse_perf_script_line(line) for line in lines))
 
-    for line in script_output.split('\n'):
-        region, end_time, target_id, nr_regions = parse_perf_script_line(line)
+def trace_events_raw_snapshots(events):
+    '''
+    Same to perf_script_raw_snapshots(), but receives (region, end_time,
+    target_id, nr_regions) tuples of the trace events instead of the lines.
+    '''
+    building_snapshots = {}
+    for region, end_time, target_id, nr_regions in events:
         if region is None:
             continue
 
-        record = record_of(target_id, records, monitoring_intervals)
-        if len(record.snapshots) == 0:
-            start_time = None
-        else:
-            start_time = record.snapshots[-1].end_time
-            if start_time > end_time:
-                return None, 'trace is not time-sorted'
-
+        snapshot = building_snapshots.get(target_id)
         if snapshot is None:
-            snapshot = DamonSnapshot(start_time, end_time, [], None)
-            record.snapshots.append(snapshot)
-        snapshot = record.snapshots[-1]
+            snapshot = DamonSnapshot(None, end_time, [], 0)
+            building_snapshots[target_id] = snapshot
         snapshot.regions.append(region)
+        if len(snapshot.regions) < nr_regions:
+            continue
 
-        if len(snapshot.regions) == nr_regions:
-            snapshot = None
+        del building_snapshots[target_id]
+        snapshot.update_total_bytes()
+        yield target_id, snapshot, True
 
-    for record in records:
-        for snapshot in record.snapshots:
-            snapshot.update_total_bytes()
+    for target_id, snapshot in building_snapshots.items():
+        snapshot.update_total_bytes()
+        yield target_id, snapshot, False
+
+def perf_script_snapshots(lines, last_end_times=None):
+    '''
+    Parse given perf script output lines and yield (target_id, DamonSnapshot)
+    pairs as soon as each snapshot is completely read.  Only the snapshots
+    under construction are kept in memory, so the memory usage is bounded by
+    one snapshot per target regardless of the length of the trace.
+
+    The trace shows only the end time of each snapshot.  The start time of the
+    first snapshot of each target is deduced from the duration of the second
+    snapshot, hence the first snapshot is yielded together with the second
+    one.  The fake snapshot that write_damon_records() adds for the deduction
+    is not yielded.
+
+    If the lines are from the middle of the trace, 'last_end_times' can be
+    given as a dict of target ids and the end times of their snapshots right
+    before the lines.
+
+    Raises an Exception if the trace is not time-sorted.
+    '''
+    return raw_snapshots_to_snapshots(perf_script_raw_snapshots(lines),
+                                      last_end_times)
+
+def raw_snapshots_to_snapshots(raw_snapshots, last_end_times=None):
+    '''
+    Set start times of the snapshots that perf_script_raw_snapshots() yields,
+    and yield those as perf_script_snapshots() does.
+    '''
+    if last_end_times is None:
+        last_end_times = {}
+    first_snapshots = {}
+    cut_snapshots = []
+
+    for target_id, snapshot, completed in raw_snapshots:
+        start_time = last_end_times.get(target_id)
+        if start_time is not None and start_time > snapshot.end_time:
+            raise Exception('trace is not time-sorted')
+        snapshot.start_time = start_time
+        if not completed:
+            cut_snapshots.append((target_id, snapshot))
+            continue
+
+        last_end_times[target_id] = snapshot.end_time
+        if snapshot.start_time is None:
+            first_snapshots[target_id] = snapshot
+            continue
+
+        first_snapshot = first_snapshots.pop(target_id, None)
+        if first_snapshot is not None:
+            first_snapshot.start_time = first_snapshot.end_time - (
+                    snapshot.end_time - snapshot.start_time)
+            yield target_id, first_snapshot
+        if is_fake_snapshot(snapshot):
+            continue
+        yield target_id, snapshot
+
+    for target_id, snapshot in first_snapshots.items():
+        yield target_id, snapshot
+    # the trace may be cut in the middle of a snapshot
+    for target_id, snapshot in cut_snapshots:
+        yield target_id, snapshot
+
+def records_of_snapshots(target_snapshots, monitoring_intervals):
+    records = []
+    for target_id, snapshot in target_snapshots:
+        record_of(target_id, records, monitoring_intervals).snapshots.append(
+                snapshot)
+    return records
+
+def parse_perf_script_lines(lines, monitoring_intervals):
+    try:
+        records = records_of_snapshots(perf_script_snapshots(lines),
+                                       monitoring_intervals)
+    except Exception as e:
+        return None, '%s' % e
 
     set_first_snapshot_start_time(records)
     return records, None
 
+def parse_perf_script(script_output, monitoring_intervals):
+    return parse_perf_script_lines(script_output.split('\n'),
+                                   monitoring_intervals)
+
+def perf_data_snapshots(record_file):
+    '''
+    Yield (target_id, DamonSnapshot) pairs of given perf record result file,
+    reading 'perf script' output line by line via a pipe.
+
+    Raises an Exception if the file cannot be parsed by 'perf script'.
+    '''
+    # in some setup, perf record file ends up having no proper ownership.
+    # There's no reason to be strict about that from damo.  As long as we can,
+    # just parse it with '--force' option.
+    perf_pipe = subprocess.Popen(
+            [PERF, 'script', '--force', '-i', record_file],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True)
+    try:
+        for target_id, snapshot in perf_script_snapshots(perf_pipe.stdout):
+            yield target_id, snapshot
+    finally:
+        perf_pipe.stdout.close()
+        if perf_pipe.poll() is None:
+            perf_pipe.kill()
+        perf_pipe.wait()
+    if perf_pipe.returncode != 0:
+        raise Exception('perf script failed (%d)' % perf_pipe.returncode)
+
+# for reading perf record result file without perf
+#
+# Only little endian, non-pipe mode files are supported.  The layouts of the
+# trace events are read from the event format descriptions in the tracing
+# data feature section of the file.
+
+perf_data_magic = b'PERFILE2'
+perf_file_header = struct.Struct('<8sQQQQQQQQ4Q')
+perf_file_section = struct.Struct('<QQ')
+perf_event_attr_head = struct.Struct('<IIQQQQ')
+perf_event_header = struct.Struct('<IHH')
+
+perf_type_tracepoint = 2
+perf_header_tracing_data = 1
+perf_record_sample = 9
+perf_record_finished_round = 68
+perf_record_auxtrace = 71
+perf_record_compressed = 81
+
+perf_sample_identifier = 1 << 16
+perf_sample_time = 1 << 2
+perf_sample_read = 1 << 4
+perf_sample_callchain = 1 << 5
+perf_sample_raw = 1 << 10
+# fixed-size u64 fields before READ, in the order
+perf_sample_u64_fields = [1 << 0, 1 << 1, perf_sample_time, 1 << 3, 1 << 6,
+                          1 << 9, 1 << 7, 1 << 8]
+
+perf_format_total_time_enabled = 1 << 0
+perf_format_total_time_running = 1 << 1
+perf_format_id = 1 << 2
+perf_format_group = 1 << 3
+perf_format_lost = 1 << 4
+
+def is_perf_data_file(record_file):
+    with open(record_file, 'rb') as f:
+        return f.read(len(perf_data_magic)) == perf_data_magic
+
+class PerfDataReader:
+    buf = None
+    offset = None
+
+    def __init__(self, buf, offset):
+        self.buf = buf
+        self.offset = offset
+
+    def read(self, size):
+        data = self.buf[self.offset:self.offset + size]
+        if len(data) != size:
+            raise Exception('perf data is cut')
+        self.offset += size
+        return data
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.buf, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values[0] if len(values) == 1 else values
+
+    def read_str(self):
+        end = self.buf.find(b'\0', self.offset)
+        if end == -1:
+            raise Exception('perf data string is not terminated')
+        string = self.buf[self.offset:end].decode()
+        self.offset = end + 1
+        return string
+
+def parse_trace_event_format(text):
+    '''
+    Returns the id, the name, and a dict of the field names and their offset,
+    size, and signed-ness of the trace event of the format description
+    '''
+    event_id = None
+    name = None
+    fields = {}
+    for line in text.split('\n'):
+        line = line.strip()
+        if line.startswith('name:'):
+            name = line[len('name:'):].strip()
+        elif line.startswith('ID:'):
+            event_id = int(line[len('ID:'):])
+        elif line.startswith('field:'):
+            attrs = {}
+            for attr in line.split(';'):
+                if not ':' in attr:
+                    continue
+                key, value = attr.split(':', 1)
+                attrs[key.strip()] = value.strip()
+            field_name = attrs['field'].split()[-1].split('[')[0]
+            fields[field_name] = (int(attrs['offset']), int(attrs['size']),
+                                  attrs.get('signed') == '1')
+    return event_id, name, fields
+
+def perf_data_trace_event_formats(buf, section):
+    '''
+    Returns a dict of trace event ids and their parse_trace_event_format()
+    results, from the tracing data feature section of perf data
+    '''
+    reader = PerfDataReader(buf, section[0])
+    if reader.read(10) != b'\x17\x08\x44tracing':
+        raise Exception('wrong tracing data magic')
+    version = reader.read_str()
+    if reader.read(1) != b'\0':
+        raise Exception('big endian tracing data is not supported')
+    reader.read(1)      # size of long
+    reader.unpack('<I') # page size
+    for section_name in [b'header_page\0', b'header_event\0']:
+        if reader.read(len(section_name)) != section_name:
+            raise Exception('wrong tracing data header')
+        reader.read(reader.unpack('<Q'))
+    for i in range(reader.unpack('<I')):
+        # ftrace event formats
+        reader.read(reader.unpack('<Q'))
+
+    formats = {}
+    for i in range(reader.unpack('<I')):
+        system = reader.read_str()
+        for j in range(reader.unpack('<I')):
+            text = bytes(reader.read(reader.unpack('<Q'))).decode()
+            event_id, name, fields = parse_trace_event_format(text)
+            if event_id is not None:
+                formats[event_id] = ('%s:%s' % (system, name), fields)
+    return formats
+
+def damon_trace_event_parser(event_name, fields):
+    '''
+    Returns a function that receives raw data and timestamp of a damon trace
+    event sample and returns (region, end_time, target_id, nr_regions) tuple,
+    or None if the event is not for damon access pattern.
+    '''
+    if event_name == perf_event_damon_aggregated:
+        field_names = ['target_id', 'nr_regions', 'start', 'end',
+                       'nr_accesses', 'age']
+    elif event_name == perf_event_damos_before_apply:
+        field_names = ['target_idx', 'nr_regions', 'start', 'end',
+                       'nr_accesses', 'age']
+    else:
+        return None
+    # early version of damon_aggregated has no age
+    field_names = [n for n in field_names if n in fields]
+
+    # unpack the fields at once, in the order of the offsets
+    names_in_layout = sorted(field_names, key=lambda n: fields[n][0])
+    fmt = '<'
+    end = 0
+    for name in names_in_layout:
+        offset, size, signed = fields[name]
+        if not size in [1, 2, 4, 8] or offset < end:
+            raise Exception('unsupported layout of field %s' % name)
+        if offset > end:
+            fmt += '%dx' % (offset - end)
+        fmt += {1: 'b', 2: 'h', 4: 'i', 8: 'q'}[size]
+        if not signed:
+            fmt = fmt[:-1] + fmt[-1].upper()
+        end = offset + size
+    raw_struct = struct.Struct(fmt)
+    field_idxs = [names_in_layout.index(n) for n in field_names]
+
+    def parse(raw, time):
+        # same to parse_perf_script_line() of 'perf script' output, which
+        # shows the time in microseconds
+        time = int(time // 1000 / 1000000 * 1000000000)
+        values = raw_struct.unpack_from(raw)
+        target_id, nr_regions, start, end, nr_accesses = [
+                values[i] for i in field_idxs[:5]]
+        age = values[field_idxs[5]] if len(field_idxs) == 6 else None
+        region = _damon.DamonRegion(start, end, nr_accesses,
+                _damon.unit_samples, age, _damon.unit_aggr_intervals)
+        return region, time, target_id, nr_regions
+    return parse
+
+def perf_sample_time_raw(buf, offset, sample_type, read_format):
+    '''Returns the time and raw data of a sample record at the offset'''
+    if sample_type & perf_sample_identifier:
+        offset += 8
+    time = None
+    for field in perf_sample_u64_fields:
+        if not sample_type & field:
+            continue
+        if field == perf_sample_time:
+            time = struct.unpack_from('<Q', buf, offset)[0]
+        offset += 8
+    if sample_type & perf_sample_read:
+        nr_u64_per_value = 1
+        for flag in [perf_format_id, perf_format_lost]:
+            if read_format & flag:
+                nr_u64_per_value += 1
+        nr_u64 = 0
+        for flag in [perf_format_total_time_enabled,
+                     perf_format_total_time_running]:
+            if read_format & flag:
+                nr_u64 += 1
+        if read_format & perf_format_group:
+            nr_values = struct.unpack_from('<Q', buf, offset)[0]
+            nr_u64 += 1 + nr_values * nr_u64_per_value
+        else:
+            nr_u64 += nr_u64_per_value
+        offset += nr_u64 * 8
+    if sample_type & perf_sample_callchain:
+        offset += 8 + struct.unpack_from('<Q', buf, offset)[0] * 8
+    raw_size = struct.unpack_from('<I', buf, offset)[0]
+    return time, memoryview(buf)[offset + 4:offset + 4 + raw_size]
+
+def perf_data_attrs(buf, attrs_section, attr_size):
+    '''Returns a dict of sample ids and (sample_type, read_format)'''
+    attrs = {}
+    for offset in range(attrs_section[0], attrs_section[0] + attrs_section[1],
+                        attr_size):
+        attr_type, size, config, sample_period, sample_type, read_format = \
+                perf_event_attr_head.unpack_from(buf, offset)
+        if attr_type != perf_type_tracepoint:
+            continue
+        if not sample_type & perf_sample_time or \
+                not sample_type & perf_sample_raw:
+            raise Exception('samples have no time or raw data')
+        ids_offset, ids_size = perf_file_section.unpack_from(
+                buf, offset + attr_size - perf_file_section.size)
+        for id_offset in range(ids_offset, ids_offset + ids_size, 8):
+            attrs[struct.unpack_from('<Q', buf, id_offset)[0]] = (
+                    sample_type, read_format)
+    return attrs
+
+def perf_data_records(buf, data_section):
+    '''Yield type and offset of each record in the data section'''
+    offset = data_section[0]
+    end = data_section[0] + data_section[1]
+    while offset + perf_event_header.size <= end:
+        record_type, misc, size = perf_event_header.unpack_from(buf, offset)
+        if size == 0:
+            raise Exception('wrong perf record size')
+        if record_type in [perf_record_auxtrace, perf_record_compressed]:
+            raise Exception('unsupported perf record type %d' % record_type)
+        yield record_type, offset
+        offset += size
+
+def perf_data_native_events(record_file):
+    '''
+    Yield (region, end_time, target_id, nr_regions) tuples of the damon trace
+    events in the perf record result file, reading the file without perf.
+
+    Raises an Exception if the file is not supported.
+    '''
+    with open(record_file, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = perf_file_header.unpack_from(buf, 0)
+    magic, header_size, attr_size = header[:3]
+    attrs_section = header[3:5]
+    data_section = header[5:7]
+    features = header[9:]
+    if magic != perf_data_magic or header_size != perf_file_header.size:
+        raise Exception('unsupported perf data header')
+
+    if not features[0] & (1 << perf_header_tracing_data):
+        raise Exception('no tracing data')
+    # the feature sections are in the order of the feature bits
+    nr_features_before = bin(features[0] & (
+        (1 << perf_header_tracing_data) - 1)).count('1')
+    tracing_data_section = perf_file_section.unpack_from(buf,
+            sum(data_section) + nr_features_before * perf_file_section.size)
+    parsers = {}
+    for event_id, (name, fields) in perf_data_trace_event_formats(
+            buf, tracing_data_section).items():
+        parser = damon_trace_event_parser(name, fields)
+        if parser is not None:
+            parsers[event_id] = parser
+
+    attrs = perf_data_attrs(buf, attrs_section, attr_size)
+    sample_types = set(attrs.values())
+    if len(sample_types) == 0:
+        return
+    # an event can have multiple ids, e.g., one for each cpu, so check the
+    # types rather than the ids
+    identify_samples = len(sample_types) > 1
+    if identify_samples and not all(
+            [t & perf_sample_identifier for t, f in sample_types]):
+        raise Exception('samples of different types are not identifiable')
+    sample_type, read_format = sample_types.pop()
+
+    # The samples are not time-sorted.  Sort those in the way of perf.  That
+    # is, when a round finishing record is found, sort the queued samples and
+    # flush those that are not later than the last sample before the previous
+    # round finishing record.
+    queue = []
+    next_flush = 0
+    max_time = 0
+    for record_type, offset in perf_data_records(buf, data_section):
+        if record_type == perf_record_sample:
+            offset += perf_event_header.size
+            if identify_samples:
+                sample_type, read_format = attrs[
+                        struct.unpack_from('<Q', buf, offset)[0]]
+            time, raw = perf_sample_time_raw(buf, offset, sample_type,
+                                             read_format)
+            parser = parsers.get(struct.unpack_from('<H', raw)[0])
+            if parser is not None:
+                queue.append((time, parser, raw))
+                max_time = max(max_time, time)
+        elif record_type == perf_record_finished_round:
+            queue.sort(key=lambda sample: sample[0])
+            nr_flush = bisect_time(len(queue), lambda i: queue[i][0],
+                                   next_flush, right=True)
+            for time, parser, raw in queue[:nr_flush]:
+                yield parser(raw, time)
+            queue = queue[nr_flush:]
+            next_flush = max_time
+    queue.sort(key=lambda sample: sample[0])
+    for time, parser, raw in queue:
+        yield parser(raw, time)
+
+def perf_data_native_snapshots(record_file):
+    '''
+    Same to perf_data_snapshots(), but reads the file without perf
+    '''
+    return raw_snapshots_to_snapshots(trace_events_raw_snapshots(
+        perf_data_native_events(record_file)))
+
 def set_perf_path(perf_path):
     global PERF
     PERF = perf_path
@@ -377,11 +919,424 @@ def parse_json_file(record_file):
         json_str = f.read()
     return parse_json(json_str)
 
+# columnar format file
+#
+# The file starts with a header, which is followed by per-record regions and
+# snapshots index arrays, and json-encoded metadata of the records.  All values
+# are little endian fixed-width integers, so the file can be memory-mapped and
+# read without parsing of the whole file.
+#
+# header:           magic, version (u32), reserved (u32), metadata offset
+#                   (u64) and length (u64)
+# region:           start (u64), end (u64), nr_accesses in samples (i64), age
+#                   in aggregation intervals (i64)
+# index entry:      start time (i64), end time (i64), total bytes (i64), offset
+#                   of the first region (i64), number of regions (i64)
+#
+# None values are stored as columnar_none.
+
+columnar_magic = b'DAMOCOLR'
+columnar_version = 1
+columnar_header = struct.Struct('<8sIIQQ')
+columnar_region = struct.Struct('<QQqq')
+columnar_index_entry = struct.Struct('<qqqqq')
+columnar_none = -2**63
+
+def columnar_val(val):
+    return val if val != columnar_none else None
+
+def record_metadata_kvpairs(record):
+    return collections.OrderedDict([
+        ('kdamond_idx', record.kdamond_idx),
+        ('context_idx', record.context_idx),
+        ('intervals', record.intervals.to_kvpairs(raw=True)
+            if record.intervals is not None else None),
+        ('scheme_idx', record.scheme_idx),
+        ('target_id', record.target_id)])
+
+def record_of_metadata(kv):
+    return DamonRecord(kv['kdamond_idx'], kv['context_idx'],
+            _damon.DamonIntervals.from_kvpairs(kv['intervals'])
+            if kv['intervals'] is not None else None,
+            kv['scheme_idx'], kv['target_id'])
+
+def read_columnar_metadata(buf, version, format_name):
+    '''Returns the metadata of the records in columnar or chunked format
+    file'''
+    _, file_version, _, metadata_offset, metadata_len = \
+            columnar_header.unpack_from(buf, 0)
+    if file_version != version:
+        raise Exception('unsupported %s format version %d' %
+                        (format_name, file_version))
+    return json.loads(
+            bytes(buf[metadata_offset:metadata_offset + metadata_len]))
+
+class ColumnarSnapshot(DamonSnapshot):
+    '''
+    DamonSnapshot of a memory-mapped columnar format file.  The regions are
+    constructed on the first access.
+    '''
+    buf = None
+    regions_offset = None
+    nr_regions = None
+    loaded_regions = None
+
+    def __init__(self, buf, start_time, end_time, total_bytes, regions_offset,
+                 nr_regions):
+        self.buf = buf
+        self.start_time = start_time
+        self.end_time = end_time
+        self.total_bytes = total_bytes
+        self.regions_offset = regions_offset
+        self.nr_regions = nr_regions
+
+    def raw_regions(self):
+        return memoryview(self.buf)[self.regions_offset:self.regions_offset +
+                                    self.nr_regions * columnar_region.size]
+
+    def region_fields(self):
+        '''Yields start, end, nr_accesses and age of each region'''
+        for start, end, nr_accesses, age in columnar_region.iter_unpack(
+                self.raw_regions()):
+            yield start, end, columnar_val(nr_accesses), columnar_val(age)
+
+    def regions_loaded(self):
+        return self.loaded_regions is not None
+
+    @property
+    def regions(self):
+        if self.loaded_regions is None:
+            self.loaded_regions = [_damon.DamonRegion(
+                start, end, nr_accesses, _damon.unit_samples,
+                age, _damon.unit_aggr_intervals)
+                for start, end, nr_accesses, age in self.region_fields()]
+        return self.loaded_regions
+
+    @regions.setter
+    def regions(self, regions):
+        self.loaded_regions = regions
+
+class ColumnarSnapshots:
+    '''
+    Read-only list of the snapshots of a record in a memory-mapped columnar
+    format file.  Each snapshot object is constructed on the first access.
+    '''
+    buf = None
+    index_offset = None
+    snapshots = None
+
+    def __init__(self, buf, index_offset, nr_snapshots):
+        self.buf = buf
+        self.index_offset = index_offset
+        self.snapshots = [None] * nr_snapshots
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError('snapshot index out of range')
+        if self.snapshots[idx] is None:
+            start_time, end_time, total_bytes, regions_offset, nr_regions = \
+                    columnar_index_entry.unpack_from(self.buf,
+                            self.index_offset + idx * columnar_index_entry.size)
+            self.snapshots[idx] = self.new_snapshot(idx,
+                    columnar_val(start_time), end_time,
+                    columnar_val(total_bytes), regions_offset, nr_regions)
+        return self.snapshots[idx]
+
+    def new_snapshot(self, idx, start_time, end_time, total_bytes,
+                     regions_offset, nr_regions):
+        return ColumnarSnapshot(self.buf, start_time, end_time, total_bytes,
+                                regions_offset, nr_regions)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+def is_columnar_file(record_file):
+    with open(record_file, 'rb') as f:
+        return f.read(len(columnar_magic)) == columnar_magic
+
+def parse_columnar(record_file):
+    with open(record_file, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    records = []
+    for kv in read_columnar_metadata(buf, columnar_version, 'columnar'):
+        record = record_of_metadata(kv)
+        record.snapshots = ColumnarSnapshots(buf, kv['index_offset'],
+                                             kv['nr_snapshots'])
+        records.append(record)
+    return records
+
+# framed format file
+#
+# The file starts with a header, which is followed by frames of snapshots.
+# Each frame contains one snapshot of one record, so snapshots can be appended
+# to the file as soon as they are taken.  The regions are stored in the
+# columnar format region layout.
+#
+# header:           magic, version (u32)
+# frame:            crc32 of the remaining part of the frame (u32), frame
+#                   header, and frame body
+# frame header:     length of the metadata (u32), start time (i64), end time
+#                   (i64), total bytes (i64), number of regions (i64)
+# frame body:       json-encoded metadata of the record, regions
+#
+# A frame that is cut or broken, e.g., by a killed writer, and frames after it
+# are ignored.
+
+framed_magic = b'DAMOFRMD'
+framed_version = 1
+framed_header = struct.Struct('<8sI')
+framed_crc = struct.Struct('<I')
+framed_frame_header = struct.Struct('<Iqqqq')
+
+def is_framed_file(record_file):
+    with open(record_file, 'rb') as f:
+        return f.read(len(framed_magic)) == framed_magic
+
+def record_metadata_bytes(record):
+    return json.dumps(record_metadata_kvpairs(record)).encode()
+
+def framed_frame_bytes(metadata_bytes, snapshot):
+    frame = framed_frame_header.pack(len(metadata_bytes),
+            int(snapshot.start_time)
+            if snapshot.start_time is not None else columnar_none,
+            int(snapshot.end_time),
+            snapshot.total_bytes
+            if snapshot.total_bytes is not None else columnar_none,
+            len(snapshot.regions)) + metadata_bytes + \
+                    columnar_regions_bytes(snapshot)
+    return framed_crc.pack(zlib.crc32(frame)) + frame
+
+def parse_framed(record_file):
+    records = []
+    records_of_metadata = {}
+    with open(record_file, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version = framed_header.unpack_from(buf, 0)
+    if version != framed_version:
+        raise Exception('unsupported framed format version %d' % version)
+
+    offset = framed_header.size
+    while offset + framed_crc.size + framed_frame_header.size <= len(buf):
+        crc, = framed_crc.unpack_from(buf, offset)
+        frame_offset = offset + framed_crc.size
+        metadata_len, start_time, end_time, total_bytes, nr_regions = \
+                framed_frame_header.unpack_from(buf, frame_offset)
+        metadata_offset = frame_offset + framed_frame_header.size
+        regions_offset = metadata_offset + metadata_len
+        frame_end = regions_offset + nr_regions * columnar_region.size
+        if nr_regions < 0 or frame_end > len(buf):
+            break
+        if zlib.crc32(memoryview(buf)[frame_offset:frame_end]) != crc:
+            break
+
+        metadata_bytes = bytes(buf[metadata_offset:regions_offset])
+        record = records_of_metadata.get(metadata_bytes)
+        if record is None:
+            record = record_of_metadata(json.loads(metadata_bytes))
+            records_of_metadata[metadata_bytes] = record
+            records.append(record)
+        record.snapshots.append(ColumnarSnapshot(
+            buf, columnar_val(start_time), end_time, columnar_val(total_bytes),
+            regions_offset, nr_regions))
+        offset = frame_end
+    return records
+
+class FramedRecordsWriter:
+    '''
+    Appends snapshots of records to a framed format file as those are given.
+    The frames are written to the file for each append, so that the file is
+    readable even if the writer is killed.  Those are synced to the storage at
+    least once per given seconds, or only at close() if the seconds is None.
+    '''
+    file = None
+    sync_interval_sec = None
+    last_sync_time = None
+
+    def __init__(self, file_path, file_permission, sync_interval_sec):
+        self.file = open(file_path, 'wb')
+        if file_permission is not None:
+            os.chmod(file_path, file_permission)
+        self.file.write(framed_header.pack(framed_magic, framed_version))
+        self.file.flush()
+        self.sync_interval_sec = sync_interval_sec
+        self.last_sync_time = time.time()
+        # index of the old record file is no more valid
+        write_record_index(None, file_path, None)
+
+    def append(self, records):
+        for record in records:
+            metadata_bytes = record_metadata_bytes(record)
+            for snapshot in record.snapshots:
+                self.file.write(framed_frame_bytes(metadata_bytes, snapshot))
+        self.file.flush()
+        if (self.sync_interval_sec is not None and
+                time.time() - self.last_sync_time >= self.sync_interval_sec):
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_sync_time = time.time()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+# chunked format file
+#
+# Same to the columnar format, but the regions of each block of
+# 'chunked_block_nr_snapshots' snapshots of each record are independently
+# compressed.  The blocks are compressed and decompressed by multiple threads,
+# and only blocks for snapshots that are really accessed are decompressed.
+#
+# header:           magic, version (u32), reserved (u32), metadata offset
+#                   (u64) and length (u64)
+# block:            zlib-compressed regions of the snapshots
+# block table entry: offset (i64) and length (i64) of the block
+# index entry:      same to that of columnar format, but the offset of the
+#                   first region is that in the decompressed block
+#
+# The metadata of each record has the offset of the block table in addition
+# to that of columnar format.
+
+chunked_magic = b'DAMOCHNK'
+chunked_version = 1
+chunked_block_table_entry = struct.Struct('<qq')
+chunked_block_nr_snapshots = 64
+
+def map_in_threads(fn, items):
+    '''
+    Returns list of fn() results for the items, which are called by multiple
+    threads.  Good for functions releasing GIL, e.g., zlib.decompress().
+    '''
+    if len(items) < 2:
+        return [fn(item) for item in items]
+    with concurrent.futures.ThreadPoolExecutor(os.cpu_count()) as executor:
+        return list(executor.map(fn, items))
+
+class ChunkedSnapshot(ColumnarSnapshot):
+    '''
+    DamonSnapshot of a chunked format file.  The block of the regions is
+    decompressed on the first access to the regions.
+    '''
+    snapshots = None
+    block_idx = None
+
+    def __init__(self, snapshots, block_idx, start_time, end_time,
+                 total_bytes, regions_offset, nr_regions):
+        self.snapshots = snapshots
+        self.block_idx = block_idx
+        self.start_time = start_time
+        self.end_time = end_time
+        self.total_bytes = total_bytes
+        self.regions_offset = regions_offset
+        self.nr_regions = nr_regions
+
+    @property
+    def buf(self):
+        return self.snapshots.block(self.block_idx)
+
+class ChunkedSnapshots(ColumnarSnapshots):
+    '''
+    Read-only list of the snapshots of a record in a memory-mapped chunked
+    format file.  Iterating or slicing the list decompresses the blocks of the
+    snapshots using multiple threads.
+    '''
+    block_table_offset = None
+    blocks = None
+
+    def __init__(self, buf, index_offset, nr_snapshots, block_table_offset):
+        super().__init__(buf, index_offset, nr_snapshots)
+        self.block_table_offset = block_table_offset
+        self.blocks = [None] * (
+                (nr_snapshots + chunked_block_nr_snapshots - 1) //
+                chunked_block_nr_snapshots)
+
+    def compressed_block(self, block_idx):
+        offset, length = chunked_block_table_entry.unpack_from(self.buf,
+                self.block_table_offset +
+                block_idx * chunked_block_table_entry.size)
+        return memoryview(self.buf)[offset:offset + length]
+
+    def block(self, block_idx):
+        if self.blocks[block_idx] is None:
+            self.blocks[block_idx] = zlib.decompress(
+                    self.compressed_block(block_idx))
+        return self.blocks[block_idx]
+
+    def decompress_blocks_of(self, idxs):
+        block_idxs = sorted(set(
+            [idx // chunked_block_nr_snapshots for idx in idxs]))
+        block_idxs = [i for i in block_idxs if self.blocks[i] is None]
+        for block_idx, block in zip(block_idxs, map_in_threads(
+                zlib.decompress,
+                [self.compressed_block(i) for i in block_idxs])):
+            self.blocks[block_idx] = block
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            self.decompress_blocks_of(range(*idx.indices(len(self))))
+        return super().__getitem__(idx)
+
+    def new_snapshot(self, idx, start_time, end_time, total_bytes,
+                     regions_offset, nr_regions):
+        return ChunkedSnapshot(self, idx // chunked_block_nr_snapshots,
+                start_time, end_time, total_bytes, regions_offset, nr_regions)
+
+    def __iter__(self):
+        nr_snapshots_per_batch = chunked_block_nr_snapshots * os.cpu_count()
+        for start in range(0, len(self), nr_snapshots_per_batch):
+            for snapshot in self[start:start + nr_snapshots_per_batch]:
+                yield snapshot
+
+def is_chunked_file(record_file):
+    with open(record_file, 'rb') as f:
+        return f.read(len(chunked_magic)) == chunked_magic
+
+def parse_chunked(record_file):
+    with open(record_file, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    records = []
+    for kv in read_columnar_metadata(buf, chunked_version, 'chunked'):
+        record = record_of_metadata(kv)
+        record.snapshots = ChunkedSnapshots(buf, kv['index_offset'],
+                kv['nr_snapshots'], kv['block_table_offset'])
+        records.append(record)
+    return records
+
 def parse_records_file(record_file, monitoring_intervals=None):
     '''
-    Return monitoring results records and error string
+    Return monitoring results records and error string.  perf record result
+    files are read without perf if possible.  Only if that fails, e.g., for
+    pipe mode or compressed files, those are parsed using perf.
     '''
 
+    if is_columnar_file(record_file):
+        try:
+            return parse_columnar(record_file), None
+        except Exception as e:
+            return None, 'failed parsing columnar file (%s)' % e
+
+    if is_chunked_file(record_file):
+        try:
+            return parse_chunked(record_file), None
+        except Exception as e:
+            return None, 'failed parsing chunked file (%s)' % e
+
+    if is_framed_file(record_file):
+        try:
+            return parse_framed(record_file), None
+        except Exception as e:
+            return None, 'failed parsing framed file (%s)' % e
+
     file_type = subprocess.check_output(
             ['file', '-b', record_file]).decode().strip()
     if file_type == 'JSON data':
@@ -395,28 +1350,340 @@ def parse_records_file(record_file, monitoring_intervals=None):
         except Exception as e:
             return None, 'failed parsing json compressed file (%s)' % e
 
-    perf_script_output = None
     if file_type == 'ASCII text':
         with open(record_file, 'r') as f:
-            perf_script_output = f.read()
-    else:
-        # might be perf data
+            return parse_perf_script_lines(f, monitoring_intervals)
+
+    # might be perf data
+    if is_perf_data_file(record_file):
         try:
-            with open(os.devnull, 'w') as fnull:
-                # in some setup, perf record file ends up having no proper
-                # ownership.  There's no reason to be strict about that from
-                # damo.  As long as we can, just parse it with '--force'
-                # option.
-                perf_script_output = subprocess.check_output(
-                        [PERF, 'script', '--force', '-i', record_file],
-                        stderr=fnull).decode()
-        except:
-            # Should be record format file
+            records = records_of_snapshots(
+                    perf_data_native_snapshots(record_file),
+                    monitoring_intervals)
+            set_first_snapshot_start_time(records)
+            return records, None
+        except Exception as e:
+            # the file might have a feature that only perf can read
+            pass
+    # fallback to perf
+    try:
+        records = records_of_snapshots(perf_data_snapshots(record_file),
+                                       monitoring_intervals)
+    except Exception as e:
+        return None, 'parsing %s failed (%s)' % (record_file, e)
+    set_first_snapshot_start_time(records)
+    return records, None
+
+# cache of parsed records
+#
+# Records of files that need parsing are saved in the columnar format under
+# the cache directory, named after the path of the file.  The path, inode,
+# size and modification time of the file are saved in a file of the same name
+# but '.key' suffix, to find if the cache is for the current file.  Cache of
+# files that removed or changed are removed, and then least recently used ones
+# are removed if the total size of the cache files exceeds
+# records_cache_max_bytes.  The records could be readable by only some users,
+# so the cache is readable by only the owner.
+
+records_cache_max_bytes = 1024 * 1024 * 1024
+
+def records_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home:
+        if not 'HOME' in os.environ:
+            return None
+        cache_home = os.path.join(os.environ['HOME'], '.cache')
+    return os.path.join(cache_home, 'damo', 'records')
+
+def records_cache_path(record_file):
+    cache_dir = records_cache_dir()
+    if cache_dir is None:
+        return None
+    name = hashlib.sha1(os.path.realpath(record_file).encode()).hexdigest()
+    return os.path.join(cache_dir, '%s.columnar' % name)
+
+def records_cache_key_path(cache_path):
+    return '%s.key' % cache_path
+
+def records_cache_key(record_file):
+    '''Returns the key of the record file, or None if it doesn't exist'''
+    try:
+        stat = os.stat(record_file)
+    except OSError:
+        return None
+    return [os.path.realpath(record_file), stat.st_dev, stat.st_ino,
+            stat.st_size, stat.st_mtime_ns]
+
+def read_records_cache_key(cache_path):
+    '''Returns the key of the file that the cache is for, or None'''
+    try:
+        with open(records_cache_key_path(cache_path), 'r') as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+def remove_records_cache(cache_path):
+    for path in [cache_path, records_cache_key_path(cache_path)]:
+        try:
+            os.remove(path)
+        except OSError:
             pass
-    if perf_script_output is not None:
-        return parse_perf_script(perf_script_output, monitoring_intervals)
+
+def evict_records_cache(cache_dir, max_bytes):
+    '''
+    Remove cache files for removed or changed files, and then least recently
+    used cache files until those fit in max_bytes
+    '''
+    files = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.columnar'):
+            continue
+        path = os.path.join(cache_dir, name)
+        key = read_records_cache_key(path)
+        if key is None or records_cache_key(key[0]) != key:
+            remove_records_cache(path)
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append([stat.st_mtime, stat.st_size, path])
+    total_bytes = sum([size for mtime, size, path in files])
+    for mtime, size, path in sorted(files):
+        if total_bytes <= max_bytes:
+            break
+        remove_records_cache(path)
+        total_bytes -= size
+
+def write_records_cache(records, cache_path, key):
+    '''Returns an error or None'''
+    cache_dir = os.path.dirname(cache_path)
+    tmp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+    key_path = records_cache_key_path(cache_path)
+    tmp_key_path = '%s.%d.tmp' % (key_path, os.getpid())
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        os.chmod(cache_dir, 0o700)
+        write_columnar(records, tmp_path)
+        os.chmod(tmp_path, 0o600)
+        with open(os.open(tmp_key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                          0o600), 'w') as f:
+            json.dump(key, f)
+        # the key is replaced last, so a cache having the key is complete
+        os.replace(tmp_path, cache_path)
+        os.replace(tmp_key_path, key_path)
+        evict_records_cache(cache_dir, records_cache_max_bytes)
+    except Exception as e:
+        for path in [tmp_path, tmp_key_path]:
+            if os.path.isfile(path):
+                os.remove(path)
+        return 'writing records cache failed (%s)' % e
+    return None
+
+def parse_records_file_cached(record_file):
+    '''
+    Same to parse_records_file(), but reuses the records cache for the file if
+    it exists, and makes it otherwise.
+    '''
+    if (is_columnar_file(record_file) or is_chunked_file(record_file) or
+            is_framed_file(record_file)):
+        # these are already fast to read
+        return parse_records_file(record_file)
+
+    cache_path = records_cache_path(record_file)
+    key = records_cache_key(record_file)
+    if (cache_path is not None and key is not None and
+            read_records_cache_key(cache_path) == key):
+        try:
+            records = parse_columnar(cache_path)
+            # mark as recently used
+            os.utime(cache_path)
+            return records, None
+        except Exception:
+            # broken cache.  overwrite it.
+            pass
+
+    records, err = parse_records_file(record_file)
+    if err is None and cache_path is not None and key is not None:
+        # the cache is only for speed, so ignore errors
+        write_records_cache(records, cache_path, key)
+    return records, err
+
+# for reading only snapshots of specific time range
+
+def record_index_path(record_file):
+    return '%s.index' % record_file
+
+def read_record_index(record_file):
+    '''
+    Returns the snapshots index of the given record file, or None if the index
+    file doesn't exist or is not for the current record file
+    '''
+    index_path = record_index_path(record_file)
+    if not os.path.isfile(index_path):
+        return None
+    try:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+    except:
+        return None
+    if index['record_file_size'] != os.path.getsize(record_file):
+        return None
+    return index['targets']
+
+def bisect_time(nr_items, time_of, time, right=False):
+    '''
+    Returns the index of the first item having time_of() >= time, or > time
+    if 'right' is True.  Items should be sorted by the time.
+    '''
+    lo = 0
+    hi = nr_items
+    while lo < hi:
+        mid = (lo + hi) // 2
+        mid_time = time_of(mid)
+        if mid_time < time or (right and mid_time == time):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+def time_range_idxs(nr_snapshots, end_time_of, time_range):
+    '''
+    Returns the start and end (exclusive) indices of the snapshots overlapping
+    with the time range, from end times of the snapshots.
+    '''
+    start_idx = bisect_time(nr_snapshots, end_time_of, time_range[0])
+    # snapshot start time is the end time of the previous snapshot
+    end_idx = min(bisect_time(nr_snapshots, end_time_of, time_range[1],
+                              right=True) + 1, nr_snapshots)
+    return start_idx, end_idx
+
+def snapshot_in_time_range(snapshot, time_range, by_start_time=False):
+    if snapshot.start_time is None:
+        return snapshot.end_time >= time_range[0]
+    if by_start_time:
+        return (snapshot.start_time >= time_range[0] and
+                snapshot.start_time <= time_range[1])
+    return (snapshot.end_time >= time_range[0] and
+            snapshot.start_time <= time_range[1])
+
+def absolute_time_range(time_range, relative, base_time):
+    if not relative:
+        return time_range
+    return [base_time + time_range[0], base_time + time_range[1]]
+
+def filter_records_by_time(records, time_range, relative,
+                           by_start_time=False):
+    for record in records:
+        snapshots = record.snapshots
+        if len(snapshots) == 0:
+            continue
+        base_time = snapshots[0].start_time
+        if base_time is None:
+            base_time = snapshots[0].end_time
+        abs_range = absolute_time_range(time_range, relative, base_time)
+        start_idx, end_idx = time_range_idxs(
+                len(snapshots), lambda idx: snapshots[idx].end_time, abs_range)
+        record.snapshots = [s for s in snapshots[start_idx:end_idx]
+                            if snapshot_in_time_range(s, abs_range,
+                                                      by_start_time)]
+
+def file_lines(file_path, start_offset, end_offset):
+    with open(file_path, 'rb') as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for line in f:
+            if end_offset is not None and offset >= end_offset:
+                break
+            offset += len(line)
+            yield line.decode()
+
+def parse_perf_script_in_time_range(record_file, index, time_range, relative,
+                                    by_start_time, monitoring_intervals):
+    start_offset = None
+    end_offset = 0
+    last_end_times = {}
+    target_time_ranges = {}
+    target_start_times = {}
+    for target in index:
+        end_times = target['end_times']
+        offsets = target['offsets']
+        abs_range = absolute_time_range(time_range, relative,
+                                        target['start_time'])
+        start_idx, end_idx = time_range_idxs(
+                len(end_times), end_times.__getitem__, abs_range)
+        if start_idx >= end_idx:
+            continue
+
+        target_id = target['target_id']
+        target_time_ranges[target_id] = abs_range
+        if start_idx > 0:
+            last_end_times[target_id] = end_times[start_idx - 1]
+        else:
+            target_start_times[target_id] = target['start_time']
+
+        if start_offset is None or offsets[start_idx] < start_offset:
+            start_offset = offsets[start_idx]
+        if end_offset is not None:
+            if end_idx < len(offsets):
+                end_offset = max(end_offset, offsets[end_idx])
+            else:
+                end_offset = None
+    records = [DamonRecord(None, None, monitoring_intervals, None,
+                           target['target_id']) for target in index]
+    if start_offset is None:
+        return records, None
+
+    try:
+        for target_id, snapshot in perf_script_snapshots(
+                file_lines(record_file, start_offset, end_offset),
+                last_end_times):
+            if target_id in target_time_ranges:
+                record_of(target_id, records,
+                          monitoring_intervals).snapshots.append(snapshot)
+    except Exception as e:
+        return None, '%s' % e
+    for record in records:
+        if len(record.snapshots) == 0:
+            continue
+        if record.target_id in target_start_times:
+            record.snapshots[0].start_time = target_start_times[
+                    record.target_id]
+        time_range = target_time_ranges[record.target_id]
+        record.snapshots = [s for s in record.snapshots
+                            if snapshot_in_time_range(s, time_range,
+                                                      by_start_time)]
+    return records, None
+
+def parse_records_file_in_time_range(record_file, time_range, relative=False,
+                                     by_start_time=False,
+                                     monitoring_intervals=None):
+    '''
+    Return monitoring results records having only snapshots overlapping with
+    the given time range, and error string.  If 'relative' is True, the time
+    range is relative to the start time of the first snapshot of each record.
+    If 'by_start_time' is True, only snapshots that started in the time range
+    are returned.
+
+    If the snapshots index file for the record file exists, read only the part
+    of the file for the snapshots.
+    '''
+    index = read_record_index(record_file)
+    if index is not None:
+        return parse_perf_script_in_time_range(
+                record_file, index, time_range, relative, by_start_time,
+                monitoring_intervals)
+
+    if monitoring_intervals is None:
+        records, err = parse_records_file_cached(record_file)
     else:
-        return None, 'parsing %s failed' % record_file
+        records, err = parse_records_file(record_file, monitoring_intervals)
+    if err is not None:
+        return None, err
+    # columnar format snapshots are lazily read, so this reads only the
+    # snapshots in the range
+    filter_records_by_time(records, time_range, relative, by_start_time)
+    return records, None
 
 # for writing monitoring results to a file
 
@@ -431,6 +1698,119 @@ def write_json(records, file_path):
     with open(file_path, 'w') as f:
         f.write(json_str)
 
+def columnar_regions_bytes(snapshot):
+    if isinstance(snapshot, ColumnarSnapshot) and not snapshot.regions_loaded():
+        return snapshot.raw_regions()
+    return b''.join([columnar_region.pack(r.start, r.end,
+        r.nr_accesses.samples if r.nr_accesses.samples is not None
+        else columnar_none,
+        r.age.aggr_intervals if r.age.aggr_intervals is not None
+        else columnar_none) for r in snapshot.regions])
+
+def columnar_index_entry_bytes(snapshot, regions_offset, regions_bytes):
+    return columnar_index_entry.pack(
+            int(snapshot.start_time)
+            if snapshot.start_time is not None else columnar_none,
+            int(snapshot.end_time),
+            snapshot.total_bytes
+            if snapshot.total_bytes is not None else columnar_none,
+            regions_offset, len(regions_bytes) // columnar_region.size)
+
+def write_columnar_metadata(f, magic, version, metadata):
+    '''Write the metadata of the records at the current position of the
+    columnar or chunked format file, and the header pointing it'''
+    metadata_offset = f.tell()
+    metadata_bytes = json.dumps(metadata).encode()
+    f.write(metadata_bytes)
+    f.seek(0)
+    f.write(columnar_header.pack(magic, version, 0, metadata_offset,
+                                 len(metadata_bytes)))
+
+def write_columnar(records, file_path):
+    '''
+    Only samples unit of nr_accesses and aggr_intervals unit of age are
+    written, like perf_script format.
+    '''
+    metadata = []
+    with open(file_path, 'wb') as f:
+        f.write(columnar_header.pack(columnar_magic, columnar_version, 0, 0, 0))
+        for record in records:
+            index = []
+            for snapshot in record.snapshots:
+                regions_offset = f.tell()
+                regions_bytes = columnar_regions_bytes(snapshot)
+                f.write(regions_bytes)
+                index.append(columnar_index_entry_bytes(
+                    snapshot, regions_offset, regions_bytes))
+            kvpairs = record_metadata_kvpairs(record)
+            kvpairs['nr_snapshots'] = len(index)
+            kvpairs['index_offset'] = f.tell()
+            metadata.append(kvpairs)
+            f.write(b''.join(index))
+        write_columnar_metadata(f, columnar_magic, columnar_version, metadata)
+
+def chunked_blocks(snapshots):
+    '''
+    Yield the uncompressed block and index entries of each block of the
+    snapshots
+    '''
+    for start in range(0, len(snapshots), chunked_block_nr_snapshots):
+        regions_bytes = []
+        index = []
+        regions_offset = 0
+        for snapshot in snapshots[start:start + chunked_block_nr_snapshots]:
+            snapshot_regions_bytes = columnar_regions_bytes(snapshot)
+            regions_bytes.append(snapshot_regions_bytes)
+            index.append(columnar_index_entry_bytes(
+                snapshot, regions_offset, snapshot_regions_bytes))
+            regions_offset += len(snapshot_regions_bytes)
+        yield b''.join(regions_bytes), index
+
+def write_chunked(records, file_path):
+    '''
+    Only samples unit of nr_accesses and aggr_intervals unit of age are
+    written, like columnar format.  The blocks are compressed by multiple
+    threads, while the blocks of next snapshots are being made.
+    '''
+    nr_threads = os.cpu_count()
+    metadata = []
+    with open(file_path, 'wb') as f, \
+            concurrent.futures.ThreadPoolExecutor(nr_threads) as executor:
+        f.write(columnar_header.pack(chunked_magic, chunked_version, 0, 0, 0))
+        for record in records:
+            index = []
+            block_table = []
+            compressing = collections.deque()
+            def write_block(future):
+                compressed = future.result()
+                block_table.append(chunked_block_table_entry.pack(
+                    f.tell(), len(compressed)))
+                f.write(compressed)
+
+            for block, block_index in chunked_blocks(record.snapshots):
+                index += block_index
+                compressing.append(executor.submit(zlib.compress, block))
+                if len(compressing) > nr_threads * 2:
+                    write_block(compressing.popleft())
+            while len(compressing) > 0:
+                write_block(compressing.popleft())
+
+            index_offset = f.tell()
+            f.write(b''.join(index))
+            block_table_offset = f.tell()
+            f.write(b''.join(block_table))
+            kvpairs = record_metadata_kvpairs(record)
+            kvpairs['nr_snapshots'] = len(index)
+            kvpairs['index_offset'] = index_offset
+            kvpairs['block_table_offset'] = block_table_offset
+            metadata.append(kvpairs)
+        write_columnar_metadata(f, chunked_magic, chunked_version, metadata)
+
+def write_framed(records, file_path):
+    writer = FramedRecordsWriter(file_path, None, None)
+    writer.append(records)
+    writer.close()
+
 def add_fake_snapshot_if_needed(records):
     '''
     perf and record file format stores only snapshot end time.  For a record
@@ -458,22 +1838,73 @@ def write_perf_script(records, file_path):
     kdamond.0  4452 [000] 82877.315633: damon:damon_aggregated: \
             target_id=18446623435582458880 nr_regions=17 \
             140731667070976-140731668037632: 0 3
+
+    Returns the snapshots index of the written file.
     '''
 
     add_fake_snapshot_if_needed(records)
+    index = []
+    offset = 0
     with open(file_path, 'w') as f:
         for record in records:
-            snapshots = record.snapshots
-            for snapshot in snapshots:
+            end_times = []
+            offsets = []
+            fake_end_time = None
+            for snapshot in record.snapshots:
+                end_time_txt = '%f' % (snapshot.end_time / 1000000000.0)
+                lines = []
                 for region in snapshot.regions:
-                    f.write(' '.join(['kdamond.x', 'xxxx', 'xxxx',
-                        '%f:' % (snapshot.end_time / 1000000000.0),
+                    fields = ['kdamond.x', 'xxxx', 'xxxx',
+                        '%s:' % end_time_txt,
                         'damon:damon_aggregated:',
                         'target_id=%s' % record.target_id,
                         'nr_regions=%d' % len(snapshot.regions),
-                        '%d-%d: %d %s' % (region.start, region.end,
-                            region.nr_accesses.samples,
-                            region.age.aggr_intervals)]) + '\n')
+                        '%d-%d: %d' % (region.start, region.end,
+                            region.nr_accesses.samples)]
+                    # early version of the trace event has no age
+                    if region.age.aggr_intervals is not None:
+                        fields.append('%d' % region.age.aggr_intervals)
+                    lines.append(' '.join(fields) + '\n')
+                text = ''.join(lines)
+                f.write(text)
+
+                # index the times in the precision of the file
+                end_time = int(float(end_time_txt) * 1000000000)
+                if is_fake_snapshot(snapshot):
+                    fake_end_time = end_time
+                else:
+                    end_times.append(end_time)
+                    offsets.append(offset)
+                offset += len(text.encode())
+
+            # same to the deduction of set_first_snapshot_start_time()
+            start_time = None
+            if len(end_times) > 1:
+                start_time = end_times[0] - float(
+                        end_times[-1] - end_times[0]) / (len(end_times) - 1)
+            elif len(end_times) == 1 and fake_end_time is not None:
+                start_time = end_times[0] - (fake_end_time - end_times[0])
+            index.append(collections.OrderedDict([
+                ('target_id', record.target_id), ('start_time', start_time),
+                ('end_times', end_times), ('offsets', offsets)]))
+    return index
+
+def write_record_index(index, record_file, file_permission):
+    '''
+    Write snapshots index of the record file, which maps the snapshot end times
+    to the offsets of the snapshots in the file, for each target.  Remove the
+    previous index file if 'index' is None.
+    '''
+    index_path = record_index_path(record_file)
+    if index is None:
+        if os.path.isfile(index_path):
+            os.remove(index_path)
+        return
+    with open(index_path, 'w') as f:
+        json.dump({'record_file_size': os.path.getsize(record_file),
+                   'targets': index}, f)
+    if file_permission is not None:
+        os.chmod(index_path, file_permission)
 
 def parse_file_permission_str(file_permission_str):
     try:
@@ -488,23 +1919,40 @@ file_type_perf_script = 'perf_script'   # perf script output
 file_type_perf_data = 'perf_data'       # perf record result file
 file_type_json = 'json'                 # list of DamonRecord objects in json
 file_type_json_compressed = 'json_compressed'
+file_type_columnar = 'columnar'     # fixed-width binary arrays, mmap-able
+file_type_framed = 'framed'         # appendable frames of snapshots
+file_type_chunked = 'chunked'       # compressed blocks of snapshots
 
 file_types = [file_type_json_compressed, file_type_json, file_type_perf_script,
-        file_type_perf_data]
+        file_type_perf_data, file_type_columnar, file_type_framed,
+        file_type_chunked]
 self_write_supported_file_types = [file_type_json_compressed, file_type_json,
-        file_type_perf_script]
+        file_type_perf_script, file_type_columnar, file_type_framed,
+        file_type_chunked]
 
 def write_damon_records(records, file_path, file_type, file_permission=None):
     '''Returns None if success, an error string otherwise'''
     if not file_type in self_write_supported_file_types:
         return 'write unsupported file type: %s' % file_type
 
+    # the records could be lazily read from the file to overwrite, e.g., via
+    # mmap() of columnar format file.  Write to a temporary file and replace.
+    tmp_path = '%s.tmp' % file_path
+    index = None
     if file_type == file_type_json_compressed:
-        write_json_compressed(records, file_path)
+        write_json_compressed(records, tmp_path)
     elif file_type == file_type_json:
-        write_json(records, file_path)
+        write_json(records, tmp_path)
     elif file_type == file_type_perf_script:
-        write_perf_script(records, file_path)
+        index = write_perf_script(records, tmp_path)
+    elif file_type == file_type_columnar:
+        write_columnar(records, tmp_path)
+    elif file_type == file_type_framed:
+        write_framed(records, tmp_path)
+    elif file_type == file_type_chunked:
+        write_chunked(records, tmp_path)
+    os.rename(tmp_path, file_path)
+    write_record_index(index, file_path, file_permission)
 
     if file_permission is not None:
         os.chmod(file_path, file_permission)
@@ -635,15 +2083,12 @@ class MemFootprintsSnapshot:
         self.footprints = {}
         for pid in pids:
             self.footprints[pid] = ProcMemFootprint(pid)
-        self.footprints['sys'] = SysMemFootprint(populate=True)
+        # same to the loaded ones, the system footprint has None pid
+        self.footprints[None] = SysMemFootprint(populate=True)
 
     def to_kvpairs(self):
         footprints = []
-        for target, fp in self.footprints.items():
-            if target == 'sys':
-                pid = None
-            else:
-                pid = target
+        for pid, fp in self.footprints.items():
             footprints.append({'pid': pid, 'footprint': fp.to_kvpairs()})
         return {'time': self.time, 'footprints': footprints}
 
@@ -864,66 +2309,171 @@ def load_proc_stats(filepath):
         kvpairs = json.load(f)
     return [ProcStatsSnapshot.from_kvpairs(x) for x in kvpairs]
 
-def add_childs_target(kdamonds):
-    current_targets = kdamonds[0].contexts[0].targets
-
-    for target in current_targets:
-        if target.pid is None:
+def child_pids_of_by_ppid(pid):
+    '''Find child processes by scanning ppid of all processes'''
+    pids = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
             continue
         try:
-            childs_pids = subprocess.check_output(
-                    ['ps', '--ppid', '%s' % target.pid, '-o', 'pid=']
-                    ).decode().split()
+            with open('/proc/%s/stat' % name, 'r') as f:
+                # comm field can have spaces and parentheses
+                fields = f.read().rsplit(')', 1)[1].split()
         except:
-            childs_pids = []
-        if len(childs_pids) == 0:
             continue
+        if fields[1] == '%s' % pid:
+            pids.append(name)
+    return pids
+
+def child_pids_of(pid):
+    '''Returns pids of the child processes of the process, in strings'''
+    if not os.path.isfile('/proc/self/task/%d/children' % os.getpid()):
+        # CONFIG_PROC_CHILDREN is not set
+        return child_pids_of_by_ppid(pid)
+    task_dir = '/proc/%s/task' % pid
+    try:
+        tids = os.listdir(task_dir)
+    except:
+        return []
+    pids = []
+    # each thread can make children
+    for tid in tids:
+        try:
+            with open(os.path.join(task_dir, tid, 'children'), 'r') as f:
+                pids += [p for p in f.read().split() if not p in pids]
+        except:
+            # the thread is terminated
+            continue
+    return pids
 
-        # TODO: Commit all at once, out of this loop
-        new_targets = []
-        for child_pid in childs_pids:
+def add_childs_target(kdamonds, tracker=None):
+    '''Add child processes of the targets to the targets, and commit the
+    updated targets at once.  Returns an error or None'''
+    current_targets = kdamonds[0].contexts[0].targets
+    current_pids = ['%s' % t.pid for t in current_targets]
+
+    childs_pids = []
+    for target in current_targets:
+        if target.pid is None:
+            continue
+        for child_pid in child_pids_of(target.pid):
             # skip the child if already in the targets
-            if child_pid in ['%s' % t.pid for t in current_targets]:
+            if child_pid in current_pids or child_pid in childs_pids:
                 continue
-            # remove already terminated targets, since committing already
-            # terminated targets to DAMON fails
-            new_targets = [target for target in current_targets
-                    if pid_running('%s' % target.pid)]
-            new_targets.append(_damon.DamonTarget(pid=child_pid, regions=[]))
-        if new_targets == []:
-            continue
+            childs_pids.append(child_pid)
+    if len(childs_pids) == 0:
+        return None
 
-        # commit the new set of targets
-        kdamonds[0].contexts[0].targets = new_targets
-        err = _damon.commit(kdamonds)
-        if err is not None:
-            return 'commit failed (%s)' % err
+    # remove already terminated targets, since committing already terminated
+    # targets to DAMON fails
+    if tracker is not None:
+        new_targets = [target for target in current_targets
+                       if tracker.running(target.pid)]
+    else:
+        new_targets = [target for target in current_targets
+                       if pid_running('%s' % target.pid)]
+    for child_pid in childs_pids:
+        new_targets.append(_damon.DamonTarget(pid=child_pid, regions=[]))
+
+    # commit the new set of targets
+    kdamonds[0].contexts[0].targets = new_targets
+    err = _damon.commit(kdamonds)
+    if err is not None:
+        return 'commit failed (%s)' % err
     return None
 
 def pid_running(pid):
-    '''pid should be string'''
+    '''pid should be string.  Zombie processes are treated as terminated'''
     try:
-        subprocess.check_output(['ps', '--pid', pid])
-        return True
+        with open('/proc/%s/stat' % pid, 'r') as f:
+            state = f.read().rsplit(')', 1)[1].split()[0]
     except:
         return False
+    return not state in ['Z', 'X']
+
+class TargetsTracker:
+    '''
+    Tracks termination of target processes.  Uses pidfds of the processes, so
+    that checking termination of all the targets needs only one poll() call.
+    If pidfd is not supported, reads /proc/<pid>/stat of each target.
+    '''
+    pidfds = None       # {pid string: pidfd}
+    poller = None
+    terminated = None   # set of terminated pid strings
+
+    def __init__(self):
+        self.pidfds = {}
+        self.terminated = set()
+        if hasattr(os, 'pidfd_open'):
+            self.poller = select.poll()
+
+    def track(self, pid):
+        if self.poller is None or pid in self.pidfds:
+            return
+        try:
+            pidfd = os.pidfd_open(int(pid))
+        except ProcessLookupError:
+            self.terminated.add(pid)
+            return
+        except OSError:
+            # pidfd_open() is not supported by the kernel
+            self.close()
+            self.poller = None
+            return
+        self.pidfds[pid] = pidfd
+        self.poller.register(pidfd, select.POLLIN)
 
-def all_targets_terminated(targets):
+    def update(self):
+        '''Find targets that terminated since the last update'''
+        if self.poller is None or len(self.pidfds) == 0:
+            return
+        pids = {pidfd: pid for pid, pidfd in self.pidfds.items()}
+        # pidfd becomes readable when the process terminates
+        for pidfd, event in self.poller.poll(0):
+            pid = pids[pidfd]
+            self.poller.unregister(pidfd)
+            os.close(pidfd)
+            del self.pidfds[pid]
+            self.terminated.add(pid)
+
+    def running(self, pid):
+        if pid is None:
+            return False
+        pid = '%s' % pid
+        if pid in self.terminated:
+            return False
+        self.track(pid)
+        if self.poller is None:
+            return pid_running(pid)
+        return pid in self.pidfds
+
+    def close(self):
+        for pidfd in self.pidfds.values():
+            os.close(pidfd)
+        self.pidfds = {}
+
+def all_targets_terminated(targets, tracker=None):
     for target in targets:
-        if pid_running('%s' % target.pid):
+        if tracker is not None:
+            running = tracker.running(target.pid)
+        else:
+            running = pid_running('%s' % target.pid)
+        if running:
             return False
     return True
 
-def poll_target_pids(kdamonds):
+def poll_target_pids(kdamonds, tracker=None):
     '''Return True if >=1 target processes are running'''
     has_running_process = False
     if not kdamonds:
         return False
+    if tracker is not None:
+        tracker.update()
     for kdamond in kdamonds:
         for ctx in kdamond.contexts:
             if not _damon.target_has_pid(ctx.ops):
                 continue
-            if not all_targets_terminated(ctx.targets):
+            if not all_targets_terminated(ctx.targets, tracker):
                 return True
     return False
 
@@ -939,9 +2489,11 @@ class RecordingHandle:
 
     # for access patterns snapshot
     snapshot_request = None
-    snapshot_records = None
+    snapshot_writer = None
     snapshot_count = None
     snapshot_interval_sec = None
+    snapshot_sync_interval_sec = 10
+    nr_snapshots_to_take = None
 
     # for CPU clock event recording
     do_profile = None
@@ -951,6 +2503,14 @@ class RecordingHandle:
     kdamonds = None
     add_child_tasks = None
     mem_footprint_snapshots = None
+    targets_tracker = None
+
+    # intervals for sampling /proc files, and for checking if targets and
+    # DAMON are alive.  /proc files are sampled for each snapshot interval,
+    # or each second, if proc_sample_interval_sec is not set.
+    proc_sample_interval_sec = None
+    liveness_check_interval_sec = 1
+    recording_sources = None
 
     # for vmas recording
     vmas_snapshots = None
@@ -981,9 +2541,164 @@ class RecordingHandle:
             self.vmas_snapshots = []
 
         self.proc_stats = []
+        self.recording_sources = []
 
         self.timeout = timeout
 
+class RecordingSource:
+    '''
+    A source of the recorded data that is sampled for each interval.  The
+    deadlines of the samplings are kept on the grid of the interval from the
+    start of the recording, so that those are not drifted by the time for the
+    samplings.  Deadlines that missed because the previous sampling was not
+    finished in time are skipped, and counted as overruns.
+    '''
+    name = None
+    interval_sec = None
+    record_fn = None    # does the sampling
+    done_fn = None      # handles return of record_fn, returns whether to stop
+    uses_damon = None   # whether record_fn reads or writes DAMON
+    background = None   # whether to run record_fn in a thread
+    next_deadline = None
+    nr_overruns = None
+    future = None       # of record_fn, if background and not yet handled
+
+    def __init__(self, name, interval_sec, record_fn, done_fn=None,
+                 uses_damon=False, background=False):
+        self.name = name
+        self.interval_sec = interval_sec
+        self.record_fn = record_fn
+        self.done_fn = done_fn
+        self.uses_damon = uses_damon
+        self.background = background
+        self.nr_overruns = 0
+
+    def set_next_deadline(self, now):
+        self.next_deadline += self.interval_sec
+        if self.next_deadline <= now:
+            nr_missed = int((now - self.next_deadline) //
+                            self.interval_sec) + 1
+            self.nr_overruns += nr_missed
+            self.next_deadline += nr_missed * self.interval_sec
+
+def snapshot_taken(handle, records_err):
+    '''Save the snapshot, and returns whether all snapshots are taken'''
+    snapshot_records, err = records_err
+    if err is not None:
+        print('failed getting snapshot (%s)' % err)
+        return True
+    if handle.snapshot_writer is None:
+        handle.snapshot_writer = FramedRecordsWriter(
+                handle.file_path, handle.file_permission,
+                handle.snapshot_sync_interval_sec)
+    handle.snapshot_writer.append(snapshot_records)
+    handle.nr_snapshots_to_take -= 1
+    return handle.nr_snapshots_to_take == 0
+
+def recording_sources(handle):
+    sources = []
+    snapshot_interval = handle.snapshot_interval_sec
+    if not snapshot_interval:
+        snapshot_interval = 1
+    interval = handle.proc_sample_interval_sec
+    if interval is None:
+        interval = snapshot_interval
+    if handle.add_child_tasks is True:
+        # adding children commits to DAMON
+        sources.append(RecordingSource(
+            'child tasks', interval,
+            lambda: add_childs_target(handle.kdamonds,
+                                      handle.targets_tracker),
+            uses_damon=True))
+    if handle.mem_footprint_snapshots is not None:
+        sources.append(RecordingSource(
+            'memory footprint', interval,
+            lambda: record_mem_footprint(handle.kdamonds,
+                                         handle.mem_footprint_snapshots)))
+    if handle.vmas_snapshots is not None:
+        sources.append(RecordingSource(
+            'vmas', interval,
+            lambda: record_proc_vmas(handle.kdamonds,
+                                     handle.vmas_snapshots)))
+    sources.append(RecordingSource(
+        'proc stats', interval,
+        lambda: record_proc_stats(handle.kdamonds, handle.proc_stats)))
+    if handle.snapshot_request:
+        # snapshot waits for DAMON, so overlap it with the others
+        handle.nr_snapshots_to_take = handle.snapshot_count
+        sources.append(RecordingSource(
+            'snapshot', snapshot_interval,
+            lambda: get_snapshot_records_of(handle.snapshot_request),
+            done_fn=lambda records_err: snapshot_taken(handle, records_err),
+            uses_damon=True, background=True))
+    return sources
+
+def damon_busy(sources):
+    for source in sources:
+        if source.uses_damon and source.future is not None:
+            return True
+    return False
+
+def run_due_sources(sources, executor):
+    '''
+    Handle finished background samplings, and start samplings of sources
+    that reached the deadlines.  Returns whether to stop the recording.
+    '''
+    for source in sources:
+        if source.future is not None and source.future.done():
+            future = source.future
+            source.future = None
+            if source.done_fn is not None and source.done_fn(
+                    future.result()):
+                return True
+
+    now = time.time()
+    for source in sorted(sources, key=lambda s: s.next_deadline):
+        if source.next_deadline > now:
+            continue
+        if source.future is not None:
+            # previous sampling is not finished yet.  Skip this deadline.
+            source.nr_overruns += 1
+            source.set_next_deadline(now)
+            continue
+        if source.uses_damon and damon_busy(sources):
+            # run after the DAMON-using sampling is finished
+            continue
+        if source.background:
+            source.future = executor.submit(source.record_fn)
+        else:
+            source.record_fn()
+        source.set_next_deadline(time.time())
+    return False
+
+def finish_background_samplings(sources):
+    '''
+    Wait for in-flight background samplings, and hand the results to the
+    done_fn of the sources.  Should be called before cleaning up DAMON, since
+    the samplings could be committing to DAMON.
+    '''
+    for source in sources:
+        if source.future is None:
+            continue
+        future = source.future
+        source.future = None
+        if source.done_fn is not None:
+            source.done_fn(future.result())
+
+def wait_next_deadline(sources, max_wait_sec):
+    '''Wait until a deadline or finish of a background sampling'''
+    futures = [s.future for s in sources if s.future is not None]
+    deadlines = [s.next_deadline for s in sources
+                 if not (s.uses_damon and damon_busy(sources))]
+    timeout = max_wait_sec
+    if len(deadlines) > 0:
+        timeout = min(max(min(deadlines) - time.time(), 0), max_wait_sec)
+    if len(futures) > 0:
+        concurrent.futures.wait(futures, timeout,
+                                concurrent.futures.FIRST_COMPLETED)
+    else:
+        time.sleep(timeout)
+
 def start_recording(handle):
     if handle.tracepoint is not None:
         handle.perf_pipe = subprocess.Popen(
@@ -994,45 +2709,31 @@ def start_recording(handle):
         handle.perf_profile_pipe = subprocess.Popen(cmd)
 
     start_time = time.time()
-    nr_snapshots_to_take = handle.snapshot_count
-    if handle.snapshot_interval_sec:
-        sleep_time = handle.snapshot_interval_sec
-    else:
-        sleep_time = 1
-    while (poll_target_pids(handle.kdamonds) or
-           _damon.any_kdamond_running()):
-        if handle.add_child_tasks is True:
-            add_childs_target(handle.kdamonds)
-
-        if handle.mem_footprint_snapshots is not None:
-            record_mem_footprint(handle.kdamonds,
-                                 handle.mem_footprint_snapshots)
-        if handle.vmas_snapshots is not None:
-            record_proc_vmas(handle.kdamonds, handle.vmas_snapshots)
-
-        record_proc_stats(handle.kdamonds, handle.proc_stats)
-        if (handle.timeout is not None and
-            time.time() - start_time >= handle.timeout):
-            break
-
-        if handle.snapshot_request:
-            if handle.snapshot_records is None:
-                handle.snapshot_records = []
-            snapshot_records, err = get_snapshot_records_of(
-                    handle.snapshot_request)
-            if err is not None:
-                print('failed getting snapshot')
-                exit(1)
-            handle.snapshot_records += snapshot_records
-            nr_snapshots_to_take -= 1
-            if nr_snapshots_to_take == 0:
-                handle.snapshot_records = merge_records(
-                        handle.snapshot_records)
+    handle.targets_tracker = TargetsTracker()
+    handle.recording_sources = recording_sources(handle)
+    for source in handle.recording_sources:
+        source.next_deadline = start_time
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        while (poll_target_pids(handle.kdamonds, handle.targets_tracker) or
+               _damon.any_kdamond_running()):
+            if (handle.timeout is not None and
+                time.time() - start_time >= handle.timeout):
                 break
-
-        time.sleep(sleep_time)
+            if run_due_sources(handle.recording_sources, executor):
+                break
+            wait_next_deadline(handle.recording_sources,
+                               handle.liveness_check_interval_sec)
+        finish_background_samplings(handle.recording_sources)
 
 def finish_recording(handle):
+    if handle.targets_tracker is not None:
+        handle.targets_tracker.close()
+    for source in handle.recording_sources:
+        if source.nr_overruns > 0:
+            print('%s sampling missed %d intervals' %
+                  (source.name, source.nr_overruns))
+
     if handle.perf_pipe:
         try:
             handle.perf_pipe.send_signal(signal.SIGINT)
@@ -1050,9 +2751,14 @@ def finish_recording(handle):
                 print('converting format from perf_data to %s failed (%s)' %
                         (handle.file_format, err))
 
-    if handle.snapshot_records:
-        write_damon_records(handle.snapshot_records, handle.file_path,
-                            handle.file_format, handle.file_permission)
+    if handle.snapshot_writer is not None:
+        handle.snapshot_writer.close()
+        if handle.file_format != file_type_framed:
+            err = update_records_file(handle.file_path, handle.file_format,
+                                      handle.file_permission)
+            if err is not None:
+                print('converting format from %s to %s failed (%s)' %
+                      (file_type_framed, handle.file_format, err))
 
     if handle.perf_profile_pipe is not None:
         try:
@@ -1082,7 +2788,8 @@ def find_install_scheme(scheme_to_find):
     '''
     installed = False
     indices = []
-    kdamonds = _damon.current_kdamonds()
+    kdamonds = _damon.current_kdamonds(read_stats=False,
+                                       read_tried_regions=False)
     for kidx, kdamond in enumerate(kdamonds):
         for cidx, ctx in enumerate(kdamond.contexts):
             ctx_has_the_scheme = False
@@ -1136,7 +2843,8 @@ def tried_regions_to_records_of(idxs, merge_regions):
     '''idxs: list of kdamond/context/scheme indices to get records for.  If it
     is None, return records for all schemes'''
     records = []
-    for kdamond_idx, kdamond in enumerate(_damon.current_kdamonds()):
+    for kdamond_idx, kdamond in enumerate(
+            _damon.current_kdamonds(read_stats=False)):
         if kdamond.state != 'on':
             continue
         for ctx_idx, ctx in enumerate(kdamond.contexts):
@@ -1245,7 +2953,8 @@ def get_snapshot_records(monitor_scheme, total_sz_only, merge_regions):
     if len(running_kdamond_idxs) == 0:
         return None, 'no kdamond running'
 
-    orig_kdamonds = _damon.current_kdamonds()
+    orig_kdamonds = _damon.current_kdamonds(read_stats=False,
+                                            read_tried_regions=False)
 
     err = install_target_regions_if_needed(orig_kdamonds)
     if err is not None:
@@ -1413,20 +3122,33 @@ class RecordGetRequest:
     total_sz_only = None
     dont_merge_regions = None
 
+    # for record file.  time range of snapshots to read, in nanoseconds.
+    # relative to the first snapshot of each record if time_range_relative.
+    # only snapshots started in the range if time_range_by_start_time.
+    time_range = None
+    time_range_relative = None
+    time_range_by_start_time = None
+
     def __init__(
             self, tried_regions_of=None, record_file=None, record_filter=None,
-            total_sz_only=False, dont_merge_regions=True):
+            total_sz_only=False, dont_merge_regions=True, time_range=None,
+            time_range_relative=False, time_range_by_start_time=False):
         self.tried_regions_of = tried_regions_of
         self.record_file = record_file
         self.record_filter = record_filter
         self.total_sz_only = total_sz_only
         self.dont_merge_regions = dont_merge_regions
+        self.time_range = time_range
+        self.time_range_relative = time_range_relative
+        self.time_range_by_start_time = time_range_by_start_time
 
 def get_records(tried_regions_of=None, record_file=None, record_filter=None,
-                total_sz_only=False, dont_merge_regions=True):
+                total_sz_only=False, dont_merge_regions=True, time_range=None,
+                time_range_relative=False, time_range_by_start_time=False):
     request = RecordGetRequest(
             tried_regions_of, record_file, record_filter,
-            total_sz_only, dont_merge_regions)
+            total_sz_only, dont_merge_regions, time_range,
+            time_range_relative, time_range_by_start_time)
     if request.record_file is None:
         records, err = get_snapshot_records_of(request)
         if err is not None:
@@ -1442,7 +3164,13 @@ def get_records(tried_regions_of=None, record_file=None, record_filter=None,
         if not os.path.isfile(request.record_file):
             return None, '%s not found' % request.record_file
 
-        records, err = parse_records_file(request.record_file)
+        if request.time_range is None:
+            records, err = parse_records_file_cached(request.record_file)
+        else:
+            records, err = parse_records_file_in_time_range(
+                    request.record_file, request.time_range,
+                    request.time_range_relative,
+                    request.time_range_by_start_time)
         if err:
             return None, ('parsing %s failed (%s)' %
                     (request.record_file, err))
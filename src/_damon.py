@@ -10,7 +10,6 @@ import json
 import os
 import random
 import time
-import subprocess
 
 import _damo_fmt_str
 
@@ -87,10 +86,11 @@ unit_usec = 'usec'
 unit_aggr_intervals = 'aggr_intervals'
 
 class DamonNrAccesses:
-    samples = None
-    percent = None
+    __slots__ = ['samples', 'percent']
 
     def __init__(self, val, unit):
+        self.samples = None
+        self.percent = None
         if val == None or unit == None:
             return
         if unit == unit_samples:
@@ -101,7 +101,7 @@ class DamonNrAccesses:
             raise Exception('invalid DamonNrAccesses unit \'%s\'' % unit)
 
     def __eq__(self, other):
-        return (type(self) == type(other) and
+        return (isinstance(other, DamonNrAccesses) and
                 ((self.samples != None and self.samples == other.samples) or
                     (self.percent != None and self.percent == other.percent)))
 
@@ -136,10 +136,11 @@ class DamonNrAccesses:
                 [('samples', self.samples), ('percent', self.percent)])
 
 class DamonAge:
-    usec = None
-    aggr_intervals = None
+    __slots__ = ['usec', 'aggr_intervals', 'unit']
 
     def __init__(self, val, unit):
+        self.usec = None
+        self.aggr_intervals = None
         if val == None and unit != None:
             self.unit = unit
             return
@@ -153,7 +154,7 @@ class DamonAge:
             raise Exception('DamonAge unsupported unit (%s)' % unit)
 
     def __eq__(self, other):
-        return (type(self) == type(other) and
+        return (isinstance(other, DamonAge) and
                 ((self.usec != None and self.usec == other.usec) or
                     (self.aggr_intervals != None and
                         self.aggr_intervals == other.aggr_intervals)))
@@ -189,25 +190,126 @@ class DamonAge:
                         _damo_fmt_str.format_nr(self.aggr_intervals, raw)
                         if self.aggr_intervals != None else None)])
 
+class RegionNrAccesses(DamonNrAccesses):
+    '''
+    DamonNrAccesses of a DamonRegion.  Reads and writes the values that are
+    stored in the region.
+    '''
+    __slots__ = ['region']
+
+    def __init__(self, region):
+        self.region = region
+
+    @property
+    def samples(self):
+        return self.region.nr_accesses_samples
+
+    @samples.setter
+    def samples(self, samples):
+        self.region.nr_accesses_samples = samples
+
+    @property
+    def percent(self):
+        return self.region.nr_accesses_percent
+
+    @percent.setter
+    def percent(self, percent):
+        self.region.nr_accesses_percent = percent
+
+class RegionAge(DamonAge):
+    '''
+    DamonAge of a DamonRegion.  Reads and writes the values that are stored in
+    the region.
+    '''
+    __slots__ = ['region']
+
+    def __init__(self, region):
+        self.region = region
+
+    @property
+    def usec(self):
+        return self.region.age_usec
+
+    @usec.setter
+    def usec(self, usec):
+        self.region.age_usec = usec
+
+    @property
+    def aggr_intervals(self):
+        return self.region.age_aggr_intervals
+
+    @aggr_intervals.setter
+    def aggr_intervals(self, aggr_intervals):
+        self.region.age_aggr_intervals = aggr_intervals
+
 class DamonRegion:
+    '''
+    Records could have a huge number of regions.  To save memory, values of
+    nr_accesses and age are stored in the region itself, and 'nr_accesses' and
+    'age' attributes return objects for accessing the values.
+    '''
     # [start, end)
-    start = None
-    end = None
     # nr_accesses and age could be None
-    nr_accesses = None
-    age = None
-    scheme = None # non-None if tried region
+    # scheme is non-None if tried region
+    __slots__ = ['start', 'end', 'has_access_pattern', 'nr_accesses_samples',
+                 'nr_accesses_percent', 'age_usec', 'age_aggr_intervals',
+                 'scheme']
 
     def __init__(self, start, end, nr_accesses=None, nr_accesses_unit=None,
             age=None, age_unit=None):
         self.start = _damo_fmt_str.text_to_bytes(start)
         self.end = _damo_fmt_str.text_to_bytes(end)
+        self.scheme = None
 
         if nr_accesses == None:
+            self.nr_accesses = None
+            self.age = None
+            return
+        if nr_accesses_unit == unit_samples and \
+                age_unit == unit_aggr_intervals:
+            self.has_access_pattern = True
+            self.nr_accesses_samples = _damo_fmt_str.text_to_nr(nr_accesses)
+            self.nr_accesses_percent = None
+            self.age_usec = None
+            self.age_aggr_intervals = (_damo_fmt_str.text_to_nr(age)
+                                       if age != None else None)
             return
         self.nr_accesses = DamonNrAccesses(nr_accesses, nr_accesses_unit)
         self.age = DamonAge(age, age_unit)
 
+    @property
+    def nr_accesses(self):
+        if not self.has_access_pattern:
+            return None
+        return RegionNrAccesses(self)
+
+    @nr_accesses.setter
+    def nr_accesses(self, nr_accesses):
+        if nr_accesses == None:
+            self.has_access_pattern = False
+            self.nr_accesses_samples = None
+            self.nr_accesses_percent = None
+            return
+        self.has_access_pattern = True
+        self.nr_accesses_samples = nr_accesses.samples
+        self.nr_accesses_percent = nr_accesses.percent
+
+    @property
+    def age(self):
+        if not self.has_access_pattern:
+            return None
+        return RegionAge(self)
+
+    @age.setter
+    def age(self, age):
+        if age == None:
+            self.age_usec = None
+            self.age_aggr_intervals = None
+            return
+        self.has_access_pattern = True
+        self.age_usec = age.usec
+        self.age_aggr_intervals = age.aggr_intervals
+
     def to_str(self, raw, intervals=None):
         if self.nr_accesses == None:
             return _damo_fmt_str.format_addr_range(self.start, self.end, raw)
@@ -236,8 +338,7 @@ class DamonRegion:
 
     # For aggregate_snapshots() support
     def __hash__(self):
-        identification = '%s-%s' % (self.start, self.end)
-        return hash(identification)
+        return hash((self.start, self.end))
 
     @classmethod
     def from_kvpairs(cls, kvpairs):
@@ -978,10 +1079,20 @@ class Kdamond:
         if self.state == "off":
             return "0.0"
         try:
-            res = subprocess.check_output(['ps', '-p', self.pid, '-o', '%cpu'], text=True)
-            return res.split("\n")[1].strip()
+            with open('/proc/%s/stat' % self.pid, 'r') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            with open('/proc/uptime', 'r') as f:
+                uptime = float(f.read().split()[0])
         except:
             return "(error)"
+        # same to '%cpu' of ps, cpu time divided by elapsed time, in permille
+        hz = os.sysconf('SC_CLK_TCK')
+        cpu_time = (int(fields[11]) + int(fields[12])) / hz
+        elapsed_time = uptime - int(fields[19]) / hz
+        if elapsed_time <= 0:
+            return "0.0"
+        permille = int(cpu_time * 1000 / elapsed_time)
+        return '%d.%d' % (permille // 10, permille % 10)
 
     @classmethod
     def from_kvpairs(cls, kv):
@@ -1182,8 +1293,8 @@ def damon_interface():
 
 # DAMON control
 
-def stage_kdamonds(kdamonds):
-    return _damon_fs.stage_kdamonds(kdamonds)
+def stage_kdamonds(kdamonds, changes_only=False):
+    return _damon_fs.stage_kdamonds(kdamonds, changes_only)
 
 def commit_staged(kdamond_idxs):
     if _damon_fs == _damon_dbgfs:
@@ -1197,7 +1308,8 @@ def commit_quota_goals(kdamond_idxs):
 
 def commit(kdamonds, commit_quota_goals_only=False):
     if not commit_quota_goals_only:
-        err = stage_kdamonds(kdamonds)
+        # write only the changes, to make the commit fast and less disturbing
+        err = stage_kdamonds(kdamonds, changes_only=True)
         if err:
             return 'staging updates failed (%s)' % err
 
@@ -1271,8 +1383,16 @@ def turn_damon_off(kdamonds_idxs):
 def is_kdamond_running(kdamond_idx):
     return _damon_fs.is_kdamond_running(kdamond_idx)
 
-def current_kdamonds():
-    return _damon_fs.current_kdamonds()
+def current_kdamonds(read_contexts=True, read_stats=True,
+                     read_tried_regions=True):
+    '''
+    Returns current kdamonds.  Callers that need only parts of the status can
+    skip reading contexts, schemes stats, or schemes tried regions.  Skipped
+    contexts and tried regions are read as empty lists, and skipped stats are
+    read as DamosStats of default values.
+    '''
+    return _damon_fs.current_kdamonds(read_contexts, read_stats,
+                                      read_tried_regions)
 
 def update_read_kdamonds(nr_retries=0, update_stats=True,
         update_tried_regions=True, update_quota_effective_bytes=False):
@@ -203,7 +203,7 @@ def write_kdamonds(dir_path, kdamonds):
     err = write_schemes(dir_path, ctx.schemes, ctx.intervals)
     return err
 
-def stage_kdamonds(kdamonds):
+def stage_kdamonds(kdamonds, changes_only=False):
     '''Return error'''
     if _damon.any_kdamond_running():
         return 'DAMON debugfs doesn\'t support online staging'
@@ -309,7 +309,9 @@ def files_content_to_kdamonds(files_content):
     pid = files_content['kdamond_pid'].strip()
     return [_damon.Kdamond(state, pid, [ctx])]
 
-def current_kdamonds():
+def current_kdamonds(read_contexts=True, read_stats=True,
+                     read_tried_regions=True):
+    # debugfs interface files are small and mix the parts.  Read all.
     return files_content_to_kdamonds(
             _damo_fs.read_files(get_damon_dir()))
 
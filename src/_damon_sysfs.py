@@ -89,9 +89,25 @@ def update_schemes_quota_effective_bytes(kdamond_idxs):
 
 # for stage_kdamonds
 
-def write_filter_dir(dir_path, filter_):
-    err = _damo_fs.write_file(
-            os.path.join(dir_path, 'type'), filter_.filter_type)
+# 'staged' arguments of below functions are contents of the files under
+# kdamonds directory that staged before, keyed by the paths, or None if every
+# file should be written.
+
+def write_file(file_path, content, staged):
+    '''
+    Write the content to the file, unless the file is known to have the
+    content already.  Returns None if success, error string otherwise.
+    '''
+    if staged is not None:
+        staged_content = staged.get(file_path)
+        if (staged_content is not None and
+                staged_content.strip() == content.strip()):
+            return None
+    return _damo_fs.write_file(file_path, content)
+
+def write_filter_dir(dir_path, filter_, staged):
+    err = write_file(
+            os.path.join(dir_path, 'type'), filter_.filter_type, staged)
     if err is not None:
         # todo: make error message more detailed.
         # anon/memcg are merged in 6.3-rc1
@@ -99,35 +115,42 @@ def write_filter_dir(dir_path, filter_):
         return err
 
     if filter_.memcg_path is not None:
-        err = _damo_fs.write_file(
-                os.path.join(dir_path, 'memcg_path'), filter_.memcg_path)
+        err = write_file(
+                os.path.join(dir_path, 'memcg_path'),
+                filter_.memcg_path, staged)
         if err is not None:
             return err
 
     if filter_.address_range is not None:
-        err = _damo_fs.write_file(
+        err = write_file(
                 os.path.join(dir_path, 'addr_start'),
-                '%d' % filter_.address_range.start)
+                '%d' % filter_.address_range.start, staged)
         if err is not None:
             return err
 
-        err = _damo_fs.write_file(
+        err = write_file(
                 os.path.join(dir_path, 'addr_end'),
-                '%d' % filter_.address_range.end)
+                '%d' % filter_.address_range.end, staged)
         if err is not None:
             return err
 
     if filter_.damon_target_idx is not None:
-        err = _damo_fs.write_file(
+        err = write_file(
                 os.path.join(dir_path, 'damon_target_idx'),
-                '%d' % filter_.damon_target_idx)
+                '%d' % filter_.damon_target_idx, staged)
         if err is not None:
             return err
 
-    return _damo_fs.write_file(os.path.join(dir_path, 'matching'),
-                               'Y' if filter_.matching else 'N')
+    return write_file(os.path.join(dir_path, 'matching'),
+                      'Y' if filter_.matching else 'N', staged)
 
-def ensure_nr_file_for(file_path, list_):
+def forget_staged_files_under(dir_path, staged):
+    dir_prefix = os.path.join(dir_path, '')
+    for file_path in list(staged.keys()):
+        if file_path.startswith(dir_prefix):
+            del staged[file_path]
+
+def ensure_nr_file_for(file_path, list_, staged):
     content, err = _damo_fs.read_file(file_path)
     if err is not None:
         return err
@@ -135,185 +158,200 @@ def ensure_nr_file_for(file_path, list_):
     desired_nr = len(list_)
     if current_nr == desired_nr:
         return None
-    return _damo_fs.write_file(file_path, '%d' % desired_nr)
+    if staged is not None:
+        # writing nr file recreates the directories with default values
+        forget_staged_files_under(os.path.dirname(file_path), staged)
+    return write_file(file_path, '%d' % desired_nr, staged)
 
-def write_filters_dir(dir_path, filters):
+def write_filters_dir(dir_path, filters, staged):
     # filters merged in v6.3-rc1
     if not os.path.isdir(dir_path):
         if len(filters) == 0:
             return None
         return 'the kernel is not supporting filters'
 
-    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_filters'), filters)
+    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_filters'),
+                             filters, staged)
     if err is not None:
         return err
 
     for idx, filter_ in enumerate(filters):
-        err = write_filter_dir(os.path.join(dir_path, '%d' % idx), filter_)
+        err = write_filter_dir(os.path.join(dir_path, '%d' % idx),
+                               filter_, staged)
         if err is not None:
             return err
     return None
 
-def write_watermarks_dir(dir_path, wmarks):
+def write_watermarks_dir(dir_path, wmarks, staged):
     if wmarks is None:
         # TODO: ensure wmarks is not None
         return None
-    err = _damo_fs.write_file(os.path.join(dir_path, 'metric'), wmarks.metric)
+    err = write_file(os.path.join(dir_path, 'metric'), wmarks.metric, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(
-            os.path.join(dir_path, 'interval_us'), '%d' % wmarks.interval_us)
+    err = write_file(
+            os.path.join(dir_path, 'interval_us'),
+            '%d' % wmarks.interval_us, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(
-            os.path.join(dir_path, 'high'), '%d' % wmarks.high_permil)
+    err = write_file(
+            os.path.join(dir_path, 'high'), '%d' % wmarks.high_permil, staged)
     if err is not None:
         return err
-    err = _damo_fs.write_file(
-            os.path.join(dir_path, 'mid'), '%d' % wmarks.mid_permil)
+    err = write_file(
+            os.path.join(dir_path, 'mid'), '%d' % wmarks.mid_permil, staged)
     if err is not None:
         return err
-    return _damo_fs.write_file(
-            os.path.join(dir_path, 'low'), '%d' % wmarks.low_permil)
+    return write_file(
+            os.path.join(dir_path, 'low'), '%d' % wmarks.low_permil, staged)
 
-def write_quota_goal_dir(dir_path, goal):
+def write_quota_goal_dir(dir_path, goal, staged):
     # goal metric is wip as of 6.8-rc4 days.
     if (not os.path.isfile(os.path.join(dir_path, 'target_metric')) and
         goal.metric != 'user_input'):
         return 'the kernel is not supporting quota goal metric'
 
     if os.path.isfile(os.path.join(dir_path, 'target_metric')):
-        err = _damo_fs.write_file(os.path.join(dir_path, 'target_metric'),
-                                  '%s' % goal.metric)
+        err = write_file(os.path.join(dir_path, 'target_metric'),
+                         '%s' % goal.metric, staged)
         if err is not None:
             return err
 
-    err = _damo_fs.write_file(
+    err = write_file(
             os.path.join(dir_path, 'target_value'),
-            '%d' % goal.target_value)
+            '%d' % goal.target_value, staged)
     if err is not None:
         return err
 
-    return _damo_fs.write_file(
+    return write_file(
             os.path.join(dir_path, 'current_value'),
-            '%d' % goal.current_value)
+            '%d' % goal.current_value, staged)
 
-def write_quota_goals_dir(dir_path, goals):
+def write_quota_goals_dir(dir_path, goals, staged):
     # goals dir has merged in 6.8-rc1
     if not os.path.isdir(dir_path):
         if len(goals) == 0:
             return None
         return 'the kernel is not supporting schemes quota goals'
 
-    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_goals'), goals)
+    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_goals'), goals, staged)
     if err is not None:
         return err
 
     for idx, goal in enumerate(goals):
-        err = write_quota_goal_dir(os.path.join(dir_path, '%d' % idx), goal)
+        err = write_quota_goal_dir(os.path.join(dir_path, '%d' % idx),
+                                   goal, staged)
         if err is not None:
             return err
     return None
 
-def write_quota_weights_dir(dir_path, quotas):
-    err = _damo_fs.write_file(os.path.join(dir_path, 'sz_permil'),
-                              '%d' % quotas.weight_sz_permil)
+def write_quota_weights_dir(dir_path, quotas, staged):
+    err = write_file(os.path.join(dir_path, 'sz_permil'),
+                     '%d' % quotas.weight_sz_permil, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(os.path.join(dir_path, 'nr_accesses_permil'),
-                              '%d' % quotas.weight_nr_accesses_permil)
+    err = write_file(os.path.join(dir_path, 'nr_accesses_permil'),
+                     '%d' % quotas.weight_nr_accesses_permil, staged)
     if err is not None:
         return err
 
-    return _damo_fs.write_file(os.path.join(dir_path, 'age_permil'),
-                              '%d' % quotas.weight_age_permil)
+    return write_file(os.path.join(dir_path, 'age_permil'),
+                      '%d' % quotas.weight_age_permil, staged)
 
-def write_quotas_dir(dir_path, quotas):
-    err = _damo_fs.write_file(
-            os.path.join(dir_path, 'ms'), '%d' % quotas.time_ms)
+def write_quotas_dir(dir_path, quotas, staged):
+    err = write_file(
+            os.path.join(dir_path, 'ms'), '%d' % quotas.time_ms, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(
-            os.path.join(dir_path, 'bytes'), '%d' % quotas.sz_bytes)
+    err = write_file(
+            os.path.join(dir_path, 'bytes'), '%d' % quotas.sz_bytes, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(os.path.join(dir_path, 'reset_interval_ms'),
-                              '%d' % quotas.reset_interval_ms)
+    err = write_file(os.path.join(dir_path, 'reset_interval_ms'),
+                     '%d' % quotas.reset_interval_ms, staged)
     if err is not None:
         return err
 
-    err = write_quota_weights_dir(os.path.join(dir_path, 'weights'), quotas)
+    err = write_quota_weights_dir(os.path.join(dir_path, 'weights'),
+                                  quotas, staged)
     if err is not None:
         return err
 
-    return write_quota_goals_dir(os.path.join(dir_path, 'goals'), quotas.goals)
+    return write_quota_goals_dir(os.path.join(dir_path, 'goals'),
+                                 quotas.goals, staged)
 
-def write_scheme_access_pattern_dir(dir_path, pattern):
-    err = _damo_fs.write_file(
-            os.path.join(dir_path, 'sz', 'min'), '%d' % pattern.sz_bytes[0])
+def write_scheme_access_pattern_dir(dir_path, pattern, staged):
+    err = write_file(
+            os.path.join(dir_path, 'sz', 'min'),
+            '%d' % pattern.sz_bytes[0], staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(
-            os.path.join(dir_path, 'sz', 'max'), '%d' % pattern.sz_bytes[1])
+    err = write_file(
+            os.path.join(dir_path, 'sz', 'max'),
+            '%d' % pattern.sz_bytes[1], staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(os.path.join(dir_path, 'nr_accesses', 'min'),
-                              '%d' % pattern.nr_acc_min_max[0].samples)
+    err = write_file(os.path.join(dir_path, 'nr_accesses', 'min'),
+                     '%d' % pattern.nr_acc_min_max[0].samples, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(os.path.join(dir_path, 'nr_accesses', 'max'),
-                              '%d' % pattern.nr_acc_min_max[1].samples)
+    err = write_file(os.path.join(dir_path, 'nr_accesses', 'max'),
+                     '%d' % pattern.nr_acc_min_max[1].samples, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(os.path.join(dir_path, 'age', 'min'),
-                              '%d' % pattern.age_min_max[0].aggr_intervals)
+    err = write_file(os.path.join(dir_path, 'age', 'min'),
+                     '%d' % pattern.age_min_max[0].aggr_intervals, staged)
     if err is not None:
         return err
-    return _damo_fs.write_file(os.path.join(dir_path, 'age', 'max'),
-                              '%d' % pattern.age_min_max[1].aggr_intervals)
+    return write_file(os.path.join(dir_path, 'age', 'max'),
+                      '%d' % pattern.age_min_max[1].aggr_intervals, staged)
 
-def write_scheme_dir(dir_path, scheme):
+def write_scheme_dir(dir_path, scheme, staged):
     err = write_scheme_access_pattern_dir(
-            os.path.join(dir_path, 'access_pattern'), scheme.access_pattern)
+            os.path.join(dir_path, 'access_pattern'),
+            scheme.access_pattern, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(os.path.join(dir_path, 'action'), scheme.action)
+    err = write_file(os.path.join(dir_path, 'action'), scheme.action, staged)
     if err is not None:
         return err
 
-    err = write_quotas_dir(os.path.join(dir_path, 'quotas'), scheme.quotas)
+    err = write_quotas_dir(os.path.join(dir_path, 'quotas'),
+                           scheme.quotas, staged)
     if err is not None:
         return err
 
     err = write_watermarks_dir(
-            os.path.join(dir_path, 'watermarks'), scheme.watermarks)
+            os.path.join(dir_path, 'watermarks'), scheme.watermarks, staged)
     if err is not None:
         return err
 
     if scheme.target_nid is not None:
-        err = _damo_fs.write_file(os.path.join(dir_path,'target_nid'), '%s' % scheme.target_nid)
+        err = write_file(os.path.join(dir_path, 'target_nid'),
+                         '%s' % scheme.target_nid, staged)
         if err is not None:
             return err
 
-    err = write_filters_dir(os.path.join(dir_path, 'filters'), scheme.filters)
+    err = write_filters_dir(os.path.join(dir_path, 'filters'),
+                            scheme.filters, staged)
     if err is not None:
         return err
 
     apply_interval_file = os.path.join(dir_path, 'apply_interval_us')
     # schemes apply interval is merged in v6.7-rc1
     if os.path.isfile(apply_interval_file):
-        err = _damo_fs.write_file(apply_interval_file,
-                                  '%d' % scheme.apply_interval_us)
+        err = write_file(apply_interval_file,
+                         '%d' % scheme.apply_interval_us, staged)
         if err is not None:
             return err
     else:
@@ -321,101 +359,107 @@ def write_scheme_dir(dir_path, scheme):
             return 'the kernel is not supporting schemes apply interval'
     return None
 
-def write_schemes_dir(dir_path, schemes):
-    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_schemes'), schemes)
+def write_schemes_dir(dir_path, schemes, staged):
+    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_schemes'),
+                             schemes, staged)
     if err is not None:
         return err
 
     for idx, scheme in enumerate(schemes):
-        err = write_scheme_dir(os.path.join(dir_path, '%d' % idx), scheme)
+        err = write_scheme_dir(os.path.join(dir_path, '%d' % idx),
+                               scheme, staged)
         if err is not None:
             return err
 
-def write_target_region_dir(dir_path, region):
-    err = _damo_fs.write_file(
-            os.path.join(dir_path, 'start'), '%d' % region.start)
+def write_target_region_dir(dir_path, region, staged):
+    err = write_file(
+            os.path.join(dir_path, 'start'), '%d' % region.start, staged)
     if err is not None:
         return err
 
-    return _damo_fs.write_file(
-            os.path.join(dir_path, 'end'), '%d' % region.end)
+    return write_file(
+            os.path.join(dir_path, 'end'), '%d' % region.end, staged)
 
-def write_target_regions_dir(dir_path, regions):
-    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_regions'), regions)
+def write_target_regions_dir(dir_path, regions, staged):
+    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_regions'),
+                             regions, staged)
     if err is not None:
         return err
 
     for idx, region in enumerate(regions):
         err = write_target_region_dir(
-                os.path.join(dir_path, '%d' % idx), region)
+                os.path.join(dir_path, '%d' % idx), region, staged)
         if err is not None:
             return err
     return None
 
-def write_target_dir(dir_path, target):
+def write_target_dir(dir_path, target, staged):
     if target.pid is not None:
-        err = _damo_fs.write_file(
-                os.path.join(dir_path, 'pid_target'), '%s' % target.pid)
+        err = write_file(
+                os.path.join(dir_path, 'pid_target'),
+                '%s' % target.pid, staged)
         if err is not None:
             return err
 
     return write_target_regions_dir(
-            os.path.join(dir_path, 'regions'), target.regions)
+            os.path.join(dir_path, 'regions'), target.regions, staged)
 
 
-def write_targets_dir(dir_path, targets):
-    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_targets'), targets)
+def write_targets_dir(dir_path, targets, staged):
+    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_targets'),
+                             targets, staged)
     if err is not None:
         return err
 
     for idx, target in enumerate(targets):
-        err = write_target_dir(os.path.join(dir_path, '%d' % idx), target)
+        err = write_target_dir(os.path.join(dir_path, '%d' % idx),
+                               target, staged)
         if err is not None:
             return err
     return None
 
-def write_monitoring_attrs_dir(dir_path, context):
-    err = _damo_fs.write_file(
+def write_monitoring_attrs_dir(dir_path, context, staged):
+    err = write_file(
             os.path.join(dir_path, 'intervals', 'sample_us'),
-            '%d' % context.intervals.sample)
+            '%d' % context.intervals.sample, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(
+    err = write_file(
             os.path.join(dir_path, 'intervals', 'aggr_us'),
-            '%d' % context.intervals.aggr)
+            '%d' % context.intervals.aggr, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(
+    err = write_file(
             os.path.join(dir_path, 'intervals', 'update_us'),
-            '%d' % context.intervals.ops_update)
+            '%d' % context.intervals.ops_update, staged)
     if err is not None:
         return err
 
-    err = _damo_fs.write_file(
+    err = write_file(
             os.path.join(dir_path, 'nr_regions', 'min'),
-            '%d' % context.nr_regions.minimum)
+            '%d' % context.nr_regions.minimum, staged)
     if err is not None:
         return err
 
-    return _damo_fs.write_file(
+    return write_file(
             os.path.join(dir_path, 'nr_regions', 'max'),
-            '%d' % context.nr_regions.maximum)
+            '%d' % context.nr_regions.maximum, staged)
 
-def write_context_dir(dir_path, context):
-    err = _damo_fs.write_file(os.path.join(dir_path, 'operations'),
-                              context.ops)
+def write_context_dir(dir_path, context, staged):
+    err = write_file(os.path.join(dir_path, 'operations'),
+                     context.ops, staged)
     if err is not None:
         return err
 
     err = write_monitoring_attrs_dir(
-            os.path.join(dir_path, 'monitoring_attrs'), context)
+            os.path.join(dir_path, 'monitoring_attrs'), context, staged)
     if err is not None:
         return err
 
     err = write_targets_dir(
-            os.path.join(dir_path, 'targets'), context.targets)
+            os.path.join(dir_path, 'targets'), context.targets, staged)
     if err is not None:
         return err
 
@@ -424,42 +468,60 @@ def write_context_dir(dir_path, context):
                 _damon.unit_samples, _damon.unit_aggr_intervals,
                 context.intervals)
     return write_schemes_dir(
-            os.path.join(dir_path, 'schemes'), context.schemes)
+            os.path.join(dir_path, 'schemes'), context.schemes, staged)
 
-def write_contexts_dir(dir_path, contexts):
-    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_contexts'), contexts)
+def write_contexts_dir(dir_path, contexts, staged):
+    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_contexts'),
+                             contexts, staged)
     if err is not None:
         return err
 
     for idx, context in enumerate(contexts):
         err = write_context_dir(
-                os.path.join(dir_path, '%d' % idx), context)
+                os.path.join(dir_path, '%d' % idx), context, staged)
         if err is not None:
             return err
 
-def write_kdamonds_dir(dir_path, kdamonds):
-    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_kdamonds'), kdamonds)
+def write_kdamonds_dir(dir_path, kdamonds, staged=None):
+    err = ensure_nr_file_for(os.path.join(dir_path, 'nr_kdamonds'),
+                             kdamonds, staged)
     if err:
         return err
 
     for idx, kdamond in enumerate(kdamonds):
         err = write_contexts_dir(
                 os.path.join(dir_path, '%d' % idx, 'contexts'),
-                kdamond.contexts)
+                kdamond.contexts, staged)
         if err is not None:
             return err
 
-def stage_kdamonds(kdamonds):
+def files_content_by_path(dir_path, files_content, by_path):
+    for filename, content in files_content.items():
+        file_path = os.path.join(dir_path, filename)
+        if type(content) == dict:
+            files_content_by_path(file_path, content, by_path)
+        else:
+            by_path[file_path] = content
+    return by_path
+
+def stage_kdamonds(kdamonds, changes_only=False):
     """Write DAMON parameters for kdamonds to the sysfs files.
 
     Args:
         kdamonds: A list of _damon.Kdamond objects.
+        changes_only: Write only files that having different content.
 
     Returns:
         None for success, an error string if failed.
     """
     # Assume caller checked supported()
-    return write_kdamonds_dir(get_kdamonds_dir(), kdamonds)
+    kdamonds_dir = get_kdamonds_dir()
+    staged = None
+    if changes_only:
+        staged = files_content_by_path(kdamonds_dir,
+                _damo_fs.read_files(kdamonds_dir,
+                                    skip_dirs=['stats', 'tried_regions']), {})
+    return write_kdamonds_dir(kdamonds_dir, kdamonds, staged)
 
 # for current_kdamonds()
 
@@ -571,7 +633,8 @@ def files_content_to_scheme(files_content):
             files_content_to_watermarks(files_content['watermarks']),
             files_content_to_damos_filters(files_content['filters'])
                 if 'filters' in files_content else [],
-            files_content_to_damos_stats(files_content['stats']),
+            files_content_to_damos_stats(files_content['stats'])
+                if 'stats' in files_content else None,
             files_content_to_damos_tried_regions(
                 files_content['tried_regions'])
                 if 'tried_regions' in files_content else [],
@@ -618,10 +681,11 @@ def files_content_to_context(files_content):
     return _damon.DamonCtx(ops, targets, intervals, nr_regions, schemes)
 
 def files_content_to_kdamond(files_content):
-    contexts_content = files_content['contexts']
-    contexts = [files_content_to_context(content)
-            for content in numbered_dirs_content(
-                contexts_content, 'nr_contexts')]
+    contexts = []
+    if 'contexts' in files_content:
+        contexts = [files_content_to_context(content)
+                for content in numbered_dirs_content(
+                    files_content['contexts'], 'nr_contexts')]
     state = files_content['state'].strip()
     pid = files_content['pid'].strip()
     return _damon.Kdamond(state, pid, contexts)
@@ -631,9 +695,18 @@ def files_content_to_kdamonds(files_contents):
             for content in numbered_dirs_content(
                 files_contents, 'nr_kdamonds')]
 
-def current_kdamonds():
+def current_kdamonds(read_contexts=True, read_stats=True,
+                     read_tried_regions=True):
     # Assume caller checked supported()
-    return files_content_to_kdamonds(_damo_fs.read_files(get_kdamonds_dir()))
+    skip_dirs = []
+    if not read_contexts:
+        skip_dirs.append('contexts')
+    if not read_stats:
+        skip_dirs.append('stats')
+    if not read_tried_regions:
+        skip_dirs.append('tried_regions')
+    return files_content_to_kdamonds(
+            _damo_fs.read_files(get_kdamonds_dir(), skip_dirs))
 
 def get_nr_kdamonds_file():
     return os.path.join(get_kdamonds_dir(), 'nr_kdamonds')
@@ -722,7 +795,8 @@ def scheme_tried_regions_dir_of(kdamond_idx, context_idx, scheme_idx):
 
 def infer_damon_version():
     version = '<5.15'
-    orig_kdamonds = current_kdamonds()
+    orig_kdamonds = current_kdamonds(read_stats=False,
+                                     read_tried_regions=False)
 
     if os.path.isfile(os.path.join(scheme_dir_of(0, 0, 0), 'target_nid')):
         return '>6.10'
@@ -784,7 +858,8 @@ def update_supported_features():
     for feature in features_sysfs_support_from_begining:
         feature_supports[feature] = True
 
-    orig_kdamonds = current_kdamonds()
+    orig_kdamonds = current_kdamonds(read_stats=False,
+                                     read_tried_regions=False)
     kdamonds_for_feature_check = [
             _damon.Kdamond(
                 state=None, pid=None, contexts=[
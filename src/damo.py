@@ -23,6 +23,7 @@ import damo_record_info
 import damo_replay
 import damo_report
 import damo_schemes
+import damo_serve
 import damo_show
 import damo_start
 import damo_status
@@ -50,6 +51,8 @@ subcmds = [
         _damo_subcmds.DamoSubCmd(name='status',
             module=damo_status,
             msg='show DAMON status'),
+        _damo_subcmds.DamoSubCmd(name='serve', module=damo_serve,
+            msg='serve DAMON results and status via a Unix socket'),
 
         # DAMON result recording and reporting/replaying
         _damo_subcmds.DamoSubCmd(name='record', module=damo_record,
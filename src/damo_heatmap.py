@@ -29,8 +29,18 @@ import subprocess
 import sys
 import tempfile
 
+# for non-python-default modules
+try:
+    import numpy
+except ModuleNotFoundError as e:
+    # do nothing.  heat_pixels_from_snapshots() falls back to the pure python
+    # implementation.
+    pass
+
 import _damo_ascii_color
 import _damo_fmt_str
+import _damo_heatmap_image
+import _damo_heatmap_tiles
 import _damo_records
 import damo_record_info
 
@@ -61,9 +71,10 @@ def add_heats(snapshot, duration, pixels, time_unit, space_unit, addr_range):
     """
     pixel_sz = time_unit * space_unit
 
-    for region in snapshot.regions:
-        start = max(region.start, addr_range[0])
-        end = min(region.end, addr_range[1])
+    for region_start, region_end, nr_accesses in \
+            damo_record_info.region_fields_of(snapshot):
+        start = max(region_start, addr_range[0])
+        end = min(region_end, addr_range[1])
         if start >= end:
             continue
 
@@ -76,8 +87,7 @@ def add_heats(snapshot, duration, pixels, time_unit, space_unit, addr_range):
         while fraction_start < end:
             fraction_end = min((addr_idx + 1) * space_unit + addr_range[0],
                     end)
-            heat = region.nr_accesses.samples * duration * (
-                    fraction_end - fraction_start)
+            heat = nr_accesses * duration * (fraction_end - fraction_start)
 
             pixel = pixels[addr_idx]
             heat += pixel.heat * pixel_sz
@@ -86,20 +96,119 @@ def add_heats(snapshot, duration, pixels, time_unit, space_unit, addr_range):
             fraction_start = fraction_end
             addr_idx += 1
 
-def heat_pixels_from_snapshots(snapshots, time_range, addr_range, resols):
-    """Get heat pixels for monitoring snapshots."""
-    time_unit = (time_range[1] - time_range[0]) / float(resols[0])
-    space_unit = (addr_range[1] - addr_range[0]) / float(resols[1])
-
-    pixels = [[HeatPixel(int(time_range[0] + i * time_unit),
-                    int(addr_range[0] + j * space_unit), 0.0)
-            for j in range(resols[1])] for i in range(resols[0])]
+def overlaps(boundaries, starts, ends, weights):
+    """Get sum of weighted overlapping lengths of given ranges to each interval
+    between the boundaries, using numpy.
 
-    if len(snapshots) < 2:
-        return pixels
+    Args:
+      boundaries:   Sorted boundaries of the intervals.
+      starts:       Start points of the ranges.
+      ends:         End points of the ranges.
+      weights:      Weights for overlapping lengths of each range.
+    """
+    # Sum of the weighted overlaps before a point is piecewise linear.  Get its
+    # values on the start and end points of the ranges, and interpolate.
+    points = numpy.concatenate((starts, ends))
+    slope_changes = numpy.concatenate((weights, -weights))
+    order = numpy.argsort(points, kind='stable')
+    points = points[order]
+    slopes = numpy.cumsum(slope_changes[order])
+    sums = numpy.concatenate(([0.0], numpy.cumsum(
+        slopes[:-1] * numpy.diff(points))))
+    return numpy.diff(numpy.interp(boundaries, points, sums))
+
+def region_arrays(snapshot):
+    """Get start addresses, end addresses, and nr_accesses of the regions of a
+    snapshot as numpy arrays."""
+    if (isinstance(snapshot, _damo_records.ColumnarSnapshot) and
+            not snapshot.regions_loaded()):
+        fields = numpy.frombuffer(snapshot.raw_regions(), dtype=[
+            ('start', '<u8'), ('end', '<u8'), ('nr_accesses', '<i8'),
+            ('age', '<i8')])
+        return (fields['start'].astype(float), fields['end'].astype(float),
+                fields['nr_accesses'].astype(float))
+    regions = snapshot.regions
+    return (numpy.array([r.start for r in regions], dtype=float),
+            numpy.array([r.end for r in regions], dtype=float),
+            numpy.array([r.nr_accesses.samples for r in regions], dtype=float))
+
+def add_heats_numpy(heats, shot, time_range, time_boundaries,
+                    addr_boundaries):
+    """Add heats of a monitoring snapshot to a two-dimensional numpy array of
+    time and address, of which pixel boundaries are given."""
+    if shot.start_time is None:
+        return
+    start = max(shot.start_time, time_range[0])
+    end = min(shot.end_time, time_range[1])
+    if start >= end:
+        return
+    time_unit = (time_range[1] - time_range[0]) / float(len(heats))
+    start_idx = int(float(start - time_range[0]) / time_unit)
+    end_idx = min(int(numpy.searchsorted(time_boundaries, end)),
+                  len(heats))
+    durations = numpy.diff(numpy.clip(
+        time_boundaries[start_idx:end_idx + 1], start, end))
+
+    starts, ends, nr_accesses = region_arrays(shot)
+    if len(starts) == 0:
+        return
+    region_heats = overlaps(addr_boundaries, starts, ends, nr_accesses)
+    heats[start_idx:end_idx] += numpy.outer(durations, region_heats)
 
-    for idx, shot in enumerate(snapshots[1:]):
-        start = shot.start_time
+def heat_pixels_of(heats, time_range, addr_range, resols):
+    """Get heat pixels for two-dimensional list of heats."""
+    time_unit = (time_range[1] - time_range[0]) / float(resols[0])
+    space_unit = (addr_range[1] - addr_range[0]) / float(resols[1])
+    return [[HeatPixel(int(time_range[0] + i * time_unit),
+                       int(addr_range[0] + j * space_unit), heat)
+             for j, heat in enumerate(row)]
+            for i, row in enumerate(heats)]
+
+class HeatPixelsConsumer(_damo_records.SnapshotsConsumer):
+    """Get heat pixels for snapshots of a record, or of any record if the
+    record is None."""
+    record = None
+    time_range = None
+    addr_range = None
+    resols = None
+    heats = None    # numpy array of heats, if numpy is installed
+    time_boundaries = None
+    addr_boundaries = None
+    pixels = None
+
+    def __init__(self, record, time_range, addr_range, resols):
+        self.record = record
+        self.time_range = time_range
+        self.addr_range = addr_range
+        self.resols = resols
+        time_unit = (time_range[1] - time_range[0]) / float(resols[0])
+        space_unit = (addr_range[1] - addr_range[0]) / float(resols[1])
+        if 'numpy' in sys.modules:
+            self.heats = numpy.zeros((resols[0], resols[1]))
+            self.time_boundaries = (time_range[0] +
+                                    numpy.arange(resols[0] + 1) * time_unit)
+            self.addr_boundaries = (addr_range[0] +
+                                    numpy.arange(resols[1] + 1) * space_unit)
+            return
+        self.pixels = [[HeatPixel(int(time_range[0] + i * time_unit),
+                        int(addr_range[0] + j * space_unit), 0.0)
+                for j in range(resols[1])] for i in range(resols[0])]
+
+    def add_snapshot(self, record, shot):
+        if self.record is not None and record is not self.record:
+            return
+        time_range = self.time_range
+        if self.heats is not None:
+            add_heats_numpy(self.heats, shot, time_range,
+                            self.time_boundaries, self.addr_boundaries)
+            return
+
+        if shot.start_time is None:
+            return
+        time_unit = (time_range[1] - time_range[0]) / float(self.resols[0])
+        space_unit = (self.addr_range[1] - self.addr_range[0]) / float(
+                self.resols[1])
+        start = max(shot.start_time, time_range[0])
         end = min(shot.end_time, time_range[1])
 
         # The snapshot's recorded time and the corresponding pixels row may not
@@ -109,11 +218,29 @@ def heat_pixels_from_snapshots(snapshots, time_range, addr_range, resols):
         time_idx = int(float(fraction_start - time_range[0]) / time_unit)
         while fraction_start < end:
             fraction_end = min((time_idx + 1) * time_unit + time_range[0], end)
-            add_heats(shot, fraction_end - fraction_start, pixels[time_idx],
-                    time_unit, space_unit, addr_range)
+            add_heats(shot, fraction_end - fraction_start,
+                    self.pixels[time_idx], time_unit, space_unit,
+                    self.addr_range)
             fraction_start = fraction_end
             time_idx += 1
-    return pixels
+
+    def heat_pixels(self):
+        if self.heats is None:
+            return self.pixels
+        time_unit = (self.time_range[1] - self.time_range[0]) / float(
+                self.resols[0])
+        space_unit = (self.addr_range[1] - self.addr_range[0]) / float(
+                self.resols[1])
+        heats = (self.heats / (time_unit * space_unit)).tolist()
+        return heat_pixels_of(heats, self.time_range, self.addr_range,
+                              self.resols)
+
+def heat_pixels_from_snapshots(snapshots, time_range, addr_range, resols):
+    """Get heat pixels for monitoring snapshots."""
+    consumer = HeatPixelsConsumer(None, time_range, addr_range, resols)
+    for shot in snapshots:
+        consumer.add_snapshot(None, shot)
+    return consumer.heat_pixels()
 
 def fmt_ascii_heatmap(pixels, time_range, addr_range, resols, colorset,
         print_colorset):
@@ -154,8 +281,11 @@ def fmt_ascii_heatmap(pixels, time_range, addr_range, resols, colorset,
             float(time_range[1] - time_range[0]) / len(pixels), False)))
     return '\n'.join(lines)
 
-def fmt_heats(args, __records):
-    tid = args.tid
+def view_ranges(args):
+    '''
+    Returns the time and address ranges of the heatmap, which are compensated
+    to fit with the resolution
+    '''
     tres = args.resol[0]
     tmin = args.time_range[0]
     tmax = args.time_range[1]
@@ -169,18 +299,46 @@ def fmt_heats(args, __records):
     # Compensate the values so that those fit with the resolution
     tmax = tmin + tunit * tres
     amax = amin + aunit * ares
-
-    # __pr_heats(damon_result, tid, tunit, tmin, tmax, aunit, amin, amax)
-
-    records = []
-    for record in __records:
-        if record.target_id == tid:
-            records.append(record)
+    return [tmin, tmax], [amin, amax]
+
+def heat_pixels_list(args, __records, tiles=None):
+    '''
+    Returns heat pixels of the records of the target, using the tiles if given
+    and usable.  Returns None if the tiles are not usable and __records is
+    None.
+    '''
+    tid = args.tid
+    time_range, addr_range = view_ranges(args)
+
+    heats_list = None
+    if tiles is not None:
+        heats_list = tiles.target_heats(tid, time_range, addr_range,
+                                        args.resol)
+    if heats_list is not None:
+        return [heat_pixels_of(heats, time_range, addr_range, args.resol)
+                for heats in heats_list]
+    elif __records is None:
+        return None
+    return [heat_pixels_from_snapshots(record.snapshots, time_range,
+                                       addr_range, args.resol)
+            for record in __records if record.target_id == tid]
+
+def fmt_heats(args, __records, tiles=None):
+    '''
+    Returns the formatted heatmaps, using the tiles if given and usable.
+    Returns None if the tiles are not usable and __records is None.
+    '''
+    pixels_list = heat_pixels_list(args, __records, tiles)
+    if pixels_list is None:
+        return None
+    return fmt_heat_pixels(args, pixels_list)
+
+def fmt_heat_pixels(args, pixels_list):
+    [tmin, tmax], [amin, amax] = view_ranges(args)
+    tres, ares = args.resol
 
     lines = []
-    for record in records:
-        pixels = heat_pixels_from_snapshots(record.snapshots,
-                [tmin, tmax], [amin, amax], [tres, ares])
+    for pixels in pixels_list:
 
         if args.output == 'stdout':
             lines.append(fmt_ascii_heatmap(pixels, [tmin, tmax], [amin, amax],
@@ -200,15 +358,19 @@ def fmt_heats(args, __records):
                 lines.append('%s\t%s\t%s' % (time, addr, pixel.heat))
     return '\n'.join(lines)
 
-def pr_heats(args, __records):
-    print(fmt_heats(args, __records))
+def pr_heats(args, __records, tiles=None):
+    print(fmt_heats(args, __records, tiles))
 
 def set_missed_args(args, records):
-    if args.tid and args.time_range and args.address_range:
-        return
+    '''Set missed view arguments from the records.  Returns an error or None'''
+    if (args.tid is not None and args.time_range and
+            args.address_range):
+        return None
     guides = damo_record_info.get_guide_info(records)
+    if len(guides) == 0:
+        return 'no snapshot in the record'
     guide = guides[0]
-    if not args.tid:
+    if args.tid is None:
         args.tid = guide.tid
     for g in guides:
         if g.tid == args.tid:
@@ -224,6 +386,7 @@ def set_missed_args(args, records):
                 reverse=True)[0]
         args.address_range = [hottest_contig_region.start_addr,
                               hottest_contig_region.end_addr]
+    return None
 
 def plot_range(orig_range, use_absolute_val):
     plot_range = [x for x in orig_range]
@@ -263,7 +426,9 @@ def set_argparser(parser):
                         help=' '.join(
                             ['output heatmap to generate.',
                              'can be a pdf/png/jpeg/svg file or',
-                             'special keywords (\'stdout\', \'raw\')']))
+                             'special keywords (\'stdout\', \'raw\').',
+                             'png and svg files are made by damo, and the',
+                             'others are made using gnuplot']))
     parser.add_argument('--input', '-i', type=str, metavar='<file>',
             default='damon.data', help='input file name')
 
@@ -282,6 +447,14 @@ def set_argparser(parser):
 
     parser.add_argument('--guide', action='store_true',
             help='print a guidance for the ranges and resolution settings')
+    parser.add_argument('--use_tiles', action='store_true',
+            help=' '.join([
+                'make the heatmap from the multi-resolution heat tiles file',
+                'of the input (<input>.heatmap_tiles), for fast zooming.',
+                'the tiles file is built if it does not exist or is',
+                'outdated']))
+    parser.add_argument('--gnuplot', action='store_true',
+            help='use gnuplot for png and svg outputs, too')
     parser.add_argument('--stdout_colorset', default='gray',
             choices=['gray', 'flame', 'emotion'],
             help='color theme for access frequencies')
@@ -290,13 +463,48 @@ def set_argparser(parser):
             help='skip printing example colors at the output')
     parser.description = 'Show when which address ranges were how frequently accessed'
 
-def main(args=None):
-    records, err = _damo_records.get_records(record_file=args.input)
-    if err != None:
-        print('monitoring result file (%s) parsing failed (%s)' %
-                (args.input, err))
+def write_heatmap_image(args, records, tiles=None):
+    '''Returns False if the tiles are not usable and records is None'''
+    pixels_list = heat_pixels_list(args, records, tiles)
+    if pixels_list is None:
+        return False
+    if len(pixels_list) == 0:
+        print('no record for the target id (%s)' % args.tid)
+        exit(1)
+    # records of the same target are merged, as gnuplot overlays those
+    heats = [[sum([pixels[i][j].heat for pixels in pixels_list])
+              for j in range(args.resol[1])] for i in range(args.resol[0])]
+    time_range, addr_range = view_ranges(args)
+    err = _damo_heatmap_image.write_heatmap(args.output, heats,
+            plot_range(time_range, args.abs_time),
+            plot_range(addr_range, args.abs_addr),
+            'Time (ns)', 'Address (bytes)')
+    if err is not None:
+        print('writing heatmap image failed (%s)' % err)
         exit(1)
+    return True
+
+def output_heats(args, records, tiles=None):
+    '''Returns False if the tiles are not usable and records is None'''
+    if (args.output.split('.')[-1] in _damo_heatmap_image.image_formats and
+            not args.gnuplot):
+        return write_heatmap_image(args, records, tiles)
+
+    text = fmt_heats(args, records, tiles)
+    if text is None:
+        return False
+    if args.output in ['stdout', 'raw']:
+        print(text)
+        return True
 
+    # use gnuplot-based image plot
+    tmp_path = tempfile.mkstemp()[1]
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    plot_heatmap(tmp_path, args.output, args)
+    return True
+
+def main(args=None):
     # Use 80x40 or 500x500 resolution as default for stdout or image plots
     if args.resol is None:
         if args.output == 'stdout':
@@ -304,17 +512,41 @@ def main(args=None):
         else:
             args.resol = [500, 500]
 
+    tiles = None
+    if args.use_tiles and not args.guide:
+        tiles = _damo_heatmap_tiles.read_tiles(args.input)
+        # the tiles may make the heatmap without reading the record file
+        if (tiles is not None and args.tid is not None and args.time_range
+                and args.address_range):
+            if output_heats(args, None, tiles):
+                return
+
+    time_range = None
+    if (args.tid is not None and args.time_range and args.address_range
+            and not args.guide and not args.use_tiles):
+        # read only the snapshots in the time range if possible.  Missed
+        # view arguments are set from the guide of the whole record.
+        time_range = args.time_range
+    records, err = _damo_records.get_records(record_file=args.input,
+                                             time_range=time_range)
+    if err != None:
+        print('monitoring result file (%s) parsing failed (%s)' %
+                (args.input, err))
+        exit(1)
+
     if args.guide:
         damo_record_info.pr_guide(records)
         return
 
-    set_missed_args(args, records)
-    if args.output in ['stdout', 'raw']:
-        pr_heats(args, records)
-        return
+    if args.use_tiles and tiles is None:
+        err = _damo_heatmap_tiles.write_tiles(records, args.input, None)
+        if err is not None:
+            print('building heatmap tiles failed (%s)' % err)
+            exit(1)
+        tiles = _damo_heatmap_tiles.read_tiles(args.input)
 
-    # use gnuplot-based image plot
-    tmp_path = tempfile.mkstemp()[1]
-    with open(tmp_path, 'w') as f:
-        f.write(fmt_heats(args, records))
-    plot_heatmap(tmp_path, args.output, args)
+    err = set_missed_args(args, records)
+    if err is not None:
+        print('setting the heatmap ranges failed (%s)' % err)
+        exit(1)
+    output_heats(args, records, tiles)
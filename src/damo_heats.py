@@ -76,5 +76,7 @@ def main(args=None):
         args.stdout_colorset = args.stdout_heatmap_color
         args.stdout_skip_colorset_example = \
                 args.stdout_heatmap_skip_color_example
+    args.use_tiles = False
+    args.gnuplot = False
 
     damo_heatmap.main(args)
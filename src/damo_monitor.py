@@ -2,77 +2,214 @@
 
 "Record and report data access pattern in realtime"
 
-import os
+import argparse
 import signal
 import subprocess
-import sys
+import time
 
+import _damo_dist
+import _damo_fmt_str
+import _damo_records
 import _damon
 import _damon_args
+import damo_heatmap
+import damo_report_holistic
+import damo_wss
+
+class Monitor:
+    '''
+    DAMON that is kept running while monitoring, and the snapshots of the
+    access pattern that it provided since the last report.
+    '''
+    kdamond_idxs = None
+    orig_kdamonds = None
+    kdamonds = None
+    scheme_idxs = None      # indices of the scheme for getting snapshots
+    aggr_interval_sec = None
+    cmd_pipe = None
+    stop = False
+
+    records = None          # {(kdamond idx, context idx): DamonRecord}
+    wss_consumer = None
+    footprint_snapshots = None
+
+    def reset_snapshots(self):
+        self.records = {}
+        self.wss_consumer = damo_wss.WssConsumer(acc_thres=1, sz_thres=1)
+        self.footprint_snapshots = []
+
+monitor = Monitor()
+
+cleaning = False
 
 def cleanup():
-    if target_type == _damon_args.target_type_cmd and cmd_pipe.poll() == None:
-        cmd_pipe.kill()
+    global cleaning
+    if cleaning:
+        return
+    cleaning = True
+    if monitor.kdamond_idxs is not None:
+        # ignore returning error, as kdamonds may already finished
+        _damon.turn_damon_off(monitor.kdamond_idxs)
+        err = _damon.stage_kdamonds(monitor.orig_kdamonds)
+        if err:
+            print('failed restoring previous kdamonds setup (%s)' % err)
+    if monitor.cmd_pipe is not None and monitor.cmd_pipe.poll() is None:
+        monitor.cmd_pipe.kill()
 
 def sighandler(signum, frame):
     print('\nsignal %s received' % signum)
-    cleanup()
+    monitor.stop = True
 
-def main(args):
-    _damon.ensure_root_permission()
+def damon_args_for(target):
+    '''Returns arguments for starting DAMON for the target, like 'damo start
+    <target>' does'''
+    parser = argparse.ArgumentParser()
+    _damon_args.set_argparser(parser, add_record_options=False, min_help=True)
+    return parser.parse_args([target])
+
+def start_monitor(target):
+    '''
+    Start DAMON for the target, and install a scheme for getting the snapshots
+    of the monitoring results.  Returns an error or None.
+    '''
+    monitor.orig_kdamonds = _damon.current_kdamonds(
+            read_stats=False, read_tried_regions=False)
+    err, kdamonds = _damon_args.turn_damon_on(damon_args_for(target))
+    if err:
+        return 'could not turn DAMON on (%s)' % err
+    monitor.kdamond_idxs = ['%d' % idx for idx, k in enumerate(kdamonds)]
+    monitor.kdamonds = kdamonds
+    monitor.aggr_interval_sec = kdamonds[0].contexts[0].intervals.aggr / 1000000
+
+    # same to what _damo_records.get_snapshot_records() does, but only once
+    err = _damo_records.install_target_regions_if_needed(
+            _damon.current_kdamonds(read_stats=False,
+                                    read_tried_regions=False))
+    if err is not None:
+        return 'vaddr region install failed (%s)' % err
+    installed, monitor.scheme_idxs, err = _damo_records.find_install_scheme(
+            _damon.Damos())
+    if err:
+        return 'monitoring scheme install failed: %s' % err
+    return None
+
+def collect_snapshot():
+    '''Add a snapshot of the current access pattern.  Returns an error or
+    None'''
+    records, err = _damo_records.update_get_snapshot_records(
+            monitor.kdamond_idxs, monitor.scheme_idxs, total_sz_only=False,
+            merge_regions=True)
+    if err is not None:
+        return err
+    if len(records) == 0:
+        return 'no running kdamond'
+    for record in records:
+        key = (record.kdamond_idx, record.context_idx)
+        if not key in monitor.records:
+            # the snapshots are made for only single target
+            record.target_id = 0
+            monitor.records[key] = record
+        else:
+            monitor.records[key].snapshots += record.snapshots
+        for snapshot in record.snapshots:
+            monitor.wss_consumer.add_snapshot(monitor.records[key], snapshot)
+    _damo_records.record_mem_footprint(monitor.kdamonds,
+                                       monitor.footprint_snapshots)
+    return None
 
-    global target_type
-    global cmd_pipe
+def collect_snapshots(duration_sec):
+    '''Collect a snapshot for each aggregation interval for the given
+    duration.  Returns an error or None'''
+    monitor.reset_snapshots()
+    deadline = time.time() + duration_sec
+    while not monitor.stop:
+        collect_start = time.time()
+        err = collect_snapshot()
+        if err is not None:
+            return err
+        now = time.time()
+        if now >= deadline:
+            break
+        # update_schemes_tried_regions may return before the next
+        # aggregation
+        time.sleep(max(min(collect_start + monitor.aggr_interval_sec,
+                           deadline) - now, 0))
+    return None
+
+def fmt_heats(records):
+    heatmap_args = argparse.Namespace(
+            tid=None, resol=[10, 80], time_range=None, address_range=None,
+            output='stdout', stdout_colorset='gray',
+            stdout_skip_colorset_example=True)
+    err = damo_heatmap.set_missed_args(heatmap_args, records)
+    if err is not None:
+        return 'setting the heatmap ranges failed (%s)' % err
+    output = damo_heatmap.fmt_heats(heatmap_args, records)
+    return '\n'.join([line for line in output.split('\n')
+                      if not line.startswith('#')])
+
+def fmt_wss():
+    lines = []
+    wss_dists = monitor.wss_consumer.dists(do_sort=True,
+                                           collapse_targets=True)
+    for tid, dists in wss_dists.items():
+        lines.append('# target_id\t%s' % tid)
+        lines.append(_damo_dist.fmt_dists(
+            'wss', dists, range(0, 101, 25), pr_all=False,
+            format_fn=_damo_fmt_str.format_sz, raw_number=False,
+            nr_cols_bar=59))
+    return '\n'.join(lines)
+
+def fmt_holistic(records):
+    analysis = damo_report_holistic.analyze_records(records, [5, 80])
+    analysis.footprint_snapshots = monitor.footprint_snapshots
+    return '\n'.join(damo_report_holistic.fmt_access_report_short(analysis))
+
+def fmt_report(report_type):
+    records = list(monitor.records.values())
+    if report_type == 'heats':
+        return fmt_heats(records)
+    if report_type == 'wss':
+        return fmt_wss()
+    return fmt_holistic(records)
+
+def main(args):
+    _damon.ensure_root_and_initialized(args, save_feature_supports=True)
 
     signal.signal(signal.SIGINT, sighandler)
     signal.signal(signal.SIGTERM, sighandler)
 
     target = args.target
-    target_fields = target.split()
     target_type = _damon_args.deduced_target_type(target)
-    if target_type == None:
+    if target_type == _damon_args.target_type_unknown:
         print('invalid target \'%s\'' % target)
         exit(1)
-    if target_type == _damon_args.target_type_explicit and target == 'paddr':
-        pass
-    elif target_type == _damon_args.target_type_cmd:
-        cmd_pipe = subprocess.Popen(target, shell=True, executable='/bin/bash',
-                stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
-        target = cmd_pipe.pid
-    else:
-        pid = int(target)
-
-    bindir = os.path.dirname(sys.argv[0])
-    damo = os.path.join(bindir, 'damo')
-
-    record_cmd = 'timeout %s %s record \"%s\"' % (args.delay, damo, target)
-
-    report_cmd = [damo]
-    if args.report_type == 'heats':
-        report_cmd += 'report heats --heatmap stdout --resol 10 80'.split()
-    else:
-        report_cmd += ['report', args.report_type]
+    if target_type == _damon_args.target_type_cmd:
+        monitor.cmd_pipe = subprocess.Popen(target, shell=True,
+                executable='/bin/bash', stdout=subprocess.DEVNULL,
+                stderr=subprocess.STDOUT)
+        target = '%d' % monitor.cmd_pipe.pid
+
+    err = start_monitor(target)
+    if err is not None:
+        print(err)
+        cleanup()
+        exit(1)
 
     nr_reports = 0
     while not args.count or nr_reports < args.count:
-        if (target_type == _damon_args.target_type_cmd and
-                cmd_pipe.poll() != None):
+        if monitor.cmd_pipe is not None and monitor.cmd_pipe.poll() != None:
+            break
+        err = collect_snapshots(args.delay)
+        if monitor.stop:
             break
-        try:
-            subprocess.check_output(record_cmd, shell=True,
-                    stderr=subprocess.STDOUT, executable='/bin/bash')
-        except subprocess.CalledProcessError as e:
-            pass
-        try:
-            output = subprocess.check_output(report_cmd).decode()
-            if args.report_type == 'heats':
-                for line in output.strip().split('\n'):
-                    if not line.startswith('#'):
-                        print(line)
-            else:
-                print(output)
-        except subprocess.CalledProcessError as e:
-            pass
+        if err is not None:
+            print('collecting snapshots failed (%s)' % err)
+            # the target may be terminated
+            if not _damon.any_kdamond_running():
+                break
+        else:
+            print(fmt_report(args.report_type))
         nr_reports += 1
 
     cleanup()
@@ -87,3 +224,4 @@ def set_argparser(parser):
             help='deplay between updates in seconds.')
     parser.add_argument('--count', type=int, metavar='<count>', default=0,
             help='number of updates.')
+    _damon_args.set_common_argparser(parser)
@@ -18,6 +18,7 @@ def set_argparser(parser):
             help='the metric to be used for sorting the number of regions')
     parser.add_argument('--plot', '-p', type=str, metavar='<file>',
             help='plot the distribution to an image file')
+    _damo_dist.add_approx_percentiles_argument(parser)
 
 def main(args):
     percentiles = [0, 25, 50, 75, 100]
@@ -29,6 +30,12 @@ def main(args):
     if args.sortby == 'time':
         nr_regions_sort = False
 
+    if args.approx_percentiles:
+        err = _damo_dist.approx_percentiles_err(nr_regions_sort, False)
+        if err is not None:
+            print(err)
+            exit(1)
+
     records, err = _damo_records.get_records(record_file=file_path)
     if err != None:
         print('monitoring result file (%s) parsing failed (%s)' %
@@ -44,21 +51,23 @@ def main(args):
     print('# <percentile> <# regions>')
 
     for record in records:
-        nr_regions_dist = []
+        if args.approx_percentiles:
+            nr_regions_dist = _damo_dist.QuantileSketch()
+            add_nr_regions = nr_regions_dist.add
+        else:
+            nr_regions_dist = []
+            add_nr_regions = nr_regions_dist.append
         # Skip firs 20 regions as those would not adaptively adjusted
         for snapshot in record.snapshots[20:]:
-            nr_regions_dist.append(len(snapshot.regions))
-        if nr_regions_sort:
+            add_nr_regions(len(snapshot.regions))
+        if nr_regions_sort and not args.approx_percentiles:
             nr_regions_dist.sort(reverse=False)
 
         print('# target_id\t%s' % record.target_id)
-        print('# avr:\t%d' % (sum(nr_regions_dist) / len(nr_regions_dist)))
+        print('# avr:\t%d' % _damo_dist.get_average(nr_regions_dist))
         for percentile in percentiles:
-            thres_idx = int(percentile / 100.0 * len(nr_regions_dist))
-            if thres_idx == len(nr_regions_dist):
-                thres_idx -= 1
-            threshold = nr_regions_dist[thres_idx]
-            print('%d\t%d' % (percentile, nr_regions_dist[thres_idx]))
+            print('%d\t%d' % (percentile,
+                _damo_dist.get_percentile(nr_regions_dist, percentile)))
 
     if args.plot:
         sys.stdout = orig_stdout
@@ -28,6 +28,11 @@ def cleanup_exit(exit_code):
     if cleaning == True:
         return
     cleaning = True
+    if data_for_cleanup.record_handle:
+        # a snapshot could be being taken in background, using DAMON
+        _damo_records.finish_background_samplings(
+                data_for_cleanup.record_handle.recording_sources)
+
     if data_for_cleanup.kdamonds_idxs != None:
         # ignore returning error, as kdamonds may already finished
         _damon.turn_damon_off(data_for_cleanup.kdamonds_idxs)
@@ -87,6 +92,7 @@ def mk_handle(args, kdamonds, monitoring_intervals):
             kdamonds=kdamonds, add_child_tasks=args.include_child_tasks,
             record_mem_footprint=args.footprint,
             record_vmas=args.vmas, timeout=args.timeout)
+    handle.proc_sample_interval_sec = args.proc_sample_interval
 
     if args.snapshot is not None:
         handle.tracepoint = None
@@ -117,7 +123,8 @@ def main(args):
     handle_args(args)
 
     # Setup for cleanup
-    data_for_cleanup.orig_kdamonds = _damon.current_kdamonds()
+    data_for_cleanup.orig_kdamonds = _damon.current_kdamonds(
+            read_stats=False, read_tried_regions=False)
     signal.signal(signal.SIGINT, sighandler)
     signal.signal(signal.SIGTERM, sighandler)
 
@@ -131,7 +138,7 @@ def main(args):
                 for idx, k in enumerate(kdamonds)]
         # TODO: Support multiple kdamonds, multiple contexts
         monitoring_intervals = kdamonds[0].contexts[0].intervals
-        now_kdamonds = _damon.current_kdamonds()
+        now_kdamonds = _damon.current_kdamonds(read_contexts=False)
         kdamonds[0].pid = now_kdamonds[0].pid
     else:
         if not _damon.any_kdamond_running():
@@ -179,5 +186,11 @@ def set_argparser(parser):
                         type=float, help='record accesses as snapshots')
     parser.add_argument('--timeout', type=float, metavar='<seconds>',
                         help='stop recording after the given seconds')
+    parser.add_argument('--proc_sample_interval', type=float,
+                        metavar='<seconds>',
+                        help=' '.join([
+                            'interval of memory footprint, vmas and cpu',
+                            'usage recording.  default is the --snapshot',
+                            'delay, or one second']))
     parser.description = 'Record monitoring results'
     return parser
@@ -4,6 +4,8 @@
 Print basic information of the access monitoring results record file.
 """
 
+import bisect
+
 import _damo_fmt_str
 import _damo_records
 
@@ -87,65 +89,131 @@ def overlapping_regions(regions1, regions2):
             overlap_regions.append(r1)
     return overlap_regions
 
-def get_guide_info(records):
-    "return the set of guide information for the moitoring result"
-    guides = {}
-    for record in records:
-        for snapshot in record.snapshots:
-            monitor_time = snapshot.end_time
-            tid = record.target_id
-            if not tid in guides:
-                guides[tid] = GuideInfo(tid, monitor_time)
-            guide = guides[tid]
-            guide.end_time = monitor_time
-
-            last_addr = None
-            gaps = []
-            for r in snapshot.regions:
-                saddr = r.start
-                eaddr = r.end
-
-                if not guide.lowest_addr or saddr < guide.lowest_addr:
-                    guide.lowest_addr = saddr
-                if not guide.highest_addr or eaddr > guide.highest_addr:
-                    guide.highest_addr = eaddr
-
-                if not last_addr:
-                    last_addr = eaddr
-                    continue
-                if last_addr != saddr:
-                    gaps.append([last_addr, saddr])
+def is_sorted(values):
+    for idx in range(len(values) - 1):
+        if values[idx] > values[idx + 1]:
+            return False
+    return True
+
+def narrowed_gaps(gaps, new_gaps):
+    '''
+    Same to overlapping_regions(gaps, new_gaps), but finds overlapping ones
+    of new_gaps via binary search if new_gaps are sorted
+    '''
+    starts = [g[0] for g in new_gaps]
+    ends = [g[1] for g in new_gaps]
+    if not is_sorted(starts) or not is_sorted(ends):
+        return overlapping_regions(gaps, new_gaps)
+
+    narrowed = []
+    for gap in gaps:
+        # narrowing only shrinks the gap, so no earlier or later one overlaps
+        idx = bisect.bisect_left(ends, gap[0])
+        while idx < len(new_gaps) and new_gaps[idx][0] <= gap[1]:
+            if is_overlap(gap, new_gaps[idx]):
+                gap = overlap_region_of(gap, new_gaps[idx])
+            idx += 1
+        narrowed.append(gap)
+    return narrowed
+
+def region_fields_of(snapshot):
+    '''Returns start, end and nr_accesses samples of each region'''
+    if (isinstance(snapshot, _damo_records.ColumnarSnapshot) and
+            not snapshot.regions_loaded()):
+        # avoid loading region objects that will be kept in the snapshot
+        return [(start, end, _damo_records.columnar_val(nr_accesses))
+                for start, end, nr_accesses, age in
+                _damo_records.columnar_region.iter_unpack(
+                    snapshot.raw_regions())]
+    return [(r.start, r.end, r.nr_accesses.samples) for r in snapshot.regions]
+
+def add_heats(contig_regions, region_fields):
+    starts = [g.start_addr for g in contig_regions]
+    ends = [g.end_addr for g in contig_regions]
+    sorted_contigs = is_sorted(starts) and is_sorted(ends)
+    for start, end, nr_accesses in region_fields:
+        if nr_accesses == 0:
+            continue
+        if sorted_contigs:
+            # contig regions having start <= end and end >= start
+            overlaps = contig_regions[bisect.bisect_left(ends, start):
+                                      bisect.bisect_right(starts, end)]
+        else:
+            overlaps = [g for g in contig_regions
+                        if not (end < g.start_addr or g.end_addr < start)]
+        for gregion in overlaps:
+            if gregion.heats is None:
+                gregion.heats = 0
+            gregion.heats += (end - start) * nr_accesses
+
+class GuideInfoConsumer(_damo_records.SnapshotsConsumer):
+    '''
+    Finds the time range and the contiguous regions of each target.  Heats of
+    the regions are not set, since finding those needs the regions.
+    GuideHeatsConsumer can set those in another pass.
+    '''
+    guides = None   # {target id: GuideInfo}
+
+    def __init__(self):
+        self.guides = {}
+
+    def add_snapshot(self, record, snapshot):
+        monitor_time = snapshot.end_time
+        tid = record.target_id
+        if not tid in self.guides:
+            self.guides[tid] = GuideInfo(tid, monitor_time)
+        guide = self.guides[tid]
+        guide.end_time = monitor_time
+
+        last_addr = None
+        gaps = []
+        for saddr, eaddr, nr_accesses in region_fields_of(snapshot):
+            if not guide.lowest_addr or saddr < guide.lowest_addr:
+                guide.lowest_addr = saddr
+            if not guide.highest_addr or eaddr > guide.highest_addr:
+                guide.highest_addr = eaddr
+
+            if not last_addr:
                 last_addr = eaddr
+                continue
+            if last_addr != saddr:
+                gaps.append([last_addr, saddr])
+            last_addr = eaddr
 
-            if not guide.gaps:
-                guide.gaps = gaps
-            else:
-                guide.gaps = overlapping_regions(guide.gaps, gaps)
+        if not guide.gaps:
+            guide.gaps = gaps
+        else:
+            guide.gaps = narrowed_gaps(guide.gaps, gaps)
 
-    for tid, guide in guides.items():
-        guide_regions = []
-        for start, end in guide.regions():
-            guide_regions.append(GuideRegion(start, end))
-        guide.contig_regions = guide_regions
+    def finish(self):
+        for tid, guide in self.guides.items():
+            guide_regions = []
+            for start, end in guide.regions():
+                guide_regions.append(GuideRegion(start, end))
+            guide.contig_regions = guide_regions
 
-        for record in records:
-            if record.target_id != tid:
-                continue
-            for snapshot in record.snapshots:
-                for region in snapshot.regions:
-                    if region.nr_accesses.samples == 0:
-                        continue
-                    for gregion in guide.contig_regions:
-                        if (region.end < gregion.start_addr or
-                            gregion.end_addr < region.start):
-                            continue
-                        if gregion.heats is None:
-                            gregion.heats = 0
-                        gregion.heats += ((region.end - region.start) *
-                                          region.nr_accesses.samples)
-
-    return sorted(list(guides.values()), key=lambda x: x.total_space(),
-                    reverse=True)
+    def sorted_guides(self):
+        return sorted(list(self.guides.values()),
+                      key=lambda x: x.total_space(), reverse=True)
+
+class GuideHeatsConsumer(_damo_records.SnapshotsConsumer):
+    '''Sets heats of the contiguous regions of GuideInfoConsumer's guides'''
+    guides = None
+
+    def __init__(self, guides):
+        self.guides = guides
+
+    def add_snapshot(self, record, snapshot):
+        guide = self.guides[record.target_id]
+        add_heats(guide.contig_regions, region_fields_of(snapshot))
+
+def get_guide_info(records):
+    "return the set of guide information for the moitoring result"
+    guide_consumer = GuideInfoConsumer()
+    _damo_records.analyze_records(records, [guide_consumer])
+    _damo_records.analyze_records(
+            records, [GuideHeatsConsumer(guide_consumer.guides)])
+    return guide_consumer.sorted_guides()
 
 def pr_guide(records):
     for guide in get_guide_info(records):
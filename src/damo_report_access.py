@@ -4,6 +4,7 @@ import argparse
 import json
 import math
 import os
+import re
 
 import _damo_ascii_color
 import _damo_fmt_str
@@ -213,30 +214,38 @@ class ColoredBox:
             box += '\n'
         return box
 
-class SortedAccessPatterns:
+class AccessPatternsRange:
+    '''
+    Minimum and maximum of size, access rate and age of the regions, each
+    as [min, max] list
+    '''
     sz_regions = None
     access_rates_percent = None
     ages_us = None
 
     def __init__(self, records):
-        self.sz_regions = []
-        self.access_rates_percent = []
-        self.ages_us = []
-
+        ranges = [None, None, None]
         for record in records:
             for snapshot in record.snapshots:
+                if len(snapshot.regions) == 0:
+                    continue
+                sizes = []
+                access_rates = []
+                ages = []
                 for region in snapshot.regions:
-                    self.sz_regions.append(region.size())
-
                     region.nr_accesses.add_unset_unit(record.intervals)
-                    self.access_rates_percent.append(
-                            region.nr_accesses.percent)
-
                     region.age.add_unset_unit(record.intervals)
-                    self.ages_us.append(region.age.usec)
-        self.sz_regions.sort()
-        self.access_rates_percent.sort()
-        self.ages_us.sort()
+                    sizes.append(region.size())
+                    access_rates.append(region.nr_accesses.percent)
+                    ages.append(region.age.usec)
+                for idx, vals in enumerate([sizes, access_rates, ages]):
+                    minval, maxval = min(vals), max(vals)
+                    if ranges[idx] is None:
+                        ranges[idx] = [minval, maxval]
+                        continue
+                    ranges[idx] = [min(ranges[idx][0], minval),
+                                   max(ranges[idx][1], maxval)]
+        self.sz_regions, self.access_rates_percent, self.ages_us = ranges
 
 class RegionBoxAttr:
     value_name = None
@@ -249,16 +258,17 @@ class RegionBoxAttr:
         self.display_logscale = display_logscale
 
 class RegionBox:
-    sorted_access_patterns = None
+    records = None
+    access_patterns_range = None
     length = None
     horizontal_align = None
     color = None
     colorset = None
     height = None
 
-    def __init__(self, sorted_access_patterns, length, horizontal_align, color,
-                 colorset, height):
-        self.sorted_access_patterns = sorted_access_patterns
+    def __init__(self, records, length, horizontal_align, color, colorset,
+                 height):
+        self.records = records
         self.length = length
         self.horizontal_align = horizontal_align
         self.color = color
@@ -266,13 +276,16 @@ class RegionBox:
         self.height = height
 
     def minmax(self, value_name):
+        # calculated only when a box or its description is really printed
+        if self.access_patterns_range is None:
+            self.access_patterns_range = AccessPatternsRange(self.records)
         if value_name == 'size':
-            sorted_vals = self.sorted_access_patterns.sz_regions
+            minmax = self.access_patterns_range.sz_regions
         elif value_name == 'access_rate':
-            sorted_vals = self.sorted_access_patterns.access_rates_percent
+            minmax = self.access_patterns_range.access_rates_percent
         elif value_name == 'age':
-            sorted_vals = self.sorted_access_patterns.ages_us
-        return sorted_vals[0], sorted_vals[-1]
+            minmax = self.access_patterns_range.ages_us
+        return minmax[0], minmax[1]
 
     def val_minmax(self, region, value_name):
         minval, maxval = self.minmax(value_name)
@@ -350,45 +363,61 @@ class RegionBox:
                     if self.height.display_logscale else 'linearscale'))
         return '\n'.join(lines)
 
-def apply_min_chars(min_chars, field_name, txt):
+def min_chars_of(min_chars):
     # min_chars: [[<field name>, <number of min chars>]...]
+    nr_min_chars = {}
     for name, nr in min_chars:
         try:
             nr = int(nr)
         except:
             print('wrong min_chars: %s' % min_chars)
-
-        if name == field_name:
-            if len(txt) >= nr:
-                return txt
-            txt += ' ' * (nr - len(txt))
-            return txt
-    return txt
+            continue
+        if not name in nr_min_chars:
+            nr_min_chars[name] = nr
+    return nr_min_chars
+
+class CompiledTemplate:
+    '''Format template split into literal chunks and formatter calls'''
+    chunks = None
+    fields = None   # [(index of chunk, format_fn, min chars)...]
+
+    def __init__(self, template, formatters, min_chars):
+        keywords = {}
+        for formatter in formatters:
+            if not formatter.keyword in keywords:
+                keywords[formatter.keyword] = formatter
+        nr_min_chars = min_chars_of(min_chars)
+        pattern = '(%s)' % '|'.join([re.escape(f.keyword) for f in formatters])
+        self.chunks = re.split(pattern, template)
+        self.fields = []
+        for idx, chunk in enumerate(self.chunks):
+            if idx % 2 == 0:
+                self.chunks[idx] = chunk.replace('\\n', '\n')
+                continue
+            self.fields.append((idx, keywords[chunk].format_fn,
+                                nr_min_chars.get(chunk, 0)))
+
+    def render(self, *format_fn_args):
+        chunks = self.chunks[:]
+        for idx, format_fn, nr_min_chars in self.fields:
+            chunks[idx] = format_fn(*format_fn_args).ljust(nr_min_chars)
+        return ''.join(chunks)
 
 def format_template(template, formatters, min_chars, index, region, snapshot,
         record, raw, region_box_args):
     if template == '':
         return
-    for formatter in formatters:
-        if template.find(formatter.keyword) == -1:
-            continue
-        if formatters == record_formatters:
-            txt = formatter.format_fn(record, raw)
-        elif formatters == snapshot_formatters:
-            txt = formatter.format_fn(snapshot, record, raw, region_box_args)
-        elif formatters == region_formatters:
-            txt = formatter.format_fn(index, region, raw, region_box_args)
-        txt = apply_min_chars(min_chars, formatter.keyword, txt)
-        template = template.replace(formatter.keyword, txt)
-    template = template.replace('\\n', '\n')
-    return template
-
-def format_output(template, formatters, min_chars, raw, region_box_args,
-                  record, snapshot=None, region=None, index=None):
+    compiled = CompiledTemplate(template, formatters, min_chars)
+    if formatters is record_formatters:
+        return compiled.render(record, raw)
+    elif formatters is snapshot_formatters:
+        return compiled.render(snapshot, record, raw, region_box_args)
+    return compiled.render(index, region, raw, region_box_args)
+
+def compile_template(template, formatters, min_chars):
     if template == '':
         return None
-    return format_template(template, formatters, min_chars, index, region,
-        snapshot, record, raw, region_box_args)
+    return CompiledTemplate(template, formatters, min_chars)
 
 def temperature_of(region, weights):
     sz_weight, access_rate_weight, age_weight = weights
@@ -421,9 +450,9 @@ def sorted_regions(regions, sort_fields, sort_dsc_keys, temperature_weights):
                     key=lambda r: temperature_of(r, temperature_weights))
     return regions
 
-def fmt_records(fmt, records):
-    sorted_access_patterns = SortedAccessPatterns(records)
-    region_box_args = RegionBox(sorted_access_patterns,
+def fmt_records_texts(fmt, records):
+    '''Yield the formatted outputs of the records one by one'''
+    region_box_args = RegionBox(records,
             RegionBoxAttr(fmt.region_box_values[0],
                 fmt.region_box_min_max_length,
                 fmt.region_box_scales[0] == 'log'), fmt.region_box_align,
@@ -434,54 +463,53 @@ def fmt_records(fmt, records):
                 fmt.region_box_min_max_height,
                 fmt.region_box_scales[2] == 'log'))
 
-    outputs = []
+    raw = fmt.raw_number
+    record_head = compile_template(fmt.format_record_head, record_formatters,
+            fmt.min_chars_for)
+    record_tail = compile_template(fmt.format_record_tail, record_formatters,
+            fmt.min_chars_for)
+    snapshot_head = compile_template(fmt.format_snapshot_head,
+            snapshot_formatters, fmt.min_chars_for)
+    snapshot_tail = compile_template(fmt.format_snapshot_tail,
+            snapshot_formatters, fmt.min_chars_for)
+    region_fmt = compile_template(fmt.format_region, region_formatters,
+            fmt.min_chars_for)
+
     for record in records:
-        outputs.append(
-                format_output(
-                    fmt.format_record_head, record_formatters,
-                    fmt.min_chars_for, fmt.raw_number, region_box_args,
-                    record))
+        if record_head is not None:
+            yield record_head.render(record, raw)
         snapshots = record.snapshots
 
         for sidx, snapshot in enumerate(snapshots):
-            outputs.append(
-                    format_output(
-                        fmt.format_snapshot_head, snapshot_formatters,
-                        fmt.min_chars_for, fmt.raw_number, region_box_args,
-                        record, snapshot))
+            if snapshot_head is not None:
+                yield snapshot_head.render(
+                        snapshot, record, raw, region_box_args)
             for r in snapshot.regions:
                 r.nr_accesses.add_unset_unit(record.intervals)
                 r.age.add_unset_unit(record.intervals)
-            for idx, r in enumerate(
-                    sorted_regions(snapshot.regions, fmt.sort_regions_by,
-                        fmt.sort_regions_dsc, fmt.temperature_weights)):
-                outputs.append(
-                        format_output(
-                            fmt.format_region, region_formatters,
-                            fmt.min_chars_for, fmt.raw_number,
-                            region_box_args, record, snapshot, r, idx))
-            outputs.append(
-                    format_output(
-                        fmt.format_snapshot_tail, snapshot_formatters,
-                        fmt.min_chars_for, fmt.raw_number, region_box_args,
-                        record, snapshot))
+            if region_fmt is not None:
+                render = region_fmt.render
+                for idx, r in enumerate(
+                        sorted_regions(snapshot.regions, fmt.sort_regions_by,
+                            fmt.sort_regions_dsc, fmt.temperature_weights)):
+                    yield render(idx, r, raw, region_box_args)
+            if snapshot_tail is not None:
+                yield snapshot_tail.render(
+                        snapshot, record, raw, region_box_args)
 
             if sidx < len(snapshots) - 1 and not fmt.total_sz_only():
-                outputs.append('')
-        outputs.append(
-                format_output(
-                    fmt.format_record_tail, record_formatters,
-                    fmt.min_chars_for, fmt.raw_number, region_box_args,
-                    record))
-    outputs = [o for o in outputs if o is not None]
-    return '\n'.join(outputs)
+                yield ''
+        if record_tail is not None:
+            yield record_tail.render(record, raw)
+
+def fmt_records(fmt, records):
+    return '\n'.join(fmt_records_texts(fmt, records))
 
 def pr_records(fmt, records):
     if fmt.json:
-        _damo_print.pr_with_pager_if_needed(
-                json.dumps([r.to_kvpairs(fmt.raw_number) for r in records],
-                           indent=4))
-    _damo_print.pr_with_pager_if_needed(fmt_records(fmt, records))
+        _damo_print.pr_texts_with_pager_if_needed(
+                _damo_records.records_json_texts(records, fmt.raw_number))
+    _damo_print.pr_texts_with_pager_if_needed(fmt_records_texts(fmt, records))
 
 class RecordsVisualizationFormat:
     sort_regions_by = None
@@ -529,11 +557,11 @@ class RecordsVisualizationFormat:
         self.json = args.json
         return self
 
-    def total_sz_only():
+    def total_sz_only(self):
         return (
-                args.format_snapshot_head == '' and
-                args.format_region == '' and
-                args.format_snapshot_tail == '<total bytes>')
+                self.format_snapshot_head == '' and
+                self.format_region == '' and
+                self.format_snapshot_tail == '<total bytes>')
 
     def to_kvpairs(self, raw):
         return {
@@ -673,12 +701,11 @@ def main(args):
     else:
         fmt = set_formats(args)
     fmt.runtime_update(records)
-    for record in records:
-        try:
-            pr_records(fmt, records)
-        except BrokenPipeError as e:
-            # maybe user piped to 'less' like pager, and quit from it
-            pass
+    try:
+        pr_records(fmt, records)
+    except BrokenPipeError as e:
+        # maybe user piped to 'less' like pager, and quit from it
+        pass
 
 def add_fmt_args(parser, hide_help=False):
     # how to show, in simple selection
@@ -32,31 +32,44 @@ def set_argparser(parser):
                         help='use machine-friendly raw numbers')
     parser.add_argument('--all_footprint', action='store_true',
                         help='print not percentiles but all footprint values')
+    _damo_dist.add_approx_percentiles_argument(parser)
     parser.description = 'Show distribution of memory footprint'
 
+def get_footprint_bytes(snapshot, metric):
+    footprint_bytes = 0
+    for pid, fp in snapshot.footprints.items():
+        if metric == 'sys_used':
+            if pid is not None:
+                continue
+            footprint_bytes = (fp.total - fp.free) * 1024
+        # ignore SysMemFootprint
+        if pid is None:
+            continue
+        # todo: get real page size of the system
+        if metric == 'vsz':
+            footprint_bytes += fp.size * 4096
+        elif metric == 'rss':
+            footprint_bytes += fp.resident * 4096
+    return footprint_bytes
+
 def get_dists(records, metric, do_sort):
+    return get_dists_of(_damo_records.load_mem_footprint(records), metric,
+                        do_sort)
+
+def get_dists_of(footprint_snapshots, metric, do_sort):
     dists = []
-    footprint_snapshots = _damo_records.load_mem_footprint(records)
     for snapshot in footprint_snapshots:
-        footprint_bytes = 0
-        for pid, fp in snapshot.footprints.items():
-            if metric == 'sys_used':
-                if pid is not None:
-                    continue
-                footprint_bytes = (fp.total - fp.free) * 1024
-            # ignore SysMemFootprint
-            if pid is None:
-                continue
-            # todo: get real page size of the system
-            if metric == 'vsz':
-                footprint_bytes += fp.size * 4096
-            elif metric == 'rss':
-                footprint_bytes += fp.resident * 4096
-        dists.append(footprint_bytes)
+        dists.append(get_footprint_bytes(snapshot, metric))
     if do_sort:
         dists.sort()
     return dists
 
+def get_sketch(records, metric):
+    sketch = _damo_dist.QuantileSketch()
+    for snapshot in _damo_records.load_mem_footprint(records):
+        sketch.add(get_footprint_bytes(snapshot, metric))
+    return sketch
+
 def main(args):
     if args.metric == 'all':
         for metric in ['vsz', 'rss', 'sys_used']:
@@ -64,7 +77,15 @@ def main(args):
             main(args)
         return
 
-    dists = get_dists(args.input, args.metric, args.sortby == 'size')
+    if args.approx_percentiles:
+        err = _damo_dist.approx_percentiles_err(args.sortby == 'size',
+                                                args.all_footprint)
+        if err is not None:
+            print(err)
+            exit(1)
+        dists = get_sketch(args.input, args.metric)
+    else:
+        dists = get_dists(args.input, args.metric, args.sortby == 'size')
 
     percentiles = range(args.range[0], args.range[1], args.range[2])
     raw_number = args.raw_number
@@ -12,50 +12,99 @@ import damo_record_info
 import damo_report_footprint
 import damo_wss
 
-def fmt_report_short(args):
-    lines = []
+class Analysis:
+    '''Results of the analyses of the access pattern for the report'''
+    guides = None
+    heatmaps = None         # {(target id, region start, region end): text}
+    wss_consumer = None
+    footprint_snapshots = None
+
+def analyze_records(records, heatmap_resol):
+    '''
+    Analyze the access pattern records for the report.  The snapshots are
+    traversed only twice, once for the guides, and once for all the others
+    that need the guides.
+    '''
+    analysis = Analysis()
+    guide_consumer = damo_record_info.GuideInfoConsumer()
+    _damo_records.analyze_records(records, [guide_consumer])
+    analysis.guides = guide_consumer.sorted_guides()
+
+    consumers = []
+    heatmap_consumers = []
+    for guide in analysis.guides:
+        for region in guide.regions():
+            heatmap_args = argparse.Namespace(
+                    tid=guide.tid, resol=heatmap_resol,
+                    time_range=[guide.start_time, guide.end_time],
+                    address_range=region,
+                    output='stdout',
+                    stdout_colorset='gray',
+                    stdout_skip_colorset_example=True,
+                    )
+            time_range, addr_range = damo_heatmap.view_ranges(heatmap_args)
+            region_consumers = [damo_heatmap.HeatPixelsConsumer(
+                record, time_range, addr_range, heatmap_resol)
+                for record in records if record.target_id == guide.tid]
+            heatmap_consumers.append(
+                    [guide.tid, region, heatmap_args, region_consumers])
+            consumers += region_consumers
+
+    # the adjustment modifies snapshots that all consumers have seen, so
+    # should be the last consumer
+    analysis.wss_consumer = damo_wss.WssConsumer(acc_thres=1, sz_thres=1)
+    nr_snapshots = 0
+    for record in records:
+        nr_snapshots += len(record.snapshots)
+    if nr_snapshots > 200:
+        consumers.append(_damo_records.AdjustedSnapshotsConsumer(
+            [analysis.wss_consumer], aggregate_interval=1,
+            nr_snapshots_to_skip=20))
+    else:
+        consumers.append(analysis.wss_consumer)
+    _damo_records.analyze_records(records, consumers)
+
+    analysis.heatmaps = {}
+    for tid, region, heatmap_args, region_consumers in heatmap_consumers:
+        analysis.heatmaps[(tid, region[0], region[1])] = \
+                damo_heatmap.fmt_heat_pixels(heatmap_args,
+                        [c.heat_pixels() for c in region_consumers])
+    return analysis
+
+def analyze(args, heatmap_resol):
     records, err = _damo_records.get_records(record_file=args.access_pattern)
     if err is not None:
         print('access pattern record file (%s) parsing failed (%s)' %
               (args.access_pattern, err))
         exit(1)
 
-    guides = damo_record_info.get_guide_info(records)
+    analysis = analyze_records(records, heatmap_resol)
+    if args.footprints is None:
+        args.footprints = args.access_pattern + '.mem_footprint'
+    analysis.footprint_snapshots = _damo_records.load_mem_footprint(
+            args.footprints)
+    return analysis
+
+def fmt_access_report_short(analysis):
+    '''
+    Returns lines of the heatmap and the memory footprints distribution of the
+    short report
+    '''
+    lines = []
     lines.append('# Heatmap')
-    for guide in guides:
+    for guide in analysis.guides:
         for region in guide.regions():
             lines.append('# target %d, address range %d-%d' % (
                 guide.tid, region[0], region[1]))
-            heatmap = damo_heatmap.fmt_heats(
-                    argparse.Namespace(
-                        tid=guide.tid, resol=[5, 80],
-                        time_range=[guide.start_time, guide.end_time],
-                        address_range=region,
-                        output='stdout',
-                        stdout_colorset='gray',
-                        stdout_skip_colorset_example=True,
-                        ),
-                    records)
-            lines.append(heatmap)
+            lines.append(analysis.heatmaps[(guide.tid, region[0], region[1])])
 
     lines.append('')
     lines.append('# Memory Footprints Distribution')
 
-    nr_snapshots = 0
-    for record in records:
-        nr_snapshots += len(record.snapshots)
-    if nr_snapshots > 200:
-        _damo_records.adjust_records(
-                records, aggregate_interval=1, nr_snapshots_to_skip=20)
-
-    if args.footprints is None:
-        args.footprints = args.access_pattern + '.mem_footprint'
-
     lines.append('%10s %15s %15s %15s %15s %15s' %
                  ('percentile', '0', '25', '50', '75', '100'))
-    wss_dists = damo_wss.get_wss_dists(
-            records, acc_thres=1, sz_thres=1, do_sort=True,
-            collapse_targets=True)
+    wss_dists = analysis.wss_consumer.dists(do_sort=True,
+                                            collapse_targets=True)
     for tid, dists in wss_dists.items():
         # because collapsed targets, only one iteration will be executed here
         line = '%10s ' % 'wss'
@@ -66,14 +115,18 @@ def fmt_report_short(args):
         lines.append(line)
     for metric in ['rss', 'vsz', 'sys_used']:
         line = '%10s ' % metric
-        fp_dists = damo_report_footprint.get_dists(
-                records=args.footprints, metric=metric,
-                do_sort=True)
+        fp_dists = damo_report_footprint.get_dists_of(
+                analysis.footprint_snapshots, metric=metric, do_sort=True)
         for percentile in range(0, 101, 25):
             val = _damo_fmt_str.format_sz(
                     _damo_dist.get_percentile(fp_dists, percentile), False)
             line += '%15s ' % val
         lines.append(line)
+    return lines
+
+def fmt_report_short(args):
+    analysis = analyze(args, heatmap_resol=[5, 80])
+    lines = fmt_access_report_short(analysis)
 
     lines.append('')
     lines.append('# Hotspot functions')
@@ -89,13 +142,8 @@ def fmt_report_short(args):
 
 def fmt_report(args):
     lines = []
-    records, err = _damo_records.get_records(record_file=args.access_pattern)
-    if err is not None:
-        print('access pattern record file (%s) parsing failed (%s)' %
-              (args.access_pattern, err))
-        exit(1)
-
-    guides = damo_record_info.get_guide_info(records)
+    analysis = analyze(args, heatmap_resol=[10, 80])
+    guides = analysis.guides
 
     lines.append('Overall recorded access pattern')
     lines.append('===============================')
@@ -114,17 +162,7 @@ def fmt_report(args):
         lines.append('# target %d' % guide.tid)
         for region in guide.regions():
             lines.append('# address range %d-%d' % (region[0], region[1]))
-            heatmap = damo_heatmap.fmt_heats(
-                    argparse.Namespace(
-                        tid=guide.tid, resol=[10, 80],
-                        time_range=[guide.start_time, guide.end_time],
-                        address_range=region,
-                        output='stdout',
-                        stdout_colorset='gray',
-                        stdout_skip_colorset_example=True,
-                        ),
-                    records)
-            lines.append(heatmap)
+            lines.append(analysis.heatmaps[(guide.tid, region[0], region[1])])
     lines.append('# you can get above via \'damo report heatmap\'')
 
     lines.append('')
@@ -132,23 +170,12 @@ def fmt_report(args):
     lines.append('===================================================')
     lines.append('')
 
-    nr_snapshots = 0
-    for record in records:
-        nr_snapshots += len(record.snapshots)
-    if nr_snapshots > 200:
-        _damo_records.adjust_records(
-                records, aggregate_interval=1, nr_snapshots_to_skip=20)
-
-    if args.footprints is None:
-        args.footprints = args.access_pattern + '.mem_footprint'
-
     for sort_key in ['size', 'time']:
         lines.append('Sorted by %s' % sort_key)
         lines.append('--------------')
         lines.append('')
-        wss_dists = damo_wss.get_wss_dists(
-                records, acc_thres=1, sz_thres=1, do_sort=sort_key == 'size',
-                collapse_targets=True)
+        wss_dists = analysis.wss_consumer.dists(
+                do_sort=sort_key == 'size', collapse_targets=True)
         for tid, dists in wss_dists.items():
             # because collapsed targets, only one iteration will be executed here
             output = _damo_dist.fmt_dists(
@@ -157,8 +184,8 @@ def fmt_report(args):
                     nr_cols_bar=59)
             lines.append(output)
         for metric in ['rss', 'vsz', 'sys_used']:
-            fp_dists = damo_report_footprint.get_dists(
-                    records=args.footprints, metric=metric,
+            fp_dists = damo_report_footprint.get_dists_of(
+                    analysis.footprint_snapshots, metric=metric,
                     do_sort=sort_key == 'size')
             output = _damo_dist.fmt_dists(
                     metric, fp_dists, range(0, 101, 25), pr_all=False,
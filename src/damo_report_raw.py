@@ -1,6 +1,5 @@
 # SPDX-License-Identifier: GPL-2.0
 
-import json
 import os
 import sys
 
@@ -8,66 +7,49 @@ import _damo_fmt_str
 import _damo_print
 import _damo_records
 
-def filter_snapshots(records, start_time_sec, end_time_sec):
-    for record in records:
-        if len(record.snapshots) == 0:
-            continue
-        base_time = record.snapshots[0].start_time
-        filtered_snapshots = []
-        for snapshot in record.snapshots:
-            offset_sec = (snapshot.start_time - base_time) / 1000000000
-            if offset_sec < start_time_sec:
-                continue
-            if offset_sec > end_time_sec:
-                break
-            filtered_snapshots.append(snapshot)
-        record.snapshots = filtered_snapshots
-
-def pr_records(args, records):
-    lines = []
-    if args.duration:
-        filter_snapshots(records, args.duration[0], args.duration[1])
-
-    if args.json:
-        _damo_print.pr_with_pager_if_needed(
-                json.dumps([r.to_kvpairs(args.raw_number) for r in records],
-                           indent=4))
-        return
-
-    lines = []
+def fmt_records_texts(args, records):
+    '''Yield the lines of the records one by one'''
     for record in records:
         snapshots = record.snapshots
         if len(snapshots) == 0:
             continue
 
         base_time = snapshots[0].start_time
-        lines.append('base_time_absolute: %s\n' %
+        yield ('base_time_absolute: %s\n' %
                 _damo_fmt_str.format_time_ns(base_time, args.raw_number))
 
         for snapshot in snapshots:
-            lines.append('monitoring_start:    %16s' %
+            yield ('monitoring_start:    %16s' %
                     _damo_fmt_str.format_time_ns(
                         snapshot.start_time - base_time, args.raw_number))
-            lines.append('monitoring_end:      %16s' %
+            yield ('monitoring_end:      %16s' %
                     _damo_fmt_str.format_time_ns(
                         snapshot.end_time - base_time, args.raw_number))
-            lines.append('monitoring_duration: %16s' %
+            yield ('monitoring_duration: %16s' %
                     _damo_fmt_str.format_time_ns(
                         snapshot.end_time - snapshot.start_time,
                         args.raw_number))
-            lines.append('target_id: %s' % record.target_id)
-            lines.append('nr_regions: %s' % len(snapshot.regions))
-            lines.append('# %10s %12s  %12s  %11s %5s' %
+            yield 'target_id: %s' % record.target_id
+            yield 'nr_regions: %s' % len(snapshot.regions)
+            yield ('# %10s %12s  %12s  %11s %5s' %
                     ('start_addr', 'end_addr', 'length', 'nr_accesses', 'age'))
             for r in snapshot.regions:
-                lines.append("%012x-%012x (%12s) %11d %5d" %
+                yield ("%012x-%012x (%12s) %11d %5d" %
                         (r.start, r.end,
                             _damo_fmt_str.format_sz(r.size(), args.raw_number),
                             r.nr_accesses.samples, r.age.aggr_intervals
                                 if r.age.aggr_intervals != None else -1))
-            lines.append('')
-    lines.append('')
-    _damo_print.pr_with_pager_if_needed('\n'.join(lines))
+            yield ''
+    yield ''
+
+def pr_records(args, records):
+    if args.json:
+        _damo_print.pr_texts_with_pager_if_needed(
+                _damo_records.records_json_texts(records, args.raw_number))
+        return
+
+    _damo_print.pr_texts_with_pager_if_needed(
+            fmt_records_texts(args, records))
 
 def set_argparser(parser):
     parser.add_argument('--input', '-i', type=str, metavar='<file>',
@@ -87,7 +69,13 @@ def main(args):
         print('input file (%s) is not exist' % file_path)
         exit(1)
 
-    records, err = _damo_records.get_records(record_file=file_path)
+    time_range = None
+    if args.duration:
+        time_range = [args.duration[0] * 1000000000,
+                      args.duration[1] * 1000000000]
+    records, err = _damo_records.get_records(
+            record_file=file_path, time_range=time_range,
+            time_range_relative=True, time_range_by_start_time=True)
     if err:
         print('parsing damon result file (%s) failed (%s)' %
                 (file_path, err))
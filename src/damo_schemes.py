@@ -33,7 +33,8 @@ def main(args):
 
     _damon.ensure_root_and_initialized(args, save_feature_supports=True)
 
-    orig_kdamonds = _damon.current_kdamonds()
+    orig_kdamonds = _damon.current_kdamonds(read_stats=False,
+                                            read_tried_regions=False)
     kdamonds_idxs = []
 
     signal.signal(signal.SIGINT, sighandler)
@@ -0,0 +1,203 @@
+# SPDX-License-Identifier: GPL-2.0
+
+"""
+Serve DAMON monitoring results and status via a Unix domain socket.
+
+Clients send a json object having the request type, and receive a json
+object having the result and error, each in a line.  For example:
+
+    {"request": "snapshot"}
+    {"result": [<record>, ...], "error": null, "update_time": <seconds>}
+
+Supported requests are 'snapshot', 'status', and 'stats'.  The results are
+updated only if the last update is older than the minimum refresh interval,
+so multiple clients share the cost of reading DAMON.
+"""
+
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+
+import _damo_records
+import _damon
+import _damon_args
+
+class CachedResult:
+    '''
+    Result of get_result() that is updated only if it is older than the
+    minimum refresh interval.  The lock can be shared with other
+    CachedResult objects to serialize their updates.
+    '''
+    get_result = None
+    result = None
+    err = None
+    update_time = None
+    lock = None
+
+    def __init__(self, get_result, lock):
+        self.get_result = get_result
+        self.lock = lock
+
+    def get(self, min_refresh_interval):
+        with self.lock:
+            if (self.update_time is None or
+                    time.time() - self.update_time >= min_refresh_interval):
+                self.result, self.err = self.get_result()
+                self.update_time = time.time()
+            return self.result, self.err, self.update_time
+
+class ServeState:
+    orig_kdamonds = None
+    scheme_installed = False
+    scheme_idxs = None
+    min_refresh_interval = None
+    raw_number = None
+    damon_lock = None
+    snapshot = None
+    kdamonds = None
+
+    def __init__(self, min_refresh_interval, raw_number):
+        self.min_refresh_interval = min_refresh_interval
+        self.raw_number = raw_number
+        # DAMON sysfs handles only one command to the kdamond state file at a
+        # time, so serialize all accesses to DAMON
+        self.damon_lock = threading.Lock()
+        self.snapshot = CachedResult(self.read_snapshot, self.damon_lock)
+        self.kdamonds = CachedResult(self.read_kdamonds, self.damon_lock)
+
+    def read_snapshot(self):
+        running_kdamond_idxs = _damon.running_kdamond_idxs()
+        if len(running_kdamond_idxs) == 0:
+            return None, 'no kdamond running'
+        records, err = _damo_records.update_get_snapshot_records(
+                running_kdamond_idxs, self.scheme_idxs, False, True)
+        if err is not None:
+            return None, err
+        return [r.to_kvpairs(self.raw_number) for r in records], None
+
+    def read_kdamonds(self):
+        err = _damon.update_schemes_status(stats=True, tried_regions=False,
+                                           quota_effective_bytes=True)
+        if err is not None:
+            return None, err
+        return _damon.current_kdamonds(read_tried_regions=False), None
+
+    def handle(self, request):
+        if request == 'snapshot':
+            return self.snapshot.get(self.min_refresh_interval)
+
+        kdamonds, err, update_time = self.kdamonds.get(
+                self.min_refresh_interval)
+        if err is not None:
+            return None, err, update_time
+        if request == 'status':
+            return ([k.to_kvpairs(self.raw_number) for k in kdamonds], None,
+                    update_time)
+        if request == 'stats':
+            stats = []
+            for kd_idx, kdamond in enumerate(kdamonds):
+                for ctx_idx, ctx in enumerate(kdamond.contexts):
+                    for scheme_idx, scheme in enumerate(ctx.schemes):
+                        stats.append({'kdamond': kd_idx, 'context': ctx_idx,
+                                      'scheme': scheme_idx,
+                                      'stats': scheme.stats.to_kvpairs(
+                                          self.raw_number)})
+            return stats, None, update_time
+        return None, 'unsupported request (%s)' % request, None
+
+serve_state = None
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)['request']
+            except Exception:
+                request = None
+            if request is None:
+                result, err, update_time = None, 'wrong request', None
+            else:
+                result, err, update_time = serve_state.handle(request)
+            self.wfile.write(('%s\n' % json.dumps(
+                {'result': result, 'error': err,
+                 'update_time': update_time})).encode())
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def install_monitoring_scheme():
+    '''Returns an error string or None'''
+    serve_state.orig_kdamonds = _damon.current_kdamonds(
+            read_stats=False, read_tried_regions=False)
+    err = _damo_records.install_target_regions_if_needed(
+            serve_state.orig_kdamonds)
+    if err is not None:
+        return 'vaddr region install failed (%s)' % err
+    installed, idxs, err = _damo_records.find_install_scheme(_damon.Damos())
+    if err is not None:
+        return 'monitoring scheme install failed (%s)' % err
+    serve_state.scheme_installed = installed
+    serve_state.scheme_idxs = idxs
+    return None
+
+def bind_server(socket_path):
+    '''Returns a Server bound to the socket that only the owner can use'''
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    # set the permission of the socket file from its creation
+    orig_umask = os.umask(0o177)
+    try:
+        return Server(socket_path, RequestHandler)
+    finally:
+        os.umask(orig_umask)
+
+def cleanup_exit(socket_path, exit_code):
+    # wait for handler threads that reading DAMON.  The lock is not released,
+    # so that no handler thread reads DAMON after the cleanup.
+    serve_state.damon_lock.acquire()
+    if serve_state.scheme_installed:
+        err = _damon.commit(serve_state.orig_kdamonds)
+        if err is not None:
+            print('monitoring scheme uninstall failed (%s)' % err)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    exit(exit_code)
+
+def main(args):
+    global serve_state
+
+    _damon.ensure_root_and_initialized(args, load_feature_supports=True)
+    if len(_damon.running_kdamond_idxs()) == 0:
+        print('no kdamond running')
+        exit(1)
+
+    serve_state = ServeState(args.min_refresh_interval, args.raw_number)
+    err = install_monitoring_scheme()
+    if err is not None:
+        print(err)
+        exit(1)
+
+    server = bind_server(args.socket)
+
+    signal.signal(signal.SIGINT,
+                  lambda signum, frame: cleanup_exit(args.socket, 0))
+    signal.signal(signal.SIGTERM,
+                  lambda signum, frame: cleanup_exit(args.socket, 0))
+
+    print('serving at %s.  Press Ctrl+C to stop' % args.socket)
+    server.serve_forever()
+
+def set_argparser(parser):
+    parser.description = 'Serve DAMON results and status via a Unix socket'
+    _damon_args.set_common_argparser(parser)
+    parser.add_argument('--socket', metavar='<file>',
+            default='/run/damo.sock',
+            help='path to the Unix domain socket to serve at')
+    parser.add_argument('--min_refresh_interval', metavar='<seconds>',
+            type=float, default=1,
+            help='minimum interval between updates of the results')
+    parser.add_argument('--raw_number', action='store_true',
+            help='use machine-friendly raw numbers')
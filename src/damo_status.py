@@ -14,7 +14,8 @@ import _damon
 import _damon_args
 
 def pr_damon_parameters(json_format, raw_nr):
-    kdamonds = _damon.current_kdamonds()
+    kdamonds = _damon.current_kdamonds(read_stats=False,
+                                       read_tried_regions=False)
     for k in kdamonds:
         for c in k.contexts:
             for s in c.schemes:
@@ -28,7 +29,7 @@ def update_pr_schemes_stats(json_format, raw_nr, damos_stat_fields):
     if err:
         print(err)
         return
-    kdamonds = _damon.current_kdamonds()
+    kdamonds = _damon.current_kdamonds(read_tried_regions=False)
 
     stats = []
     for kd_idx, kdamond in enumerate(kdamonds):
@@ -61,7 +62,7 @@ def update_pr_schemes_stats(json_format, raw_nr, damos_stat_fields):
             print()
 
 def pr_kdamonds_summary(json_format, raw_nr, show_cpu):
-    kdamonds = _damon.current_kdamonds()
+    kdamonds = _damon.current_kdamonds(read_contexts=False)
     summary = [k.summary_str(show_cpu) for k in kdamonds]
     if json_format:
         print(json.dumps(summary, indent=4))
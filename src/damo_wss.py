@@ -8,34 +8,76 @@ import tempfile
 import _damo_dist
 import _damo_fmt_str
 import _damo_records
+import damo_record_info
+
+def get_wss(snapshot, acc_thres, sz_thres):
+    wss = 0
+    for start, end, nr_accesses in damo_record_info.region_fields_of(snapshot):
+        # Ignore regions not fulfill working set conditions
+        if nr_accesses < acc_thres:
+            continue
+        if end - start < sz_thres:
+            continue
+        wss += end - start
+    return wss
+
+class WssConsumer(_damo_records.SnapshotsConsumer):
+    '''Collects working set sizes of the snapshots of each record'''
+    acc_thres = None
+    sz_thres = None
+    wss_lists = None    # {record: [wss of each snapshot]}
+
+    def __init__(self, acc_thres, sz_thres):
+        self.acc_thres = acc_thres
+        self.sz_thres = sz_thres
+        self.wss_lists = {}
+
+    def add_snapshot(self, record, snapshot):
+        self.wss_lists.setdefault(record, []).append(
+                get_wss(snapshot, self.acc_thres, self.sz_thres))
+
+    def dists(self, do_sort, collapse_targets):
+        wss_dists = {}
+        for record, wss_dist in self.wss_lists.items():
+            if do_sort:
+                wss_dist = sorted(wss_dist)
+            wss_dists[record.target_id] = wss_dist
+        if collapse_targets is True:
+            collapsed_dist = []
+            for t, dist in wss_dists.items():
+                for idx, wss in enumerate(dist):
+                    if len(collapsed_dist) <= idx:
+                        collapsed_dist.append(wss)
+                    else:
+                        collapsed_dist[idx] += wss
+            wss_dists = {0: collapsed_dist}
+        return wss_dists
 
 def get_wss_dists(records, acc_thres, sz_thres, do_sort, collapse_targets):
-    wss_dists = {}
+    consumer = WssConsumer(acc_thres, sz_thres)
+    _damo_records.analyze_records(records, [consumer])
+    return consumer.dists(do_sort, collapse_targets)
+
+def get_wss_sketches(records, acc_thres, sz_thres, collapse_targets):
+    '''
+    Same to get_wss_dists() with do_sort, but returns sketches instead of the
+    sorted lists, and an error
+    '''
+    wss_sketches = {}
     for record in records:
-        wss_dist = []
+        sketch = _damo_dist.QuantileSketch()
         for snapshot in record.snapshots:
-            wss = 0
-            for r in snapshot.regions:
-                # Ignore regions not fulfill working set conditions
-                if r.nr_accesses.samples < acc_thres:
-                    continue
-                if r.size() < sz_thres:
-                    continue
-                wss += r.size()
-            wss_dist.append(wss)
-        if do_sort:
-            wss_dist.sort(reverse=False)
-        wss_dists[record.target_id] = wss_dist
+            sketch.add(get_wss(snapshot, acc_thres, sz_thres))
+        wss_sketches[record.target_id] = sketch
     if collapse_targets is True:
-        collapsed_dist = []
-        for t, dist in wss_dists.items():
-            for idx, wss in enumerate(dist):
-                if len(collapsed_dist) <= idx:
-                    collapsed_dist.append(wss)
-                else:
-                    collapsed_dist[idx] += wss
-        wss_dists = {0: collapsed_dist}
-    return wss_dists
+        # same to summing up the sorted lists by the index
+        sketches = list(wss_sketches.values())
+        if len(set([len(s) for s in sketches])) > 1:
+            return None, ' '.join([
+                'collapsing targets with --approx_percentiles needs same',
+                'number of snapshots for all targets'])
+        wss_sketches = {0: _damo_dist.SketchesSum(sketches)}
+    return wss_sketches, None
 
 def set_argparser(parser):
     parser.add_argument('--input', '-i', type=str, metavar='<file>',
@@ -71,6 +113,7 @@ def set_argparser(parser):
                         help='Report workingset size per monitoring target')
     parser.add_argument('--collapse_targets', action='store_true',
                         help='Collapse targets in the record into one')
+    _damo_dist.add_approx_percentiles_argument(parser)
     parser.description = 'Show distribution of working set size'
 
 def main(args):
@@ -81,6 +124,12 @@ def main(args):
         wss_sort = False
     raw_number = args.raw_number
 
+    if args.approx_percentiles:
+        err = _damo_dist.approx_percentiles_err(wss_sort, args.all_wss)
+        if err is not None:
+            print(err)
+            exit(1)
+
     records, err = _damo_records.get_records(record_file=file_path)
     if err != None:
         print('monitoring result file (%s) parsing failed (%s)' %
@@ -88,8 +137,16 @@ def main(args):
         exit(1)
 
     _damo_records.adjust_records(records, args.work_time, args.exclude_samples)
-    wss_dists = get_wss_dists(records, args.acc_thres, args.sz_thres, wss_sort,
-                              args.collapse_targets)
+    if args.approx_percentiles:
+        wss_dists, err = get_wss_sketches(records, args.acc_thres,
+                                          args.sz_thres,
+                                          args.collapse_targets)
+        if err is not None:
+            print(err)
+            exit(1)
+    else:
+        wss_dists = get_wss_dists(records, args.acc_thres, args.sz_thres,
+                                  wss_sort, args.collapse_targets)
 
     if not args.plot:
         for tid, dists in wss_dists.items():
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+'''
+Compare speed and output of _damo_records.aggregate_snapshots() with those of
+the old linear search based implementation, for the record files of this
+directory and a synthetic record having many regions.
+'''
+
+import copy
+import os
+import random
+import sys
+import time
+
+bindir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(bindir, '..', '..', 'src'))
+
+import _damo_records
+import _damon
+
+def add_region_linear(regions, region, nr_acc_to_add):
+    for r in regions:
+        if _damo_records.regions_intersect(r, region):
+            if not r in nr_acc_to_add:
+                nr_acc_to_add[r] = 0
+            nr_acc_to_add[r] = max(nr_acc_to_add[r],
+                    region.nr_accesses.samples)
+
+            new_regions = []
+            if region.start < r.start:
+                new_regions.append(_damon.DamonRegion(
+                    region.start, r.start,
+                    region.nr_accesses.samples, _damon.unit_samples,
+                    region.age.aggr_intervals, _damon.unit_aggr_intervals))
+            if r.end < region.end:
+                new_regions.append(_damon.DamonRegion(
+                        r.end, region.end,
+                        region.nr_accesses.samples, _damon.unit_samples,
+                        region.age.aggr_intervals,
+                        _damon.unit_aggr_intervals))
+
+            for new_r in new_regions:
+                add_region_linear(regions, new_r, nr_acc_to_add)
+            return
+    regions.append(region)
+
+def aggregate_snapshots_linear(snapshots):
+    new_regions = []
+    for snapshot in snapshots:
+        nr_acc_to_add = {}
+        for region in snapshot.regions:
+            add_region_linear(new_regions, region, nr_acc_to_add)
+        for region in nr_acc_to_add:
+            region.nr_accesses.samples += nr_acc_to_add[region]
+
+    return _damo_records.DamonSnapshot(snapshots[0].start_time,
+            snapshots[-1].end_time, new_regions, None)
+
+def synthetic_records(nr_snapshots, nr_regions):
+    random.seed(42)
+    record = _damo_records.DamonRecord(0, 0,
+            _damon.DamonIntervals(5000, 100000, 1000000), 0, None)
+    sz_region = 4096 * 1024
+    for i in range(nr_snapshots):
+        regions = []
+        start = 0
+        for j in range(nr_regions):
+            end = (j + 1) * sz_region + random.randint(-4, 4) * 4096
+            if j == nr_regions - 1:
+                end = nr_regions * sz_region
+            regions.append(_damon.DamonRegion(start, end,
+                random.randint(0, 20), _damon.unit_samples,
+                random.randint(0, 100), _damon.unit_aggr_intervals))
+            start = end
+        record.snapshots.append(_damo_records.DamonSnapshot(
+            i * 100000000, (i + 1) * 100000000, regions, None))
+    return [record]
+
+def bench(name, records, aggregate_interval_us):
+    outputs = []
+    for aggregate_fn in [aggregate_snapshots_linear,
+                         _damo_records.aggregate_snapshots]:
+        to_adjust = copy.deepcopy(records)
+        orig_aggregate_fn = _damo_records.aggregate_snapshots
+        _damo_records.aggregate_snapshots = aggregate_fn
+        start = time.time()
+        _damo_records.adjust_records(to_adjust, aggregate_interval_us, 0)
+        elapsed = time.time() - start
+        _damo_records.aggregate_snapshots = orig_aggregate_fn
+        outputs.append([r.to_kvpairs(raw=True) for r in to_adjust])
+        print('%-18s %-28s %8.3f seconds' %
+              (name, aggregate_fn.__name__, elapsed))
+    if outputs[0] != outputs[1]:
+        print('%s: outputs are different' % name)
+        exit(1)
+
+def main():
+    for record_file in ['damon.data', 'perf.data.script']:
+        records, err = _damo_records.parse_records_file(
+                os.path.join(bindir, record_file))
+        if err is not None:
+            print('parsing %s failed (%s)' % (record_file, err))
+            exit(1)
+        bench(record_file, records, 1000000)
+    bench('synthetic', synthetic_records(30, 1000), 1000000)
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@
 
 import os
 import sys
+import tempfile
 
 def test_input_expects(testcase, function, input_expects):
     for input_ in input_expects:
@@ -17,3 +18,21 @@ def add_damo_dir_to_syspath():
     bindir = os.path.dirname(os.path.realpath(__file__))
     damo_dir = os.path.join(bindir, '..', '..', 'src')
     sys.path.append(damo_dir)
+
+temp_cache_home = None
+saved_cache_home = None
+
+def use_temp_cache_home():
+    '''Make damo save caches of parsed files in a temporary directory'''
+    global temp_cache_home
+    global saved_cache_home
+    temp_cache_home = tempfile.TemporaryDirectory()
+    saved_cache_home = os.environ.get('XDG_CACHE_HOME')
+    os.environ['XDG_CACHE_HOME'] = temp_cache_home.name
+
+def restore_cache_home():
+    if saved_cache_home is None:
+        del os.environ['XDG_CACHE_HOME']
+    else:
+        os.environ['XDG_CACHE_HOME'] = saved_cache_home
+    temp_cache_home.cleanup()
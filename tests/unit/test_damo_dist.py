@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import random
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_dist
+
+class TestDamoDist(unittest.TestCase):
+    def test_quantile_sketch(self):
+        # exact for small number of values
+        values = [5, 3, 9, 1, 7]
+        sketch = _damo_dist.QuantileSketch()
+        for val in values:
+            sketch.add(val)
+        for percentile in range(0, 101, 5):
+            self.assertEqual(sketch.percentile(percentile),
+                    _damo_dist.get_percentile(sorted(values), percentile))
+        self.assertEqual(_damo_dist.get_average(sketch), 5)
+
+        values = list(range(100000))
+        random.Random(42).shuffle(values)
+        sketches = [_damo_dist.QuantileSketch() for i in range(2)]
+        for idx, val in enumerate(values):
+            sketches[idx % 2].add(val)
+        sketches[0].merge(sketches[1])
+        sketch = sketches[0]
+        self.assertEqual(len(sketch), len(values))
+        self.assertLess(sketch.nr_kept, 1000)
+        self.assertEqual(sketch.percentile(0), 0)
+        self.assertEqual(sketch.percentile(100), 99999)
+        for percentile in [1, 25, 50, 75, 99]:
+            # less than 1% rank error
+            self.assertLess(abs(sketch.percentile(percentile) -
+                                percentile * 1000), 1000)
+
+    def test_sketches_sum(self):
+        # same to the sorted lists that summed up by the index
+        values_list = [[5, 3, 9, 1, 7], [20, 60, 40, 10, 30]]
+        sketches = []
+        for values in values_list:
+            sketches.append(_damo_dist.QuantileSketch())
+            for val in values:
+                sketches[-1].add(val)
+        summed = [sum(vals) for vals in
+                  zip(*[sorted(values) for values in values_list])]
+        sketches_sum = _damo_dist.SketchesSum(sketches)
+        self.assertEqual(len(sketches_sum), len(summed))
+        for percentile in range(0, 101, 5):
+            self.assertEqual(
+                    _damo_dist.get_percentile(sketches_sum, percentile),
+                    _damo_dist.get_percentile(summed, percentile))
+        self.assertEqual(_damo_dist.get_average(sketches_sum),
+                         _damo_dist.get_average(summed))
+
+if __name__ == '__main__':
+    unittest.main()
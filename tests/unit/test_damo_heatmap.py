@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import argparse
+import contextlib
+import io
+import os
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_records
+import _damon
+import damo_heatmap
+
+def setUpModule():
+    _test_damo_common.use_temp_cache_home()
+
+def tearDownModule():
+    _test_damo_common.restore_cache_home()
+
+class TestDamoHeatmap(unittest.TestCase):
+    def test_time_range_out_of_record(self):
+        record_file = os.path.join(os.path.dirname(__file__), '..', 'report',
+                                   'damon.data.json_compressed')
+        parser = argparse.ArgumentParser()
+        damo_heatmap.set_argparser(parser)
+        args = parser.parse_args(['--input', record_file, '--time_range',
+                                  '0', '100000000000'])
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            damo_heatmap.main(args)
+        self.assertTrue(
+                '# y-axis: time (0-100000000000: 1 m 40 s)' in
+                output.getvalue().split('\n'))
+
+    def test_set_missed_args_no_snapshot(self):
+        record = _damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), None, 0)
+        args = argparse.Namespace(tid=None, time_range=None,
+                                  address_range=None)
+        self.assertEqual(damo_heatmap.set_missed_args(args, [record]),
+                         'no snapshot in the record')
+
+if __name__ == '__main__':
+    unittest.main()
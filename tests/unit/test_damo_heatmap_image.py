@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import os
+import struct
+import tempfile
+import unittest
+import xml.dom.minidom
+import zlib
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_heatmap_image
+
+class TestDamoHeatmapImage(unittest.TestCase):
+    def test_png_bytes(self):
+        rows = [bytes([0, 0, 0, 255, 255, 255]),
+                bytes([255, 0, 0, 0, 0, 255])]
+        png = _damo_heatmap_image.png_bytes(2, 2, rows)
+        self.assertEqual(png[:8], b'\x89PNG\r\n\x1a\n')
+        length, chunk_type = struct.unpack('>I4s', png[8:16])
+        self.assertEqual(chunk_type, b'IHDR')
+        self.assertEqual(struct.unpack('>IIBBBBB', png[16:16 + length]),
+                         (2, 2, 8, 2, 0, 0, 0))
+        offset = 16 + length + 4
+        length, chunk_type = struct.unpack('>I4s', png[offset:offset + 8])
+        self.assertEqual(chunk_type, b'IDAT')
+        self.assertEqual(
+                zlib.decompress(png[offset + 8:offset + 8 + length]),
+                b'\x00' + rows[0] + b'\x00' + rows[1])
+        self.assertEqual(png[-12:], b'\x00\x00\x00\x00IEND\xaeB`\x82')
+
+    def test_heat_rows(self):
+        # heats[x][y], first row of the image is for the highest y
+        heats = [[0, 1], [2, 3]]
+        palette = _damo_heatmap_image.palette
+        self.assertEqual(_damo_heatmap_image.heat_rows(heats, 2, 1), [
+            bytearray(palette[85] * 2 + palette[255] * 2),
+            bytearray(palette[0] * 2 + palette[170] * 2)])
+        self.assertEqual(palette[0], (0, 0, 0))
+        self.assertEqual(palette[255], (255, 255, 0))
+
+    def test_write_heatmap(self):
+        heats = [[x * y for y in range(30)] for x in range(20)]
+        with tempfile.TemporaryDirectory() as dir_path:
+            for image_format in ['png', 'svg']:
+                path = os.path.join(dir_path, 'heatmap.%s' % image_format)
+                self.assertEqual(_damo_heatmap_image.write_heatmap(
+                    path, heats, [0, 1000], [4096, 8192], 'Time (ns)',
+                    'Address (bytes)'), None)
+                with open(path, 'rb') as f:
+                    image = f.read()
+                if image_format == 'png':
+                    self.assertEqual(image[:8], b'\x89PNG\r\n\x1a\n')
+                else:
+                    xml.dom.minidom.parseString(image)
+            self.assertNotEqual(_damo_heatmap_image.write_heatmap(
+                os.path.join(dir_path, 'heatmap.pdf'), heats, [0, 1000],
+                [4096, 8192], 'Time (ns)', 'Address (bytes)'), None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import os
+import tempfile
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_heatmap_tiles
+import _damo_records
+import _damon
+import damo_heatmap
+
+def snapshot(time, regions):
+    return _damo_records.DamonSnapshot(time, time + 10,
+            [_damon.DamonRegion(start, end, nr_accesses,
+                _damon.unit_samples, 0, _damon.unit_aggr_intervals)
+             for start, end, nr_accesses in regions], None)
+
+def assert_heats_close(test, heats, pixels, delta):
+    for heats_row, pixels_row in zip(heats, pixels):
+        for heat, pixel in zip(heats_row, pixels_row):
+            test.assertAlmostEqual(heat, pixel.heat, delta=delta)
+
+class TestDamoHeatmapTiles(unittest.TestCase):
+    def test_heats(self):
+        record = _damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), None, 42)
+        record.snapshots = [snapshot(time, [
+            (4096, 4096 * 3, time % 7), (4096 * 5, 4096 * 9, 3),
+            (4096 * 9, 4096 * 13 + 100, time % 3 + 1)])
+            for time in range(0, 1000, 10)]
+
+        with tempfile.TemporaryDirectory() as dir_path:
+            record_file = os.path.join(dir_path, 'damon.data')
+            with open(record_file, 'w') as f:
+                f.write('record')
+            self.assertEqual(_damo_heatmap_tiles.read_tiles(record_file),
+                             None)
+            self.assertEqual(_damo_heatmap_tiles.write_tiles(
+                [record], record_file, None), None)
+            tiles = _damo_heatmap_tiles.read_tiles(record_file)
+            self.assertNotEqual(tiles, None)
+
+            time_range = [0, 1000]
+            addr_range = [4096, 4096 * 13 + 100]
+            for level in [0, 3, 6]:
+                resols = [2 ** level, 2 ** level]
+                heats_list = tiles.target_heats(42, time_range, addr_range,
+                                                resols)
+                self.assertEqual(len(heats_list), 1)
+                pixels = damo_heatmap.heat_pixels_from_snapshots(
+                        record.snapshots, time_range, addr_range, resols)
+                # the pixels are not aligned with the cells of the address
+                # ranges that split by the gap
+                max_heat = max([p.heat for row in pixels for p in row])
+                assert_heats_close(self, heats_list[0], pixels,
+                                   max_heat / 100)
+            self.assertEqual(tiles.target_heats(7, time_range, addr_range,
+                                                [4, 4]), None)
+            # too fine zoom
+            self.assertEqual(tiles.target_heats(42, [0, 1],
+                                                [4096, 4096 * 2], [4, 4]),
+                             None)
+
+            # outdated tiles
+            with open(record_file, 'a') as f:
+                f.write('more record')
+            self.assertEqual(_damo_heatmap_tiles.read_tiles(record_file),
+                             None)
+
+    def test_heats_sparse(self):
+        # two address ranges that far from each other, like those of vaddr
+        far_addr = 2 ** 45
+        record = _damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), None, 42)
+        record.snapshots = [snapshot(time, [
+            (4096, 4096 * 3, time % 7), (4096 * 3, 4096 * 9, 3),
+            (far_addr, far_addr + 4096 * 8, time % 3 + 1)])
+            for time in range(0, 1024, 10)]
+
+        with tempfile.TemporaryDirectory() as dir_path:
+            record_file = os.path.join(dir_path, 'damon.data')
+            with open(record_file, 'w') as f:
+                f.write('record')
+            self.assertEqual(_damo_heatmap_tiles.write_tiles(
+                [record], record_file, None), None)
+            tiles = _damo_heatmap_tiles.read_tiles(record_file)
+
+            time_range = [0, 1030]
+            # zoom into each of the ranges
+            for addr_range in [[4096, 4096 * 9],
+                               [far_addr, far_addr + 4096 * 8]]:
+                for level in [0, 3, 6]:
+                    resols = [2 ** level, 2 ** level]
+                    heats_list = tiles.target_heats(42, time_range,
+                                                    addr_range, resols)
+                    self.assertNotEqual(heats_list, None)
+                    pixels = damo_heatmap.heat_pixels_from_snapshots(
+                            record.snapshots, time_range, addr_range, resols)
+                    assert_heats_close(self, heats_list[0], pixels, 1e-7)
+
+            # the view having the gap
+            addr_range = [4096 * 8, far_addr + 4096]
+            heats_list = tiles.target_heats(42, time_range, addr_range,
+                                            [4, 4])
+            self.assertNotEqual(heats_list, None)
+            pixels = damo_heatmap.heat_pixels_from_snapshots(
+                    record.snapshots, time_range, addr_range, [4, 4])
+            assert_heats_close(self, heats_list[0], pixels, 1e-7)
+            # the view in the gap
+            self.assertEqual(tiles.target_heats(
+                42, time_range, [2 ** 30, 2 ** 31], [4, 4])[0],
+                [[0.0] * 4 for i in range(4)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_records
+import _damon
+import damo_record_info
+
+class TestDamoRecordInfo(unittest.TestCase):
+    def test_narrowed_gaps(self):
+        gaps = [[10, 20], [30, 40], [50, 60]]
+        for new_gaps in [[[15, 18]], [[5, 12], [18, 35]], [[20, 30]],
+                         [[0, 100]], [[41, 49]], []]:
+            self.assertEqual(
+                    damo_record_info.narrowed_gaps(gaps, new_gaps),
+                    damo_record_info.overlapping_regions(gaps, new_gaps))
+
+    def test_get_guide_info(self):
+        def snapshot(time, regions):
+            return _damo_records.DamonSnapshot(time, time + 1,
+                    [_damon.DamonRegion(start, end, nr_accesses,
+                        _damon.unit_samples, 0, _damon.unit_aggr_intervals)
+                     for start, end, nr_accesses in regions], None)
+
+        record = _damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), None, 1)
+        record.snapshots = [
+                snapshot(0, [(10, 20, 1), (30, 40, 0), (60, 70, 2)]),
+                snapshot(1, [(10, 25, 0), (35, 40, 1), (55, 70, 1)])]
+        guides = damo_record_info.get_guide_info([record])
+        self.assertEqual(len(guides), 1)
+        guide = guides[0]
+        self.assertEqual([guide.start_time, guide.end_time], [1, 2])
+        self.assertEqual(guide.regions(), [[10, 25], [30, 40], [55, 70]])
+        self.assertEqual([g.heats for g in guide.contig_regions],
+                         [10, 5, 35])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 # SPDX-License-Identifier: GPL-2.0
 
+import concurrent.futures
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
 import unittest
 
 import _test_damo_common
@@ -10,6 +17,12 @@ _test_damo_common.add_damo_dir_to_syspath()
 import _damo_records
 import _damon
 
+def setUpModule():
+    _test_damo_common.use_temp_cache_home()
+
+def tearDownModule():
+    _test_damo_common.restore_cache_home()
+
 class TestDamon(unittest.TestCase):
     def test_parse_file_permission_str(self):
         perm, err = _damo_records.parse_file_permission_str('777')
@@ -135,5 +148,529 @@ class TestDamon(unittest.TestCase):
                 _damo_records.parse_sort_bytes_ranges_input(
                     [[10, 20], [5, 7]]), ([[5, 7], [10, 20]], None))
 
+    def test_perf_script_snapshots(self):
+        lines = [
+                'kdamond.0  4452 [000] 82877.315633: damon:damon_aggregated: target_id=1 nr_regions=2 100-200: 3 5',
+                'kdamond.0  4452 [000] 82877.315633: damon:damon_aggregated: target_id=1 nr_regions=2 200-300: 0 7',
+                'kdamond.0  4452 [000] 82877.415633: damon:damon_aggregated: target_id=1 nr_regions=1 100-300: 1 1',
+                ]
+        snapshots = list(_damo_records.perf_script_snapshots(lines))
+        self.assertEqual([tid for tid, s in snapshots], [1, 1])
+        first, second = [s for tid, s in snapshots]
+        self.assertEqual([r.start for r in first.regions], [100, 200])
+        self.assertEqual(first.total_bytes, 200)
+        self.assertEqual(second.start_time, first.end_time)
+        self.assertEqual(first.end_time - first.start_time,
+                         second.end_time - second.start_time)
+
+        with self.assertRaises(Exception):
+            list(_damo_records.perf_script_snapshots(
+                [lines[2], lines[0], lines[1]]))
+
+    def test_parse_trace_event_format(self):
+        event_id, name, fields = _damo_records.parse_trace_event_format(
+                '\n'.join([
+                    'name: damon_aggregated',
+                    'ID: 620',
+                    'format:',
+                    '\tfield:unsigned short common_type;\toffset:0;\tsize:2;\tsigned:0;',
+                    '\tfield:unsigned long target_id;\toffset:8;\tsize:8;\tsigned:0;',
+                    '\tfield:char comm[16];\toffset:16;\tsize:16;\tsigned:1;',
+                    '',
+                    'print fmt: "target_id=%lu", REC->target_id']))
+        self.assertEqual([event_id, name], [620, 'damon_aggregated'])
+        self.assertEqual(fields, {'common_type': (0, 2, False),
+                                  'target_id': (8, 8, False),
+                                  'comm': (16, 16, True)})
+
+    def test_columnar_format(self):
+        record = _damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), 0, None)
+        record.snapshots = [
+                _damo_records.DamonSnapshot(100, 200, [
+                    _damon.DamonRegion(10, 20, 3, _damon.unit_samples,
+                                       5, _damon.unit_aggr_intervals),
+                    _damon.DamonRegion(20, 40, 0, _damon.unit_samples,
+                                       None, _damon.unit_aggr_intervals)],
+                    None),
+                _damo_records.DamonSnapshot(200, 300, [], None)]
+
+        fd, file_path = tempfile.mkstemp()
+        os.close(fd)
+        err = _damo_records.write_damon_records([record], file_path,
+                _damo_records.file_type_columnar)
+        self.assertIsNone(err)
+        records, err = _damo_records.parse_records_file(file_path)
+        os.remove(file_path)
+
+        self.assertIsNone(err)
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].intervals, record.intervals)
+        self.assertEqual(len(records[0].snapshots), 2)
+        snapshot = records[0].snapshots[-2]
+        self.assertEqual([snapshot.start_time, snapshot.end_time,
+                          snapshot.total_bytes], [100, 200, 30])
+        self.assertEqual(list(snapshot.region_fields()),
+                         [(10, 20, 3, 5), (20, 40, 0, None)])
+        self.assertEqual(snapshot.regions[1].size(), 20)
+        self.assertEqual(records[0].snapshots[1].regions, [])
+
+    def test_chunked_format(self):
+        record = _damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), 0, None)
+        nr_snapshots = _damo_records.chunked_block_nr_snapshots * 2 + 3
+        record.snapshots = [_damo_records.DamonSnapshot(i * 100,
+            (i + 1) * 100, [_damon.DamonRegion(10, 20 + i, i,
+                _damon.unit_samples, None, _damon.unit_aggr_intervals)],
+            None) for i in range(nr_snapshots)]
+
+        fd, file_path = tempfile.mkstemp()
+        os.close(fd)
+        err = _damo_records.write_damon_records([record], file_path,
+                _damo_records.file_type_chunked)
+        self.assertIsNone(err)
+        records, err = _damo_records.parse_records_file(file_path)
+        self.assertIsNone(err)
+        snapshots = records[0].snapshots
+        self.assertEqual(len(snapshots), nr_snapshots)
+        self.assertEqual(list(snapshots[-1].region_fields()),
+                         [(10, 20 + nr_snapshots - 1, nr_snapshots - 1,
+                           None)])
+        # only blocks of accessed snapshots are decompressed
+        self.assertEqual([b is not None for b in snapshots.blocks],
+                         [False, False, True])
+        self.assertEqual([s.total_bytes for s in snapshots],
+                         [10 + i for i in range(nr_snapshots)])
+        os.remove(file_path)
+
+    def test_chunked_columnar_same_records(self):
+        records = [_damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), scheme_idx,
+                None) for scheme_idx in [0, 1]]
+        for record in records:
+            record.snapshots = [_damo_records.DamonSnapshot(
+                i * 100 if i > 0 else None, (i + 1) * 100,
+                [_damon.DamonRegion(10, 20 + i, i, _damon.unit_samples,
+                    i if i % 2 else None, _damon.unit_aggr_intervals)],
+                None) for i in range(
+                    _damo_records.chunked_block_nr_snapshots + 1)]
+
+        parsed = {}
+        for file_type in [_damo_records.file_type_columnar,
+                          _damo_records.file_type_chunked]:
+            fd, file_path = tempfile.mkstemp()
+            os.close(fd)
+            err = _damo_records.write_damon_records(records, file_path,
+                                                    file_type)
+            self.assertIsNone(err)
+            parsed_records, err = _damo_records.parse_records_file(file_path)
+            self.assertIsNone(err)
+            parsed[file_type] = [
+                    (r.scheme_idx,
+                     [(s.start_time, s.end_time, s.total_bytes,
+                       list(s.region_fields())) for s in r.snapshots])
+                    for r in parsed_records]
+            os.remove(file_path)
+        self.assertEqual(parsed[_damo_records.file_type_columnar],
+                         parsed[_damo_records.file_type_chunked])
+        self.assertEqual(parsed[_damo_records.file_type_columnar][1][1][:2],
+                         [(None, 100, 10, [(10, 20, 0, None)]),
+                          (100, 200, 11, [(10, 21, 1, 1)])])
+
+    def test_framed_format(self):
+        records = [_damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), scheme_idx,
+                None) for scheme_idx in [0, 1]]
+
+        fd, file_path = tempfile.mkstemp()
+        os.close(fd)
+        writer = _damo_records.FramedRecordsWriter(file_path, None, 1)
+        for i in range(3):
+            for record in records:
+                record.snapshots = [_damo_records.DamonSnapshot(
+                    i * 100, (i + 1) * 100, [
+                        _damon.DamonRegion(10, 20, i, _damon.unit_samples,
+                                           5, _damon.unit_aggr_intervals)],
+                    None)]
+            writer.append(records)
+            # appended snapshots should be readable before the sync
+            parsed, err = _damo_records.parse_records_file(file_path)
+            self.assertIsNone(err)
+            self.assertEqual([len(r.snapshots) for r in parsed],
+                             [i + 1, i + 1])
+        writer.close()
+
+        parsed, err = _damo_records.parse_records_file(file_path)
+        self.assertIsNone(err)
+        self.assertEqual([r.scheme_idx for r in parsed], [0, 1])
+        self.assertEqual(parsed[1].intervals, records[1].intervals)
+        self.assertEqual([s.start_time for s in parsed[1].snapshots],
+                         [0, 100, 200])
+        self.assertEqual(list(parsed[1].snapshots[2].region_fields()),
+                         [(10, 20, 2, 5)])
+
+        # a file cut in the middle of the last frame, e.g., by killed writer
+        with open(file_path, 'r+b') as f:
+            f.truncate(os.path.getsize(file_path) - 10)
+        parsed, err = _damo_records.parse_records_file(file_path)
+        os.remove(file_path)
+        self.assertIsNone(err)
+        self.assertEqual([len(r.snapshots) for r in parsed], [3, 2])
+
+    def test_records_json_texts(self):
+        records = [_damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), scheme_idx,
+                None) for scheme_idx in [0, 1, 2]]
+        records[0].snapshots = [_damo_records.DamonSnapshot(i * 100,
+            (i + 1) * 100, [_damon.DamonRegion(10, 20, i,
+                _damon.unit_samples, 5, _damon.unit_aggr_intervals)], None)
+            for i in range(3)]
+        records[2].snapshots = records[0].snapshots[:1]
+        for raw in [True, False]:
+            for to_print in [[], records[:1], records]:
+                self.assertEqual(
+                        '\n'.join(_damo_records.records_json_texts(
+                            to_print, raw)),
+                        json.dumps([r.to_kvpairs(raw) for r in to_print],
+                                   indent=4))
+
+    def test_aggregate_snapshots(self):
+        def region(start, end, nr_accesses):
+            return _damon.DamonRegion(start, end, nr_accesses,
+                    _damon.unit_samples, 0, _damon.unit_aggr_intervals)
+
+        snapshots = [
+                _damo_records.DamonSnapshot(0, 1,
+                    [region(10, 100, 5), region(200, 300, 1)], None),
+                _damo_records.DamonSnapshot(1, 2,
+                    [region(0, 50, 2), region(50, 150, 4),
+                     region(200, 250, 3)], None)]
+        aggregated = _damo_records.aggregate_snapshots(snapshots)
+        self.assertEqual([aggregated.start_time, aggregated.end_time], [0, 2])
+        self.assertEqual(
+                [(r.start, r.end, r.nr_accesses.samples)
+                 for r in aggregated.regions],
+                [(10, 100, 9), (200, 300, 4), (0, 10, 2), (100, 150, 4)])
+
+    def test_adjusted_snapshots_consumer(self):
+        class Collector(_damo_records.SnapshotsConsumer):
+            def __init__(self):
+                self.snapshots = []
+                self.finished = False
+
+            def add_snapshot(self, record, snapshot):
+                self.snapshots.append((record.target_id, snapshot.start_time,
+                    snapshot.end_time, [(r.start, r.end, r.nr_accesses.samples)
+                                        for r in snapshot.regions]))
+
+            def finish(self):
+                self.finished = True
+
+        def make_records():
+            records = []
+            for tid in [1, 2]:
+                record = _damo_records.DamonRecord(0, 0,
+                        _damon.DamonIntervals(5000, 100000, 1000000), None,
+                        tid)
+                record.snapshots = [_damo_records.DamonSnapshot(
+                    i * 1000, (i + 1) * 1000,
+                    [_damon.DamonRegion(10 * i, 10 * i + 50, i + tid,
+                        _damon.unit_samples, 0, _damon.unit_aggr_intervals)],
+                    None) for i in range(10)]
+                records.append(record)
+            return records
+
+        for aggregate_interval, nr_snapshots_to_skip in [[1, 0], [3, 2]]:
+            collector = Collector()
+            _damo_records.analyze_records(make_records(),
+                    [_damo_records.AdjustedSnapshotsConsumer([collector],
+                        aggregate_interval, nr_snapshots_to_skip)])
+            self.assertTrue(collector.finished)
+
+            records = make_records()
+            _damo_records.adjust_records(records, aggregate_interval,
+                                         nr_snapshots_to_skip)
+            expected = Collector()
+            _damo_records.analyze_records(records, [expected])
+            self.assertEqual(collector.snapshots, expected.snapshots)
+
+    def test_parse_records_file_in_time_range(self):
+        record = _damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), 0, 1)
+        record.snapshots = [_damo_records.DamonSnapshot(
+            (i + 1) * 1000000000, (i + 2) * 1000000000,
+            [_damon.DamonRegion(10, 20, i, _damon.unit_samples, None,
+                                _damon.unit_aggr_intervals)], None)
+            for i in range(10)]
+
+        tmpdir = tempfile.mkdtemp()
+        file_path = os.path.join(tmpdir, 'damon.data')
+        err = _damo_records.write_damon_records([record], file_path,
+                _damo_records.file_type_perf_script)
+        self.assertIsNone(err)
+        self.assertTrue(os.path.isfile('%s.index' % file_path))
+
+        for by_start_time in [False, True]:
+            records, err = _damo_records.parse_records_file_in_time_range(
+                    file_path, [2500000000, 4000000000], relative=True,
+                    by_start_time=by_start_time)
+            self.assertIsNone(err)
+            expected = [3, 4, 5]
+            if by_start_time:
+                expected = [4, 5]
+            self.assertEqual(
+                    [s.start_time // 1000000000 for s in records[0].snapshots],
+                    expected)
+
+            # should be same to that of full parsing
+            os.rename('%s.index' % file_path, '%s.bak' % file_path)
+            full_records, err = _damo_records.parse_records_file_in_time_range(
+                    file_path, [2500000000, 4000000000], relative=True,
+                    by_start_time=by_start_time)
+            os.rename('%s.bak' % file_path, '%s.index' % file_path)
+            self.assertEqual(
+                    [s.start_time for s in records[0].snapshots],
+                    [s.start_time for s in full_records[0].snapshots])
+        os.remove('%s.index' % file_path)
+        os.remove(file_path)
+        os.rmdir(tmpdir)
+
+    def test_parse_records_file_cached(self):
+        record = _damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), 0, 1)
+        record.snapshots = [_damo_records.DamonSnapshot(
+            (i + 1) * 1000000000, (i + 2) * 1000000000,
+            [_damon.DamonRegion(10, 20, i, _damon.unit_samples, None,
+                                _damon.unit_aggr_intervals)], None)
+            for i in range(10)]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, 'damon.data')
+            err = _damo_records.write_damon_records([record], file_path,
+                    _damo_records.file_type_json_compressed)
+            self.assertIsNone(err)
+
+            cache_path = _damo_records.records_cache_path(file_path)
+            self.assertFalse(os.path.isfile(cache_path))
+            parsed = []
+            for i in range(2):
+                records, err = _damo_records.parse_records_file_cached(
+                        file_path)
+                self.assertIsNone(err)
+                self.assertTrue(os.path.isfile(cache_path))
+                parsed.append([[r.start, r.end, r.nr_accesses.samples]
+                               for s in records[0].snapshots
+                               for r in s.regions])
+            self.assertEqual(parsed[0], parsed[1])
+            self.assertEqual(parsed[0], [[10, 20, i] for i in range(10)])
+            # the record could be readable by only the owner
+            cache_dir = os.path.dirname(cache_path)
+            self.assertEqual(os.stat(cache_dir).st_mode & 0o777, 0o700)
+            for path in [cache_path,
+                         _damo_records.records_cache_key_path(cache_path)]:
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+            _damo_records.evict_records_cache(cache_dir, 0)
+            self.assertFalse(os.path.isfile(cache_path))
+
+            # cache of removed file is removed regardless of the size
+            _damo_records.parse_records_file_cached(file_path)
+            self.assertTrue(os.path.isfile(cache_path))
+            os.remove(file_path)
+            _damo_records.evict_records_cache(cache_dir,
+                    _damo_records.records_cache_max_bytes)
+            self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_perf_data_native_events_multiple_ids(self):
+        perf_data = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                 '..', 'report', 'perf.data')
+        with open(perf_data, 'rb') as f:
+            orig = f.read()
+        header = _damo_records.perf_file_header.unpack_from(orig, 0)
+        attr_size = header[2]
+        attrs_offset, attrs_size = header[3:5]
+        data_offset, data_size = header[5:7]
+
+        # make a copy having no PERF_SAMPLE_IDENTIFIER, like that of an event
+        # recorded on multiple cpus.  The event still has multiple ids.
+        prefix = bytearray(orig[:data_offset])
+        for offset in range(attrs_offset, attrs_offset + attrs_size,
+                            attr_size):
+            fields = list(_damo_records.perf_event_attr_head.unpack_from(
+                prefix, offset))
+            fields[4] &= ~_damo_records.perf_sample_identifier
+            _damo_records.perf_event_attr_head.pack_into(
+                    prefix, offset, *fields)
+        data = bytearray()
+        for record_type, offset in _damo_records.perf_data_records(
+                orig, [data_offset, data_size]):
+            record_type, misc, size = \
+                    _damo_records.perf_event_header.unpack_from(orig, offset)
+            body = orig[offset + _damo_records.perf_event_header.size:
+                        offset + size]
+            if record_type == _damo_records.perf_record_sample:
+                body = body[8:]
+            data += _damo_records.perf_event_header.pack(
+                    record_type, misc,
+                    _damo_records.perf_event_header.size + len(body))
+            data += body
+        # feature sections table is right after the data, and points the
+        # feature sections using absolute offsets.  Keep the offsets.
+        _damo_records.perf_file_header.pack_into(
+                prefix, 0, *(header[:6] + (len(data),) + header[7:]))
+        features_table_size = _damo_records.perf_file_section.size * sum(
+                [bin(bits).count('1') for bits in header[9:]])
+        features_table_offset = data_offset + data_size
+        features_table = orig[features_table_offset:
+                              features_table_offset + features_table_size]
+        padding = bytes(data_size - len(data))
+        features = orig[features_table_offset + features_table_size:]
+
+        def event_fields(events):
+            return [(region.start, region.end, region.nr_accesses.samples,
+                     end_time, target_id, nr_regions)
+                    for region, end_time, target_id, nr_regions in events]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, 'perf.data')
+            with open(file_path, 'wb') as f:
+                f.write(prefix + data + features_table + padding + features)
+            events = event_fields(
+                    _damo_records.perf_data_native_events(file_path))
+        self.assertTrue(len(events) > 0)
+        self.assertTrue(events == event_fields(
+            _damo_records.perf_data_native_events(perf_data)))
+
+    def test_targets_tracker(self):
+        child = subprocess.Popen(['sleep', '100'])
+        pid = '%d' % child.pid
+        self.assertTrue(pid in _damo_records.child_pids_of(os.getpid()))
+        self.assertTrue(pid in
+                        _damo_records.child_pids_of_by_ppid(os.getpid()))
+
+        tracker = _damo_records.TargetsTracker()
+        self.assertTrue(_damo_records.pid_running(pid))
+        self.assertTrue(tracker.running(pid))
+        self.assertFalse(tracker.running(None))
+
+        # zombie should be treated as terminated
+        child.kill()
+        os.waitid(os.P_PID, child.pid, os.WEXITED | os.WNOWAIT)
+        self.assertFalse(_damo_records.pid_running(pid))
+        tracker.update()
+        self.assertFalse(tracker.running(pid))
+        tracker.close()
+        child.wait()
+
+    def test_recording_source_deadline(self):
+        source = _damo_records.RecordingSource('test', 1, None)
+        source.next_deadline = 100
+        source.set_next_deadline(100.5)
+        self.assertEqual(source.next_deadline, 101)
+        self.assertEqual(source.nr_overruns, 0)
+        # the sampling took 2.5 intervals
+        source.set_next_deadline(103.5)
+        self.assertEqual(source.next_deadline, 104)
+        self.assertEqual(source.nr_overruns, 2)
+
+    def test_run_due_sources(self):
+        release_slow = threading.Event()
+        runs = {'slow': 0, 'fast': 0, 'damon': 0}
+        def slow():
+            runs['slow'] += 1
+            release_slow.wait()
+            return 'slow result'
+        def fast():
+            runs['fast'] += 1
+        def damon():
+            runs['damon'] += 1
+        results = []
+        def slow_done(result):
+            results.append(result)
+            return len(results) == 2
+
+        slow_source = _damo_records.RecordingSource(
+                'slow', 10, slow, done_fn=slow_done, uses_damon=True,
+                background=True)
+        fast_source = _damo_records.RecordingSource('fast', 10, fast)
+        damon_source = _damo_records.RecordingSource('damon', 10, damon,
+                                                     uses_damon=True)
+        sources = [slow_source, fast_source, damon_source]
+        for source in sources:
+            source.next_deadline = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertFalse(_damo_records.run_due_sources(sources, executor))
+            slow_source.next_deadline = time.time()
+            fast_source.next_deadline = time.time()
+            self.assertFalse(_damo_records.run_due_sources(sources, executor))
+            # fast source ran while the slow one is running, but the other
+            # DAMON-using source waited for the slow one
+            self.assertEqual(runs, {'slow': 1, 'fast': 2, 'damon': 0})
+            self.assertEqual(slow_source.nr_overruns, 1)
+            self.assertEqual(fast_source.nr_overruns, 0)
+
+            release_slow.set()
+            slow_source.future.result()
+            self.assertFalse(_damo_records.run_due_sources(sources, executor))
+            self.assertEqual(results, ['slow result'])
+            self.assertEqual(runs, {'slow': 1, 'fast': 2, 'damon': 1})
+
+            slow_source.next_deadline = time.time()
+            self.assertFalse(_damo_records.run_due_sources(sources, executor))
+            slow_source.future.result()
+            self.assertTrue(_damo_records.run_due_sources(sources, executor))
+            self.assertEqual(results, ['slow result', 'slow result'])
+
+    def test_finish_background_samplings(self):
+        release = threading.Event()
+        def record():
+            release.wait()
+            return 'result'
+        results = []
+        source = _damo_records.RecordingSource(
+                'background', 10, record,
+                done_fn=lambda result: results.append(result),
+                uses_damon=True, background=True)
+        source.next_deadline = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertFalse(_damo_records.run_due_sources([source],
+                                                           executor))
+            self.assertNotEqual(source.future, None)
+            threading.Timer(0.1, release.set).start()
+            # waits for the in-flight sampling, and handles its result
+            _damo_records.finish_background_samplings([source])
+            self.assertEqual(source.future, None)
+            self.assertEqual(results, ['result'])
+
+    def test_recording_sources_intervals(self):
+        handle = _damo_records.RecordingHandle(
+                tracepoint=None, file_path='damon.data',
+                file_format=_damo_records.file_type_framed,
+                file_permission=0o600, monitoring_intervals=None,
+                do_profile=False, kdamonds=[], add_child_tasks=False,
+                record_mem_footprint=True, record_vmas=True, timeout=None)
+        self.assertEqual(
+                [[s.name, s.interval_sec] for s in
+                 _damo_records.recording_sources(handle)],
+                [['memory footprint', 1], ['vmas', 1], ['proc stats', 1]])
+
+        # /proc files are sampled for each snapshot by default
+        handle.snapshot_request = _damo_records.RecordGetRequest(
+                tried_regions_of=None, record_file=None, record_filter=None,
+                total_sz_only=False, dont_merge_regions=False)
+        handle.snapshot_interval_sec = 0.1
+        handle.snapshot_count = 10
+        self.assertEqual(
+                [[s.name, s.interval_sec] for s in
+                 _damo_records.recording_sources(handle)],
+                [['memory footprint', 0.1], ['vmas', 0.1],
+                 ['proc stats', 0.1], ['snapshot', 0.1]])
+
+        handle.proc_sample_interval_sec = 5
+        self.assertEqual(
+                [[s.name, s.interval_sec] for s in
+                 _damo_records.recording_sources(handle)],
+                [['memory footprint', 5], ['vmas', 5], ['proc stats', 5],
+                 ['snapshot', 0.1]])
+
 if __name__ == '__main__':
     unittest.main()
@@ -12,7 +12,7 @@ import _damon
 import damo_report_access
 
 class TestDamoShow(unittest.TestCase):
-    def test_sorted_access_pattern(self):
+    def test_access_patterns_range(self):
         record = _damo_records.DamonRecord.from_kvpairs(
             {
                 "kdamond_idx": 0, "context_idx": 0,
@@ -58,13 +58,13 @@ class TestDamoShow(unittest.TestCase):
                         }
                     ]
                 })
-        sorted_vals = damo_report_access.SortedAccessPatterns([record])
-        self.assertEqual(sorted_vals.sz_regions[0], 4096)
-        self.assertEqual(sorted_vals.sz_regions[-1], 8192)
-        self.assertEqual(sorted_vals.access_rates_percent[0], 0)
-        self.assertEqual(sorted_vals.access_rates_percent[-1], 95)
-        self.assertEqual(sorted_vals.ages_us[0], 100000)
-        self.assertEqual(sorted_vals.ages_us[-1], 3000000)
+        ranges = damo_report_access.AccessPatternsRange([record])
+        self.assertEqual(ranges.sz_regions[0], 4096)
+        self.assertEqual(ranges.sz_regions[-1], 8192)
+        self.assertEqual(ranges.access_rates_percent[0], 0)
+        self.assertEqual(ranges.access_rates_percent[-1], 95)
+        self.assertEqual(ranges.ages_us[0], 100000)
+        self.assertEqual(ranges.ages_us[-1], 3000000)
 
     def test_format_template(self):
         record = _damo_records.DamonRecord.from_kvpairs(
@@ -116,6 +116,17 @@ class TestDamoShow(unittest.TestCase):
             '<abs start time>', damo_report_access.record_formatters, [], None,
             None, None, record, False, None), '0 ns')
 
+        template = damo_report_access.CompiledTemplate(
+                '<index> [<start address>, <end address>)\\n<size> <size>',
+                damo_report_access.region_formatters,
+                [['<index>', 3], ['<size>', 6], ['<index>', 5]])
+        self.assertEqual(len(template.fields), 5)
+        region = record.snapshots[0].regions[1]
+        self.assertEqual(template.render(2, region, True, None),
+                '2   [8192, 16384)\n8192   8192  ')
+        self.assertEqual(template.render(1, region, False, None),
+                '1   [8.000 KiB, 16.000 KiB)\n8.000 KiB 8.000 KiB')
+
     def test_rescale(self):
         self.assertEqual(
                 damo_report_access.rescale(10, [0, 100], [0, 10], False), 1)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import os
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import _damo_fmt_str
+import _damo_records
+import _damon
+import damo_report_holistic
+
+class TestDamoReportHolistic(unittest.TestCase):
+    def test_fmt_access_report_short(self):
+        record = _damo_records.DamonRecord(0, 0,
+                _damon.DamonIntervals(5000, 100000, 1000000), None, 0)
+        record.snapshots = [_damo_records.DamonSnapshot(time, time + 10,
+            [_damon.DamonRegion(4096, 4096 * 3, time % 7,
+                _damon.unit_samples, 0, _damon.unit_aggr_intervals)], None)
+            for time in range(0, 100, 10)]
+        analysis = damo_report_holistic.analyze_records([record], [5, 80])
+
+        # in-memory snapshots, like those that 'damo monitor' makes
+        pid = os.getpid()
+        analysis.footprint_snapshots = []
+        for i in range(3):
+            snapshot = _damo_records.MemFootprintsSnapshot([pid])
+            snapshot.footprints[pid].size = 1024
+            snapshot.footprints[pid].resident = 512
+            snapshot.footprints[None].total = 4096
+            snapshot.footprints[None].free = 1024
+            analysis.footprint_snapshots.append(snapshot)
+
+        lines = damo_report_holistic.fmt_access_report_short(analysis)
+        for metric, sz in [['rss', 512 * 4096], ['vsz', 1024 * 4096],
+                           ['sys_used', 3072 * 1024]]:
+            self.assertTrue('%10s ' % metric + '%15s ' %
+                            _damo_fmt_str.format_sz(sz, False) * 5 in lines)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: GPL-2.0
+
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+
+import _test_damo_common
+
+_test_damo_common.add_damo_dir_to_syspath()
+
+import damo_serve
+
+class TestDamoServe(unittest.TestCase):
+    def test_cached_result(self):
+        nr_updates = [0]
+        def get_result():
+            nr_updates[0] += 1
+            time.sleep(0.1)
+            return 'result', None
+
+        cached = damo_serve.CachedResult(get_result, threading.Lock())
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(cached.get(10)))
+            for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(nr_updates[0], 1)
+        self.assertEqual(len(results), 8)
+        for result in results:
+            self.assertEqual(result, ('result', None, cached.update_time))
+
+        # too old result should be updated
+        cached.get(0)
+        self.assertEqual(nr_updates[0], 2)
+
+    def test_cached_results_shared_lock(self):
+        running = [0]
+        max_running = [0]
+        def get_result():
+            running[0] += 1
+            max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.05)
+            running[0] -= 1
+            return None, None
+
+        lock = threading.Lock()
+        caches = [damo_serve.CachedResult(get_result, lock)
+                  for i in range(2)]
+        threads = [threading.Thread(target=cache.get, args=[0])
+                   for cache in caches for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(max_running[0], 1)
+
+    def test_request_handler(self):
+        state = damo_serve.ServeState(min_refresh_interval=10,
+                                      raw_number=False)
+        nr_updates = [0]
+        def read_snapshot():
+            nr_updates[0] += 1
+            return ['snapshot'], None
+        state.snapshot = damo_serve.CachedResult(read_snapshot,
+                                                 threading.Lock())
+        damo_serve.serve_state = state
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            socket_path = os.path.join(tmpdir, 'damo.sock')
+            server = damo_serve.bind_server(socket_path)
+            self.assertEqual(os.stat(socket_path).st_mode & 0o777, 0o600)
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.connect(socket_path)
+                    f = sock.makefile('rw')
+                    replies = []
+                    for request in ['{"request": "snapshot"}',
+                                    '{"request": "snapshot"}', 'wrong']:
+                        f.write('%s\n' % request)
+                        f.flush()
+                        replies.append(json.loads(f.readline()))
+            finally:
+                server.shutdown()
+                server.server_close()
+                thread.join()
+            self.assertEqual(replies[0]['result'], ['snapshot'])
+            self.assertEqual(replies[0], replies[1])
+            self.assertEqual(nr_updates[0], 1)
+            self.assertEqual(replies[2]['error'], 'wrong request')
+
+            # cleanup_exit() should wait for DAMON reads, and remove the
+            # socket file
+            self.assertTrue(os.path.exists(socket_path))
+            state.damon_lock.acquire()
+            threading.Timer(0.1, state.damon_lock.release).start()
+            with self.assertRaises(SystemExit):
+                damo_serve.cleanup_exit(socket_path, 0)
+            self.assertFalse(os.path.exists(socket_path))
+            self.assertTrue(state.damon_lock.locked())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -217,6 +217,19 @@ class TestDamon(unittest.TestCase):
         self.assertEqual(_damon.DamonRegion(1234, 5678).to_kvpairs(raw=True),
                 {'start': '1234', 'end': '5678'})
 
+        # nr_accesses and age values are stored in the region
+        region = _damon.DamonRegion(10, 20, 3, _damon.unit_samples, 5,
+                                    _damon.unit_aggr_intervals)
+        region.nr_accesses.samples += 2
+        region.age.add_unset_unit(_damon.DamonIntervals(5000, 100000, 1000000))
+        self.assertEqual([region.nr_accesses.samples, region.age.usec],
+                         [5, 500000])
+        self.assertEqual(region.nr_accesses,
+                         _damon.DamonNrAccesses(5, _damon.unit_samples))
+        region.nr_accesses = _damon.DamonNrAccesses(50, _damon.unit_percent)
+        self.assertEqual([region.nr_accesses.samples,
+                          region.nr_accesses.percent], [None, 50])
+
     def test_damos_access_pattern(self):
         self.assertEqual(_damon.DamosAccessPattern(),
                 _damon.DamosAccessPattern(['min', 'max'],
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 # SPDX-License-Identifier: GPL-2.0
 
+import os
+import shutil
+import tempfile
 import unittest
 
 import _test_damo_common
@@ -133,5 +136,52 @@ class TestDamonSysfs(unittest.TestCase):
         logs = _damo_fs.debug_get_dryrun_logs()
         self.assertEqual(expected_dryrun_log, logs)
 
+        # staging only changes
+        _damo_fs.debug_dryrun(
+                {
+                    'nr_kdamonds': '1',
+                    '0/contexts/nr_contexts': '1',
+                    '0/contexts/0/targets/nr_targets': '0',
+                    '0/contexts/0/schemes/nr_schemes': '1',
+                    })
+        kdamonds[0].contexts[0].schemes[0].quotas.sz_bytes = 4096
+        _damon_sysfs.write_kdamonds_dir('', kdamonds,
+                _damon_sysfs.files_content_by_path('', sysfs_dict, {}))
+        self.assertEqual(_damo_fs.debug_get_dryrun_logs(), [
+            "read 'nr_kdamonds': '1'",
+            "read '0/contexts/nr_contexts': '1'",
+            "read '0/contexts/0/targets/nr_targets': '0'",
+            "read '0/contexts/0/schemes/nr_schemes': '1'",
+            "write '4096' to '0/contexts/0/schemes/0/quotas/bytes'",
+            ])
+
+    def test_files_content_to_kdamonds_without_contexts(self):
+        kdamonds = _damon_sysfs.files_content_to_kdamonds(
+                {'nr_kdamonds': '1\n', '0': {'state': 'on\n', 'pid': '42\n'}})
+        self.assertEqual(len(kdamonds), 1)
+        self.assertEqual([kdamonds[0].state, kdamonds[0].pid], ['on', '42'])
+        self.assertEqual(kdamonds[0].contexts, [])
+
+    def test_read_files(self):
+        _damo_fs.debug_dryrun_logs = None
+        root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(root, '0', 'tried_regions', '0'))
+        for path, content in [
+                ['nr_kdamonds', '1\n'], ['0/state', 'on\n'],
+                ['0/tried_regions/total_bytes', '4096\n'],
+                ['0/tried_regions/0/start', '0\n']]:
+            with open(os.path.join(root, path), 'w') as f:
+                f.write(content)
+
+        expected = {'nr_kdamonds': '1\n', '0': {'state': 'on\n',
+            'tried_regions': {'total_bytes': '4096\n',
+                              '0': {'start': '0\n'}}}}
+        self.assertEqual(_damo_fs.read_files(root), expected)
+        del expected['0']['tried_regions']
+        self.assertEqual(
+                _damo_fs.read_files(root, skip_dirs=['tried_regions']),
+                expected)
+        shutil.rmtree(root)
+
 if __name__ == '__main__':
     unittest.main()